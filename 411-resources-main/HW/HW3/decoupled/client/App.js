@@ -19,39 +19,21 @@ function App() {
   const [winner, setWinner] = useState(null);
 
   /**
-   * Fetches the current board state from the server.
+   * Fetches the current board state and winner from the server.
    */
   const fetchBoard = useCallback(() => {
     console.log('Fetching board state from server...');
-    axios.get(`${URL}/board`)
+    axios.get(`${URL}/state`)
       .then(response => {
         console.log('Board state fetched:', response.data.board);
         setBoard(response.data.board);
+        setWinner(response.data.winner);
       })
       .catch(error => {
         console.error('Error fetching board:', error);
       });
   }, []);
 
-  /**
-   * Checks if there is a winner.
-   */
-  const checkWinner = useCallback(() => {
-    console.log('Checking for a winner...');
-    axios.get(`${URL}/check_winner`)
-      .then(response => {
-        if (response.data.winner) {
-          console.log(`Player ${response.data.winner} wins!`);
-          setWinner(response.data.winner);
-        } else {
-          console.log('No winner yet.');
-        }
-      })
-      .catch(error => {
-        console.error('Error checking winner:', error);
-      });
-  }, []);
-
   /**
    * Handles the click event for a cell.
    * @param {number} index - The index of the clicked cell.
@@ -69,12 +51,15 @@ function App() {
     }
 
     console.log('Making move on the server...');
+    // The move response carries the board and the winner, so one request is enough.
     axios.post(`${URL}/move`, { index })
       .then(response => {
         console.log('Move made:', response.data.board);
-        const newBoard = response.data.board;
-        setBoard(newBoard);
-        checkWinner();
+        setBoard(response.data.board);
+        if (response.data.winner) {
+          console.log(`Player ${response.data.winner} wins!`);
+          setWinner(response.data.winner);
+        }
       })
       .catch(error => {
         // Handle error response
@@ -1,7 +1,12 @@
 from flask import Flask, jsonify, make_response, request, Response
 from flask_cors import CORS
 
-from tictactoe.controller import get_board_state, get_winner, make_move
+from tictactoe.controller import (get_board_state, get_game_state, get_winner,
+                                  make_ai_move, make_move, make_moves, new_game,
+                                  stream_game_state, undo_move)
+from tictactoe.logs import route_logger
+from tictactoe.metrics import REGISTRY
+from tictactoe.store import DEFAULT_GAME_ID
 from tictactoe.view import View
 
 app = Flask(__name__)
@@ -10,34 +15,91 @@ CORS(app)  # This will allow the React front-end to communicate with the Flask b
 
 VIEW = View()
 
+# One logger per route, so each can be sampled separately (see TICTACTOE_LOG_SAMPLE).
+LOG = {route: route_logger(route) for route in (
+    "health", "board", "check_winner", "new", "move", "moves", "state", "stream",
+    "ai_move", "undo")}
+
 
 @app.route("/tictactoe/health", methods=["GET"])
 @app.route("/tictactoe/healthcheck", methods=["GET"])
 def health_check() -> Response:
-    app.logger.info('Health check')
+    LOG["health"].info('Health check')
     return make_response(jsonify({"status": "OK"}), 200)
 
+@app.route("/metrics", methods=["GET"])
+def metrics() -> Response:
+    # Prometheus text by default, or the same summaries as JSON with ?format=json.
+    if request.args.get('format') == 'json':
+        return Response(REGISTRY.to_json(), mimetype="application/json")
+    return Response(REGISTRY.to_text(), mimetype="text/plain; version=0.0.4")
+
 @app.route("/tictactoe/board", methods=["GET"])
-def board_state() -> Response:
-    app.logger.info('Get board state')
-    return get_board_state()
+@app.route("/tictactoe/<game_id>/board", methods=["GET"])
+def board_state(game_id: str = DEFAULT_GAME_ID) -> Response:
+    LOG["board"].info('Get board state')
+    return get_board_state(game_id, request.if_none_match)
 
 @app.route("/tictactoe/check_winner", methods=["GET"])
-def check_winner() -> Response:
-    app.logger.info('Checking for a winner')
-    return get_winner()
+@app.route("/tictactoe/<game_id>/check_winner", methods=["GET"])
+def check_winner(game_id: str = DEFAULT_GAME_ID) -> Response:
+    LOG["check_winner"].info('Checking for a winner')
+    return get_winner(game_id, request.if_none_match)
+
+@app.route("/tictactoe/new", methods=["POST"])
+@app.route("/tictactoe/<game_id>/new", methods=["POST"])
+def new(game_id: str = DEFAULT_GAME_ID) -> Response:
+    LOG["new"].info('New game')
+    data = request.get_json(silent=True) or {}
+    LOG["new"].debug('New game request %s', data)
+    return new_game(game_id, data.get('size', 3), data.get('k', 3))
 
 @app.route("/tictactoe/move", methods=["POST"])
-def move() -> Response:
-    app.logger.info('Moving')
+@app.route("/tictactoe/<game_id>/move", methods=["POST"])
+def move(game_id: str = DEFAULT_GAME_ID) -> Response:
+    LOG["move"].info('Moving')
     data = request.get_json()
-    app.logger.info(data)
+    LOG["move"].debug('Move request %s', data)
     index = data['index']
-    app.logger.info(index)
     try:
-        return make_move(index)
+        return make_move(index, game_id)
     except ValueError as e:
         return VIEW.error(str(e))
 
+@app.route("/tictactoe/moves", methods=["POST"])
+@app.route("/tictactoe/<game_id>/moves", methods=["POST"])
+def moves(game_id: str = DEFAULT_GAME_ID) -> Response:
+    LOG["moves"].info('Moving in batch')
+    data = request.get_json(silent=True)
+    LOG["moves"].debug('Moves request %s', data)
+    # A body that is not an object has no indices; make_moves rejects that with a 400.
+    indices = data.get('indices') if isinstance(data, dict) else None
+    return make_moves(indices, game_id)
+
+@app.route("/tictactoe/state", methods=["GET"])
+@app.route("/tictactoe/<game_id>/state", methods=["GET"])
+def state(game_id: str = DEFAULT_GAME_ID) -> Response:
+    LOG["state"].info('Get game state')
+    wait = request.args.get('wait', 0.0, type=float)
+    return get_game_state(game_id, request.if_none_match, wait)
+
+@app.route("/tictactoe/stream", methods=["GET"])
+@app.route("/tictactoe/<game_id>/stream", methods=["GET"])
+def stream(game_id: str = DEFAULT_GAME_ID) -> Response:
+    LOG["stream"].info('Streaming game state')
+    return stream_game_state(game_id, request.headers.get('Last-Event-ID'))
+
+@app.route("/tictactoe/ai_move", methods=["POST"])
+@app.route("/tictactoe/<game_id>/ai_move", methods=["POST"])
+def ai_move(game_id: str = DEFAULT_GAME_ID) -> Response:
+    LOG["ai_move"].info('AI moving')
+    return make_ai_move(game_id)
+
+@app.route("/tictactoe/undo", methods=["POST"])
+@app.route("/tictactoe/<game_id>/undo", methods=["POST"])
+def undo(game_id: str = DEFAULT_GAME_ID) -> Response:
+    LOG["undo"].info('Undoing move')
+    return undo_move(game_id)
+
 if __name__ == '__main__':
     app.run(host="0.0.0.0", debug=True)
@@ -0,0 +1,117 @@
+"""
+ASGI entry point for the tictactoe service.
+
+Stream routes are served natively from the event loop by
+``tictactoe.stream.stream_app``. Every other route goes to the Flask app,
+which runs in a thread pool behind a small WSGI adapter.
+
+Run it with any ASGI server, e.g. ``uvicorn asgi:application``, or through
+``python serve.py --mode asgi``.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import io
+import sys
+
+from app import app
+from tictactoe.stream import stream_app, stream_game_id
+
+
+class WsgiAdapter:
+    """
+    Runs a WSGI application from an ASGI server.
+
+    The request body is read in full before the WSGI call, and the response
+    is sent once the WSGI call returns, so this is only meant for routes
+    with short, bounded responses.
+    """
+
+    def __init__(self, wsgi_app, threads: int = 32):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(threads, thread_name_prefix="wsgi")
+
+    def environ(self, scope: dict, body: bytes) -> dict:
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+            "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": client[0],
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope.get("headers", ()):
+            name = name.decode("latin1").upper().replace("-", "_")
+            value = value.decode("latin1")
+            if name == "CONTENT_TYPE" or name == "CONTENT_LENGTH":
+                key = name
+            else:
+                key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        # The body has already been read in full, chunked or not.
+        environ["CONTENT_LENGTH"] = str(len(body))
+        return environ
+
+    def call(self, environ: dict):
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [(k.lower().encode("latin1"), v.encode("latin1"))
+                                   for k, v in headers]
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            body = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        return response["status"], response["headers"], body
+
+    async def __call__(self, scope, receive, send) -> None:
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        environ = self.environ(scope, b"".join(chunks))
+        loop = asyncio.get_running_loop()
+        status, headers, body = await loop.run_in_executor(self.executor, self.call, environ)
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+flask_app = WsgiAdapter(app)
+
+
+async def application(scope, receive, send) -> None:
+    """
+    The ASGI application: stream routes in the event loop, the rest through Flask.
+    """
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+    if scope["method"] == "GET" and stream_game_id(scope["path"]) is not None:
+        await stream_app(scope, receive, send)
+    else:
+        await flask_app(scope, receive, send)
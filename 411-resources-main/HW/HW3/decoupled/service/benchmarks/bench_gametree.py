@@ -0,0 +1,44 @@
+"""
+Startup cost, memory footprint and lookup rate of the solved game tree.
+
+Usage
+-----
+    python -m benchmarks.bench_gametree
+"""
+import sys
+import time
+import tracemalloc
+
+import tictactoe.model  # noqa: F401  (keep its import out of the timing)
+
+
+def main() -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    from tictactoe import gametree
+    elapsed = time.perf_counter() - start
+    traced = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tables = (gametree.SCORE, gametree.BEST_MOVE, gametree.WINNER, gametree.TERNARY)
+    table_bytes = sum(sys.getsizeof(table) for table in tables)
+    table_bytes += sum(sys.getsizeof(entry) for entry in gametree.TERNARY)
+
+    keys = [gametree.position_key(x, o) for x in range(0, 512, 7) for o in range(0, 512, 11)
+            if not x & o]
+    rounds = 200
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for key in keys:
+            gametree.best_move(key)
+    lookups = rounds * len(keys) / (time.perf_counter() - start)
+
+    print(f"positions        {gametree.POSITIONS:>12,}")
+    print(f"build time       {elapsed * 1000:>12.1f} ms")
+    print(f"table bytes      {table_bytes:>12,}")
+    print(f"traced at build  {traced:>12,}")
+    print(f"lookups/s        {lookups:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Moves per second of GridModel across board sizes, against a full-board scan.
+
+The scan checks every k-long window on the board after each move, which is
+what a win check without the precomputed rays would cost.
+
+Usage
+-----
+    python -m benchmarks.bench_grid [--games N]
+"""
+import argparse
+import random
+import time
+from typing import List
+
+from tictactoe.grid import DIRECTIONS, GridModel
+
+
+BOARDS = ((3, 3), (7, 4), (15, 5), (19, 5))
+
+
+class ScanGridModel(GridModel):
+    """
+    GridModel with the winner found by scanning the whole board after every move.
+    """
+
+    __slots__ = ()
+
+    def move(self, index: int) -> None:
+        winner = self.winner
+        self.winner = "skip"  # keep GridModel.move from checking the rays
+        super().move(index)
+        self.winner = winner
+        if winner is None:
+            size, k, cells = self.size, self.k, self._cells
+            for start in range(size * size):
+                row, column = divmod(start, size)
+                code = cells[start]
+                if not code:
+                    continue
+                for dr, dc in DIRECTIONS:
+                    end_r, end_c = row + dr * (k - 1), column + dc * (k - 1)
+                    if not (0 <= end_r < size and 0 <= end_c < size):
+                        continue
+                    if all(cells[(row + dr * t) * size + column + dc * t] == code
+                           for t in range(1, k)):
+                        self.winner = "X" if code == 1 else "O"
+                        return
+
+
+def random_games(size: int, n: int, seed: int = 0) -> List[List[int]]:
+    rng = random.Random(seed)
+    games = []
+    for _ in range(n):
+        order = list(range(size * size))
+        rng.shuffle(order)
+        games.append(order)
+    return games
+
+
+def moves_per_second(cls, size: int, k: int, games: List[List[int]]) -> float:
+    moves = 0
+    start = time.perf_counter()
+    for order in games:
+        model = cls(size, k)
+        for index in order:
+            model.move(index)
+            moves += 1
+            if model.is_terminal():
+                break
+    return moves / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'board':<12} {'rays moves/s':>14} {'scan moves/s':>14} {'speedup':>8}")
+    for size, k in BOARDS:
+        games = random_games(size, args.games)
+        rays = moves_per_second(GridModel, size, k, games)
+        scan = moves_per_second(ScanGridModel, size, k, games)
+        print(f"{f'{size}x{size} k={k}':<12} {rays:>14,.0f} {scan:>14,.0f} {rays / scan:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
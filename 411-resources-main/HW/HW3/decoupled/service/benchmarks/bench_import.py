@@ -0,0 +1,118 @@
+"""
+Import time of the engine and web modules, and the cold start of the service.
+
+Each module is imported in a fresh interpreter under ``python -X importtime``
+and the cumulative time of its top-level import is reported (the median of
+``--runs``), along with whether Flask was loaded. The engine modules must
+import without Flask; ``--check`` exits with an error if one does, or if one
+takes longer than ``--budget-ms``.
+
+Cold start is the time from launching ``serve.py`` to the first successful
+health check. With ``--docker IMAGE`` the same is measured for
+``docker run`` of a built image, e.g. one built from this directory's
+Dockerfile.
+
+Usage
+-----
+    python -m benchmarks.bench_import [--runs N] [--check] [--budget-ms MS]
+                                      [--docker IMAGE]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Optional, Tuple
+
+from benchmarks.load_move import HttpClient
+from benchmarks.load_serve import free_port, SERVICE_DIR
+
+
+ENGINE = ("tictactoe", "tictactoe.model", "tictactoe.grid", "tictactoe.gametree",
+          "tictactoe.journal", "tictactoe.store")
+WEB = ("tictactoe.view", "tictactoe.controller", "app")
+
+
+def import_time(module: str) -> Tuple[float, bool]:
+    """
+    Imports a module in a fresh interpreter.
+
+    Returns
+    -------
+    Tuple[float, bool]
+        The cumulative import time in milliseconds, and whether Flask was loaded.
+    """
+    code = f"import sys, {module}; print('flask' in sys.modules)"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=SERVICE_DIR,
+                            capture_output=True, text=True, check=True)
+    cumulative = 0
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        # The module's own line is the one that is not indented.
+        if len(fields) == 3 and fields[2].rstrip() == f" {module}":
+            cumulative = int(fields[1])
+    return cumulative / 1e3, result.stdout.strip() == "True"
+
+
+def wait_for_health(url: str, process: subprocess.Popen, start: float,
+                    timeout: float = 60.0) -> Optional[float]:
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            return None
+        try:
+            if HttpClient(url).get("/tictactoe/health") == 200:
+                return time.perf_counter() - start
+        except OSError:
+            time.sleep(0.005)
+    return None
+
+
+def cold_start(command: List[str], url: str) -> Optional[float]:
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=SERVICE_DIR, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL, env=dict(os.environ, FLASK_DEBUG="0"))
+    try:
+        return wait_for_health(url, process, start)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--check", action="store_true",
+                        help="fail if an engine module imports Flask or is over budget")
+    parser.add_argument("--budget-ms", type=float, default=150.0)
+    parser.add_argument("--docker", metavar="IMAGE", help="also time `docker run IMAGE`")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'module':<22} {'import ms':>10} {'flask':>6}")
+    for module in ENGINE + WEB:
+        times, flask = [], False
+        for _ in range(args.runs):
+            elapsed, flask = import_time(module)
+            times.append(elapsed)
+        median = statistics.median(times)
+        print(f"{module:<22} {median:>10.1f} {'yes' if flask else 'no':>6}")
+        if module in ENGINE and (flask or median > args.budget_ms):
+            failures.append(module)
+
+    port = free_port()
+    seconds = cold_start([sys.executable, "serve.py", "--mode", "dev", "--host", "127.0.0.1",
+                          "--port", str(port)], f"http://127.0.0.1:{port}")
+    print(f"{'cold start, serve.py':<22} {seconds * 1e3 if seconds else float('nan'):>10.1f}")
+    if args.docker:
+        port = free_port()
+        seconds = cold_start(["docker", "run", "--rm", "-p", f"{port}:5000", args.docker],
+                             f"http://127.0.0.1:{port}")
+        print(f"{'cold start, docker':<22} {seconds * 1e3 if seconds else float('nan'):>10.1f}")
+
+    if args.check and failures:
+        sys.exit(f"Engine modules too slow or importing Flask: {', '.join(failures)}")
+
+
+if __name__ == "__main__":
+    main()
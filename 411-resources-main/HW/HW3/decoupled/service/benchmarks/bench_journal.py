@@ -0,0 +1,116 @@
+"""
+Append throughput of the move journal, and how fast games are replayed from it.
+
+Random 15×15, five-in-a-row games are played until the journal holds the
+requested number of moves. Only the time spent in the journal is counted
+towards the append rate. The same moves are also written as one JSON line
+per move, flushed every time, for comparison.
+
+Replay is timed for a sample of games, once from a journal with snapshots
+and once from one without, so every replay starts from the first move.
+
+Usage
+-----
+    python -m benchmarks.bench_journal [--moves N] [--sample N]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from typing import List, Tuple
+
+from tictactoe.grid import GridModel
+from tictactoe.journal import game_records, MoveJournal, replay
+
+
+SIZE, K = 15, 5
+
+
+def write(path: str, moves: int, snapshot_every: int, seed: int = 0) -> Tuple[float, List[str]]:
+    rng = random.Random(seed)
+    journal = MoveJournal(path, snapshot_every=snapshot_every)
+    spent = 0.0
+    game_ids: List[str] = []
+    clock = time.perf_counter
+    written = 0
+    while written < moves:
+        game_id = f"game-{len(game_ids)}"
+        game_ids.append(game_id)
+        model = GridModel(SIZE, K)
+        start = clock()
+        journal.new_game(game_id, model)
+        spent += clock() - start
+        order = list(range(SIZE * SIZE))
+        rng.shuffle(order)
+        for index in order:
+            player = model.player
+            model.move(index)
+            start = clock()
+            journal.moves(game_id, model, [index], player)
+            spent += clock() - start
+            written += 1
+            if model.winner is not None or written == moves:
+                break
+    start = clock()
+    journal.close()
+    spent += clock() - start
+    return written / spent, game_ids
+
+
+def write_json_lines(path: str, moves: int, seed: int = 0) -> float:
+    rng = random.Random(seed)
+    written = 0
+    start = time.perf_counter()
+    with open(path, "w") as fh:
+        while written < moves:
+            game_id = f"game-{written}"
+            for number, index in enumerate(rng.sample(range(SIZE * SIZE), 40), 1):
+                fh.write(json.dumps({"game": game_id, "move": number, "index": index,
+                                     "player": "XO"[number % 2]}) + "\n")
+                fh.flush()
+                written += 1
+                if written == moves:
+                    break
+    return written / (time.perf_counter() - start)
+
+
+def replay_ms(path: str, game_ids: List[str]) -> float:
+    start = time.perf_counter()
+    for game_id in game_ids:
+        replay(path, game_id)
+    return (time.perf_counter() - start) / len(game_ids) * 1e3
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--moves", type=int, default=1_000_000)
+    parser.add_argument("--sample", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        snapped = os.path.join(directory, "snapped.journal")
+        plain = os.path.join(directory, "plain.journal")
+        rate, game_ids = write(snapped, args.moves, snapshot_every=32)
+        write(plain, args.moves, snapshot_every=1 << 30)
+        lines = write_json_lines(os.path.join(directory, "moves.jsonl"), args.moves)
+        size = os.path.getsize(snapped) + os.path.getsize(snapped + ".snap")
+
+        print(f"{args.moves:,} moves in {len(game_ids):,} games, "
+              f"{size / 1e6:.1f} MB with snapshots ({size / args.moves:.1f} bytes/move)")
+        print(f"{'append, journal':<28} {rate:>12,.0f} moves/s")
+        print(f"{'append, JSON line + flush':<28} {lines:>12,.0f} moves/s")
+
+        sample = random.Random(1).sample(game_ids, min(args.sample, len(game_ids)))
+        start = time.perf_counter()
+        for game_id in sample:
+            game_records(snapped, game_id)
+        scan = (time.perf_counter() - start) / len(sample) * 1e3
+        print(f"{'find the records of a game':<28} {scan:>12.2f} ms/game")
+        print(f"{'replay, with snapshots':<28} {replay_ms(snapped, sample):>12.2f} ms/game")
+        print(f"{'replay, from the first move':<28} {replay_ms(plain, sample):>12.2f} ms/game")
+
+
+if __name__ == "__main__":
+    main()
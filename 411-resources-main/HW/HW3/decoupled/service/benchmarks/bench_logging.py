@@ -0,0 +1,53 @@
+"""
+Per-record cost on the calling thread of a synchronous stderr handler versus
+the queue-based pipeline in tictactoe.logs, plus the cost of a record that is
+gated off by level or dropped by sampling.
+
+Usage
+-----
+    python -m benchmarks.bench_logging [--records N] 2>/dev/null
+"""
+import argparse
+import logging
+import sys
+import time
+
+from tictactoe import logs
+
+
+def per_record(logger: logging.Logger, records: int, level: int = logging.INFO) -> float:
+    data = {"index": 4}
+    start = time.perf_counter()
+    for _ in range(records):
+        logger.log(level, 'Move request %s', data)
+    return (time.perf_counter() - start) / records * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=100_000)
+    args = parser.parse_args()
+
+    sync_logger = logging.getLogger("bench.sync")
+    sync_logger.propagate = False
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter(logs.FORMAT))
+    sync_logger.addHandler(handler)
+    sync_logger.setLevel(logging.INFO)
+
+    logs.setup_logging(queue_size=args.records)
+    queued = logging.getLogger("tictactoe.bench")
+    sampled = logs.route_logger("bench_sampled", sample_rate=0.01)
+
+    rows = (
+        ("sync stderr", per_record(sync_logger, args.records)),
+        ("queued", per_record(queued, args.records)),
+        ("sampled 1%", per_record(sampled, args.records)),
+        ("below level", per_record(queued, args.records, logging.DEBUG)),
+    )
+    for name, micros in rows:
+        print(f"{name:<12} {micros:>8.2f} us/record")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Overhead of the metrics decorator and timer, per call.
+
+Times an empty function, the same function under ``timed()``, an empty
+``timer()`` block, and a get_board_state request with and without the
+controller's decorator. Run with TICTACTOE_METRICS=0 to see the request
+with no metrics at all.
+
+Usage
+-----
+    python -m benchmarks.bench_metrics [--calls N]
+"""
+import argparse
+import time
+
+from flask import Flask
+
+from tictactoe import controller
+from tictactoe.metrics import Registry
+
+
+def per_call(func, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200_000)
+    args = parser.parse_args()
+
+    registry = Registry()
+
+    def noop():
+        pass
+
+    def block():
+        with registry.timer("block"):
+            pass
+
+    timed_noop = registry.timed("noop")(noop)
+    # With TICTACTOE_METRICS=0 there is no wrapper to strip.
+    board = getattr(controller.get_board_state, "__wrapped__", controller.get_board_state)
+    app = Flask(__name__)
+    with app.app_context():
+        plain = per_call(noop, args.calls)
+        cases = (
+            ("timed()", per_call(timed_noop, args.calls) - plain),
+            ("timer()", per_call(block, args.calls) - plain),
+        )
+        untimed = per_call(lambda: board("bench-metrics"), args.calls)
+        with_metrics = per_call(lambda: controller.get_board_state("bench-metrics"), args.calls)
+
+    print(f"{'case':<24} {'ns/call':>10}")
+    for name, ns in cases:
+        print(f"{name + ' overhead':<24} {ns:>10,.0f}")
+    print(f"{'board, undecorated':<24} {untimed:>10,.0f}")
+    print(f"{'board, decorated':<24} {with_metrics:>10,.0f}  "
+          f"(+{(with_metrics - untimed) / untimed:.1%})")
+
+
+if __name__ == "__main__":
+    main()
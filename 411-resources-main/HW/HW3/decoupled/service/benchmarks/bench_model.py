@@ -0,0 +1,127 @@
+"""
+Microbenchmark comparing the bitboard Model with a list-based model.
+
+Measures moves per second over full random games, random games per second
+played to the end (a win, or for the bitboard Model also an early draw), and
+the bytes held by one game after it has been played out.
+
+Usage
+-----
+    python -m benchmarks.bench_model [--games N]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from typing import List, Optional
+
+from tictactoe import Board, SQUARE_OCCUPIED_ERROR_MSG
+from tictactoe.model import Model
+
+
+LINES = [
+    (0, 1, 2), (3, 4, 5), (6, 7, 8),
+    (0, 3, 6), (1, 4, 7), (2, 5, 8),
+    (0, 4, 8), (2, 4, 6),
+]
+
+
+class ListModel:
+    """
+    The list-based model: a 9-element list of strings, rescanned after every move.
+    """
+
+    def __init__(self):
+        self.board = Board([""] * 9)
+        self.player = "X"
+        self.winner: Optional[str] = None
+
+    def change_player(self) -> None:
+        self.player = "O" if self.player == "X" else "X"
+
+    def set_winner(self) -> None:
+        squares = self.board.squares
+        for a, b, c in LINES:
+            if squares[a] and squares[a] == squares[b] == squares[c]:
+                self.winner = squares[a]
+                return
+
+    def get_board_state(self) -> Board:
+        return Board(list(self.board.squares))
+
+    def is_terminal(self) -> bool:
+        return self.winner is not None or "" not in self.board.squares
+
+    def move(self, index: int) -> None:
+        if self.board.squares[index] == "":
+            self.board.squares[index] = self.player
+            self.change_player()
+            self.set_winner()
+        else:
+            raise ValueError(SQUARE_OCCUPIED_ERROR_MSG)
+
+
+def random_games(n: int, seed: int = 0) -> List[List[int]]:
+    rng = random.Random(seed)
+    games = []
+    for _ in range(n):
+        order = list(range(9))
+        rng.shuffle(order)
+        games.append(order)
+    return games
+
+
+def moves_per_second(cls, games: List[List[int]]) -> float:
+    moves = 0
+    start = time.perf_counter()
+    for order in games:
+        model = cls()
+        for index in order:
+            model.move(index)
+            moves += 1
+            if model.winner is not None:
+                break
+    return moves / (time.perf_counter() - start)
+
+
+def games_per_second(cls, games: List[List[int]]) -> float:
+    start = time.perf_counter()
+    for order in games:
+        model = cls()
+        for index in order:
+            model.move(index)
+            if model.is_terminal():
+                break
+    return len(games) / (time.perf_counter() - start)
+
+
+def bytes_per_game(cls, games: List[List[int]]) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    models = []
+    for order in games:
+        model = cls()
+        for index in order[:5]:
+            model.move(index)
+        models.append(model)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(models)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=100_000)
+    args = parser.parse_args()
+
+    games = random_games(args.games)
+    print(f"{'model':<10} {'moves/s':>12} {'games/s':>12} {'bytes/game':>12}")
+    for name, cls in (("list", ListModel), ("bitboard", Model)):
+        rate = moves_per_second(cls, games)
+        finished = games_per_second(cls, games)
+        size = bytes_per_game(cls, games[:10_000])
+        print(f"{name:<10} {rate:>12,.0f} {finished:>12,.0f} {size:>12,.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Moves per second with several workers sharing the Redis game store.
+
+With ``--url`` each worker is a separate process on its own connection pool,
+all playing against the same Redis server. Without it, the workers are
+threads sharing one in-process fakeredis server, which shows the client-side
+cost but not real network round trips.
+
+Usage
+-----
+    python -m benchmarks.bench_redis_store [--workers 4] [--games 500] [--url redis://localhost:6379/0]
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import time
+
+from tictactoe.redis_store import RedisGameStore
+
+
+# X wins on the seventh move.
+GAME = [0, 3, 1, 4, 6, 5, 2]
+
+
+def play(store: RedisGameStore, worker: int, games: int) -> int:
+    for game in range(games):
+        game_id = f"bench-{worker}-{game}"
+        for index in GAME:
+            with store.locked(game_id) as model:
+                model.move(index)
+        store.delete(game_id)
+    return games * len(GAME)
+
+
+def play_on_url(args) -> int:
+    url, worker, games = args
+    return play(RedisGameStore(url), worker, games)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--games", type=int, default=500, help="games per worker")
+    parser.add_argument("--url", help="Redis URL; omit to use an in-process fakeredis server")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.url:
+        with ProcessPoolExecutor(args.workers) as pool:
+            moves = sum(pool.map(play_on_url, [(args.url, w, args.games)
+                                               for w in range(args.workers)]))
+    else:
+        import fakeredis
+        server = fakeredis.FakeServer()
+        stores = [RedisGameStore(client=fakeredis.FakeRedis(server=server))
+                  for _ in range(args.workers)]
+        with ThreadPoolExecutor(args.workers) as pool:
+            moves = sum(pool.map(play, stores, range(args.workers),
+                                 [args.games] * args.workers))
+    elapsed = time.perf_counter() - start
+    print(f"workers {args.workers}  moves {moves:,}  moves/s {moves / elapsed:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Self-play throughput from one process to all CPUs, against a Model loop.
+
+The baseline plays random games one at a time through ``Model.move``, the
+way a script would without ``tictactoe.selfplay``.
+
+Usage
+-----
+    python -m benchmarks.bench_selfplay [--games N] [--x POLICY] [--o POLICY]
+"""
+import argparse
+import os
+import random
+import time
+
+from tictactoe.model import Model
+from tictactoe.selfplay import POLICIES, self_play
+
+
+def model_loop(games: int, seed: int = 0) -> float:
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    for _ in range(games):
+        model = Model()
+        while not model.get_winner() and model.get_move_number() < 9:
+            squares = model.get_board_state().squares
+            model.move(rng.choice([i for i, square in enumerate(squares) if not square]))
+    return games / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=1_000_000)
+    parser.add_argument("--x", choices=POLICIES, default="random")
+    parser.add_argument("--o", choices=POLICIES, default="random")
+    args = parser.parse_args()
+
+    baseline = model_loop(min(args.games, 50_000))
+    print(f"{'Model loop':<16} {baseline:>12,.0f} games/s")
+    single = None
+    for workers in range(1, (os.cpu_count() or 1) + 1):
+        start = time.perf_counter()
+        for _ in self_play(args.games, args.x, args.o, workers):
+            pass
+        rate = args.games / (time.perf_counter() - start)
+        single = single or rate
+        print(f"{f'{workers} worker(s)':<16} {rate:>12,.0f} games/s "
+              f"{rate / baseline:>6.1f}x loop {rate / single / workers:>6.0%} efficiency")
+
+
+if __name__ == "__main__":
+    main()
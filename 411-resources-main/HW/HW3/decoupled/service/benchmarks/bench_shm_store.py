@@ -0,0 +1,68 @@
+"""
+Moves per second with several worker processes sharing the shared-memory game store.
+
+Every worker is a separate process opening the same store file, playing its
+own games. With ``--same-game`` they all write to one game instead, so
+every move contends for the same stripe lock.
+
+Usage
+-----
+    python -m benchmarks.bench_shm_store [--workers 4] [--games 2000] [--same-game]
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import os
+import tempfile
+import time
+
+from tictactoe.shm_store import SharedMemoryGameStore
+
+
+# X wins on the seventh move.
+GAME = [0, 3, 1, 4, 6, 5, 2]
+
+
+def play(args) -> int:
+    path, worker, games, same_game = args
+    store = SharedMemoryGameStore(path)
+    moves = 0
+    for game in range(games):
+        game_id = "bench" if same_game else f"bench-{worker}-{game}"
+        for index in GAME:
+            with store.locked(game_id) as model:
+                if same_game:
+                    # Keep the shared game going: fill the first free square,
+                    # or take a move back once the board is full.
+                    squares = model.get_board_state().squares
+                    if "" in squares:
+                        model.move(squares.index(""))
+                    else:
+                        model.undo()
+                else:
+                    model.move(index)
+            moves += 1
+        if not same_game:
+            store.delete(game_id)
+    return moves
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--games", type=int, default=2000, help="games per worker")
+    parser.add_argument("--same-game", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "games")
+        SharedMemoryGameStore(path).close()
+        start = time.perf_counter()
+        with ProcessPoolExecutor(args.workers) as pool:
+            moves = sum(pool.map(play, [(path, w, args.games, args.same_game)
+                                        for w in range(args.workers)]))
+        elapsed = time.perf_counter() - start
+    print(f"workers {args.workers}  moves {moves:,}  moves/s {moves / elapsed:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
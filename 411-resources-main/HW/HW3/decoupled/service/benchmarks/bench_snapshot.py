@@ -0,0 +1,110 @@
+"""
+Snapshot pause and restore times of the memory store at scale.
+
+The store is filled with ``--games`` games in random positions. Reported:
+
+pause
+    How long the store lock is held while a snapshot copies its table.
+snapshot
+    The whole snapshot: reading every game, encoding and writing the file.
+request p99
+    Latency of store reads from another thread while snapshots run,
+    against the same reads with no snapshot running.
+restore
+    Mapping the file, after which the store serves requests.
+first use
+    Looking up and building one restored game the first time it is used.
+
+Usage
+-----
+    python -m benchmarks.bench_snapshot [--games N]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from typing import List
+
+from tictactoe.snapshot import restore, Snapshotter
+from tictactoe.store import GameStore
+
+
+def fill(store: GameStore, games: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    game_ids = [f"game-{i}" for i in range(games)]
+    for game_id in game_ids:
+        with store.locked(game_id) as model:
+            model.move_many(rng.sample(range(9), rng.randint(0, 6)))
+    return game_ids
+
+
+def read_latencies(store: GameStore, game_ids: List[str], stop: threading.Event) -> List[float]:
+    rng = random.Random(1)
+    latencies = []
+    while not stop.is_set():
+        game_id = rng.choice(game_ids)
+        start = time.perf_counter()
+        with store.locked(game_id) as model:
+            model.get_board_state()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def p99(latencies: List[float]) -> float:
+    latencies = sorted(latencies)
+    return latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+
+
+def under_load(store: GameStore, game_ids: List[str], work) -> List[float]:
+    stop = threading.Event()
+    result: List[float] = []
+    reader = threading.Thread(target=lambda: result.extend(read_latencies(store, game_ids, stop)))
+    reader.start()
+    work()
+    stop.set()
+    reader.join()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=200_000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    store = GameStore(max_bytes=1 << 40)
+    game_ids = fill(store, args.games)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "games.snapshot")
+        snapshotter = Snapshotter(store, path)
+        stats = []
+        loaded = under_load(store, game_ids,
+                            lambda: stats.extend(snapshotter.snapshot() for _ in range(args.runs)))
+        idle = under_load(store, game_ids, lambda: time.sleep(sum(s.encode + s.write
+                                                                  for s in stats)))
+        best = min(stats, key=lambda s: s.encode + s.write)
+        print(f"{best.games:,} games, {best.bytes / 1e6:.1f} MB "
+              f"({best.bytes / best.games:.1f} bytes/game)")
+        print(f"{'pause':<26} {max(s.pause for s in stats) * 1e3:>10.2f} ms (worst)")
+        print(f"{'snapshot':<26} {(best.encode + best.write) * 1e3:>10.1f} ms "
+              f"(write {best.write * 1e3:.1f} ms)")
+        print(f"{'request p99, idle':<26} {p99(idle) * 1e6:>10.1f} us")
+        print(f"{'request p99, snapshotting':<26} {p99(loaded) * 1e6:>10.1f} us")
+
+        restored = GameStore(max_bytes=1 << 40)
+        start = time.perf_counter()
+        restore(restored, path)
+        elapsed = time.perf_counter() - start
+        print(f"{'restore':<26} {elapsed * 1e3:>10.1f} ms")
+        sample = random.Random(2).sample(game_ids, min(10_000, len(game_ids)))
+        start = time.perf_counter()
+        for game_id in sample:
+            with restored.locked(game_id) as model:
+                model.get_board_state()
+        print(f"{'first use':<26} {(time.perf_counter() - start) / len(sample) * 1e6:>10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Responses per second of the View against the jsonify path it replaced.
+
+Usage
+-----
+    python -m benchmarks.bench_view [--responses N]
+"""
+import argparse
+import time
+
+from flask import Flask, jsonify, make_response
+
+from tictactoe import Board, SQUARE_OCCUPIED_ERROR_MSG
+from tictactoe.view import View
+
+
+BOARD = Board(["X", "O", "", "", "X", "", "", "", "O"])
+
+
+def jsonify_board():
+    return make_response(jsonify({"board": BOARD.squares}), 200)
+
+def jsonify_winner():
+    return make_response(jsonify({"winner": "X"}), 200)
+
+def jsonify_error():
+    return make_response(jsonify({"error": SQUARE_OCCUPIED_ERROR_MSG}), 400)
+
+
+def rate(render, responses: int) -> float:
+    start = time.perf_counter()
+    for _ in range(responses):
+        render().get_data()
+    return responses / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--responses", type=int, default=100_000)
+    args = parser.parse_args()
+
+    view = View()
+    cases = (
+        ("board", jsonify_board, lambda: view.board_state(BOARD)),
+        ("winner", jsonify_winner, lambda: view.get_winner("X")),
+        ("error", jsonify_error, lambda: view.error(SQUARE_OCCUPIED_ERROR_MSG)),
+    )
+    app = Flask(__name__)
+    with app.app_context():
+        for _, old, new in cases:
+            assert old().get_data() == new().get_data()
+        print(f"{'response':<8} {'jsonify/s':>12} {'view/s':>12} {'speedup':>8}")
+        for name, old, new in cases:
+            before, after = rate(old, args.responses), rate(new, args.responses)
+            print(f"{name:<8} {before:>12,.0f} {after:>12,.0f} {after / before:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Load test comparing the per-move request patterns of the client.
+
+``legacy`` is what the client used to do for every click: POST move, then GET
+board and GET check_winner. ``single`` is one POST move whose response carries
+the whole game state. ``batch`` plays each game with a single POST moves.
+
+By default requests go through Flask's in-process test client, which measures
+the server-side cost only. Pass ``--url`` to drive a running server over HTTP
+with keep-alive connections, one per worker thread.
+
+Usage
+-----
+    python -m benchmarks.load_move [--games N] [--threads T] [--url http://host:5000]
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import http.client
+import json
+import statistics
+import time
+from typing import Callable, List
+from urllib.parse import urlsplit
+
+
+# X wins on the seventh move, so every game has the same length.
+GAME = [0, 3, 1, 4, 6, 5, 2]
+
+
+class HttpClient:
+    """
+    A keep-alive HTTP client with the subset of the Flask test client API used here.
+    """
+
+    def __init__(self, url: str):
+        parts = urlsplit(url)
+        self.conn = http.client.HTTPConnection(parts.hostname, parts.port or 80)
+
+    def _request(self, method: str, path: str, body: bytes = None) -> int:
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        self.conn.request(method, path, body=body, headers=headers)
+        response = self.conn.getresponse()
+        response.read()
+        return response.status
+
+    def get(self, path: str) -> int:
+        return self._request("GET", path)
+
+    def post(self, path: str, json_body: dict) -> int:
+        return self._request("POST", path, json.dumps(json_body).encode())
+
+
+class InProcessClient:
+    def __init__(self):
+        from app import app
+        self.client = app.test_client()
+
+    def get(self, path: str) -> int:
+        return self.client.get(path).status_code
+
+    def post(self, path: str, json_body: dict) -> int:
+        return self.client.post(path, json=json_body).status_code
+
+
+def play_legacy(client, game_id: str, latencies: List[float]) -> int:
+    for index in GAME:
+        start = time.perf_counter()
+        client.post(f"/tictactoe/{game_id}/move", {"index": index})
+        client.get(f"/tictactoe/{game_id}/board")
+        client.get(f"/tictactoe/{game_id}/check_winner")
+        latencies.append(time.perf_counter() - start)
+    return 3 * len(GAME)
+
+
+def play_single(client, game_id: str, latencies: List[float]) -> int:
+    for index in GAME:
+        start = time.perf_counter()
+        client.post(f"/tictactoe/{game_id}/move", {"index": index})
+        latencies.append(time.perf_counter() - start)
+    return len(GAME)
+
+
+def play_batch(client, game_id: str, latencies: List[float]) -> int:
+    start = time.perf_counter()
+    client.post(f"/tictactoe/{game_id}/moves", {"indices": GAME})
+    latencies.append((time.perf_counter() - start) / len(GAME))
+    return 1
+
+
+def run(mode: str, play: Callable, make_client: Callable, games: int, threads: int) -> None:
+    def worker(worker_id: int):
+        client = make_client()
+        latencies: List[float] = []
+        requests = 0
+        for game in range(worker_id, games, threads):
+            requests += play(client, f"load-{mode}-{game}", latencies)
+        return requests, latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(worker, range(threads)))
+    elapsed = time.perf_counter() - start
+
+    requests = sum(r for r, _ in results)
+    latencies = sorted(l for _, ls in results for l in ls)
+    moves = games * len(GAME)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{mode:<8} {requests / moves:>8.1f} {moves / elapsed:>10,.0f} "
+          f"{statistics.median(latencies) * 1e3:>10.3f} {p99 * 1e3:>10.3f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--url", help="base URL of a running server, e.g. http://localhost:5000")
+    args = parser.parse_args()
+
+    make_client = (lambda: HttpClient(args.url)) if args.url else InProcessClient
+    print(f"{'mode':<8} {'req/move':>8} {'moves/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for mode, play in (("legacy", play_legacy), ("single", play_single), ("batch", play_batch)):
+        run(mode, play, make_client, args.games, args.threads)
+
+
+if __name__ == "__main__":
+    main()
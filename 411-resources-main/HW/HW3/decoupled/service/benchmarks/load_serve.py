@@ -0,0 +1,107 @@
+"""
+Local load generator comparing the serving modes of serve.py on one box.
+
+Each mode is started as a subprocess on a free port. Then ``--clients`` load
+processes each hold one keep-alive connection and loop over a mix of reads
+and moves for ``--duration`` seconds. The load runs in separate processes so
+the client side is not limited by one GIL.
+
+Usage
+-----
+    python -m benchmarks.load_serve [--modes dev prefork asgi] [--workers 4]
+                                    [--clients 8] [--duration 10]
+"""
+import argparse
+from multiprocessing import Pool
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import List
+
+from benchmarks.load_move import HttpClient
+
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 20.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            if HttpClient(url).get("/tictactoe/healthcheck") == 200:
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def load(args) -> List[float]:
+    url, client_id, duration = args
+    client = HttpClient(url)
+    latencies = []
+    game = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        game_id = f"serve-{client_id}-{game}"
+        for index in (0, 3, 1, 4, 2):
+            start = time.perf_counter()
+            client.post(f"/tictactoe/{game_id}/move", {"index": index})
+            latencies.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            client.get(f"/tictactoe/{game_id}/state")
+            latencies.append(time.perf_counter() - start)
+        game += 1
+    return latencies
+
+
+def bench(mode: str, workers: int, clients: int, duration: float) -> None:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, FLASK_DEBUG="0")
+    process = subprocess.Popen(
+        [sys.executable, "serve.py", "--mode", mode, "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers)],
+        cwd=SERVICE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_until_up(url, process):
+            print(f"{mode:<8} did not start (exit code {process.poll()})")
+            return
+        with Pool(clients) as pool:
+            start = time.perf_counter()
+            results = pool.map(load, [(url, i, duration) for i in range(clients)])
+            elapsed = time.perf_counter() - start
+        latencies = sorted(l for result in results for l in result)
+        p50 = latencies[len(latencies) // 2]
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"{mode:<8} {workers:>7} {len(latencies) / elapsed:>10,.0f} "
+              f"{p50 * 1e3:>10.2f} {p99 * 1e3:>10.2f}")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modes", nargs="+", default=["dev", "prefork", "asgi"])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"{'mode':<8} {'workers':>7} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for mode in args.modes:
+        bench(mode, 1 if mode == "dev" else args.workers, args.clients, args.duration)
+
+
+if __name__ == "__main__":
+    main()
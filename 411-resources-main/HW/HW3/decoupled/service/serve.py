@@ -0,0 +1,158 @@
+"""
+Runs the tictactoe service in one of three serving modes.
+
+dev
+    The single-process Werkzeug development server, as ``python app.py``.
+prefork
+    The listening socket is bound once, then ``--workers`` processes are
+    forked and each serves it with a threaded Werkzeug server. Dead workers
+    are replaced.
+asgi
+    ``asgi:application`` under uvicorn with ``--workers`` processes. Stream
+    routes are served from the event loop. Needs ``pip install uvicorn``.
+
+The game store is chosen with ``--store`` (or TICTACTOE_STORE). With more
+than one worker, only a shared store lets every worker see the same games,
+and TICTACTOE_SNAPSHOT is ignored for the per-process memory store.
+
+Usage
+-----
+    python serve.py --mode prefork --workers 4 --keep-alive 5 --backlog 1024
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+
+logger = logging.getLogger("serve")
+
+
+def serve_dev(args) -> None:
+    from app import app
+    app.run(host=args.host, port=args.port, threaded=True,
+            debug=os.environ.get("FLASK_DEBUG") == "1")
+
+
+def serve_prefork(args) -> None:
+    from werkzeug.serving import make_server, WSGIRequestHandler
+
+    from app import app
+    from tictactoe.controller import JOURNAL, SNAPSHOTS
+
+    # The master serves nothing, so its games never change: its worker snapshots instead.
+    if SNAPSHOTS is not None:
+        SNAPSHOTS.release()
+
+    class KeepAliveHandler(WSGIRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Idle keep-alive connections are closed after this many seconds.
+        timeout = args.keep_alive
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(args.backlog)
+    sock.set_inheritable(True)
+
+    def spawn() -> int:
+        pid = os.fork()
+        if pid == 0:
+            server = make_server(args.host, args.port, app, threaded=True,
+                                 request_handler=KeepAliveHandler, fd=sock.fileno())
+
+            def shut_down(signum, frame):
+                # shutdown() waits for serve_forever() to return, so not from this thread.
+                threading.Thread(target=server.shutdown).start()
+
+            signal.signal(signal.SIGTERM, shut_down)
+            signal.signal(signal.SIGINT, shut_down)
+            if SNAPSHOTS is not None:
+                SNAPSHOTS.start()
+            server.serve_forever()
+            # os._exit skips atexit, so save this worker's games here.
+            if SNAPSHOTS is not None:
+                SNAPSHOTS.stop()
+            if JOURNAL is not None:
+                JOURNAL.close()
+            os._exit(0)
+        return pid
+
+    workers = {spawn() for _ in range(args.workers)}
+    logger.info('Serving on %s:%d with %d workers', args.host, args.port, len(workers))
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        workers.discard(pid)
+        if not stopping:
+            logger.warning('Worker %d exited with status %d, restarting', pid, status)
+            workers.add(spawn())
+    sock.close()
+
+
+def serve_asgi(args) -> None:
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("The asgi mode needs uvicorn: pip install uvicorn")
+    uvicorn.run("asgi:application", host=args.host, port=args.port, workers=args.workers,
+                backlog=args.backlog, timeout_keep_alive=int(args.keep_alive),
+                log_level="warning")
+
+
+MODES = {"dev": serve_dev, "prefork": serve_prefork, "asgi": serve_asgi}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=MODES, default="dev")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--keep-alive", type=float, default=5.0,
+                        help="seconds an idle keep-alive connection stays open")
+    parser.add_argument("--backlog", type=int, default=1024,
+                        help="length of the listen queue")
+    parser.add_argument("--store", help="game store backend (default: $TICTACTOE_STORE or memory)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.store:
+        os.environ["TICTACTOE_STORE"] = args.store
+    if args.mode == "dev":
+        args.workers = 1
+
+    from tictactoe.store import store_class
+    if args.workers > 1 and not store_class().shared:
+        logger.warning('The %s store is per process: each of the %d workers has its own games',
+                       os.environ.get("TICTACTOE_STORE", "memory"), args.workers)
+    if args.workers > 1 and os.environ.get("TICTACTOE_SNAPSHOT") and not store_class().shared:
+        # Each worker would have games of its own, and a snapshot could hold only one's.
+        logger.error('Snapshots of the %s store need a single worker; not snapshotting',
+                     os.environ.get("TICTACTOE_STORE", "memory"))
+        del os.environ["TICTACTOE_SNAPSHOT"]
+    if args.workers > 1 and "{pid}" not in os.environ.get("TICTACTOE_JOURNAL", "{pid}"):
+        logger.warning('TICTACTOE_JOURNAL has no {pid}: the %d workers would share one journal',
+                       args.workers)
+    MODES[args.mode](args)
+
+
+if __name__ == "__main__":
+    main()
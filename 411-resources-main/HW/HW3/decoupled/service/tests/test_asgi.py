@@ -0,0 +1,40 @@
+import asyncio
+import json
+
+from asgi import application
+
+
+def call(method, path, body=b"", headers=()):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json"), *headers],
+    }
+    asyncio.run(application(scope, receive, send))
+    start, body = messages
+    return start["status"], dict(start["headers"]), json.loads(body["body"])
+
+
+def test_move_through_asgi():
+    status, _, payload = call("POST", "/tictactoe/test-asgi/move", b'{"index": 2}')
+    assert status == 200
+    assert payload["board"][2] == "X"
+    status, headers, payload = call("GET", "/tictactoe/test-asgi/board")
+    assert status == 200
+    assert payload["board"][2] == "X"
+    assert headers[b"etag"].startswith(b'"board-')
+
+def test_error_through_asgi():
+    status, _, payload = call("POST", "/tictactoe/test-asgi-error/move", b'{"index": 9}')
+    assert status == 400
+    assert payload == {"error": "Invalid move"}
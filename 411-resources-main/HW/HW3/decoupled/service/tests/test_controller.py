@@ -1,7 +1,35 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
 import pytest
+from flask import Flask
+
+from tictactoe import (INVALID_BOARD_ERROR_MSG, INVALID_MOVE_ERROR_MSG,
+                       NOTHING_TO_UNDO_ERROR_MSG, SQUARE_OCCUPIED_ERROR_MSG)
+from tictactoe import controller
+from tictactoe.controller import (BROADCASTER, event_version, get_board_state, get_game_state,
+                                  journal_moves, make_move, make_moves, new_game, STORE,
+                                  undo_move, validate_index)
+from tictactoe.journal import game_records, MOVE_O, MOVE_X, MoveJournal
+from tictactoe.metrics import REGISTRY
+
+app = Flask(__name__)
 
-from tictactoe import INVALID_MOVE_ERROR_MSG
-from tictactoe.controller import validate_index
+@pytest.fixture
+def app_context():
+    with app.test_request_context():
+        yield
+
+@pytest.fixture
+def game_id():
+    # Every test plays a game of its own in the shared STORE, removed afterwards.
+    game_id = f"test-{uuid.uuid4().hex}"
+    yield game_id
+    STORE.delete(game_id)
 
 
 def test_validate_index():
@@ -12,4 +40,143 @@ def test_validate_index():
     with pytest.raises(ValueError, match=INVALID_MOVE_ERROR_MSG):
         validate_index("zero")
     validate_index(0)
-    validate_index(8)
\ No newline at end of file
+    validate_index(8)
+    validate_index(224, 225)
+
+def test_make_move_returns_game_state(app_context, game_id):
+    response = make_move(4, game_id)
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "board": ["", "", "", "", "X", "", "", "", ""],
+        "winner": None,
+        "player": "O",
+        "move_number": 1
+    }
+
+def test_make_moves(app_context, game_id):
+    response = make_moves([0, 3, 1, 4, 2], game_id)
+    assert response.status_code == 200
+    assert response.get_json()["winner"] == "X"
+    assert response.get_json()["move_number"] == 5
+
+def test_make_moves_is_atomic(app_context, game_id):
+    make_move(0, game_id)
+    response = make_moves([1, 2, 0], game_id)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": SQUARE_OCCUPIED_ERROR_MSG}
+    response = make_move(1, game_id)
+    assert response.get_json()["board"][:3] == ["X", "O", ""]
+
+@pytest.mark.parametrize("body", ["[0, 1]", "null", "3"])
+def test_moves_route_rejects_non_object_body(body):
+    from app import app as service
+    response = service.test_client().post("/tictactoe/test-moves-body/moves", data=body,
+                                          content_type="application/json")
+    assert response.status_code == 400
+    assert response.get_json() == {"error": INVALID_MOVE_ERROR_MSG}
+
+def test_conditional_get(app_context, game_id):
+    response = get_board_state(game_id)
+    etag, _ = response.get_etag()
+    assert get_board_state(game_id, {etag}).status_code == 304
+    make_move(0, game_id)
+    response = get_board_state(game_id, {etag})
+    assert response.status_code == 200
+    assert response.get_etag()[0] != etag
+
+def test_new_process_never_reuses_an_etag():
+    # Both processes play the same moves, so their games reach the same versions.
+    code = ("from flask import Flask; from tictactoe.controller import make_move\n"
+            "with Flask(__name__).test_request_context():\n"
+            "    print(make_move(4, 'test-etag').get_etag()[0])")
+    etags = {subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            check=True).stdout.strip() for _ in range(2)}
+    assert len(etags) == 2
+
+def test_forked_worker_never_reuses_an_etag(app_context, game_id):
+    etag = make_move(4, game_id).get_etag()[0]
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        with app.test_request_context():
+            os.write(write, get_board_state(game_id, {etag}).get_etag()[0].encode())
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.read(read, 256).decode() not in (etag, "")
+
+def test_event_version():
+    assert event_version(f"{STORE.epoch}-12") == 12
+    assert event_version("0123456789abcdef-12") is None
+    assert event_version("12") is None
+    assert event_version(f"{STORE.epoch}-x") is None
+    assert event_version(None) is None
+
+def test_long_poll(app_context, game_id):
+    etag, _ = get_game_state(game_id).get_etag()
+    assert get_game_state(game_id, {etag}, wait=0.01).status_code == 304
+
+    def move():
+        with app.test_request_context():
+            make_move(4, game_id)
+
+    threading.Timer(0.01, move).start()
+    response = get_game_state(game_id, {etag}, wait=5)
+    assert response.status_code == 200
+    assert response.get_json()["move_number"] == 1
+
+def test_long_poll_waits_out_a_wake_up_without_a_change(app_context, game_id):
+    etag, _ = get_game_state(game_id).get_etag()
+    threading.Timer(0.01, BROADCASTER.publish, args=(game_id,)).start()
+    start = time.monotonic()
+    assert get_game_state(game_id, {etag}, wait=0.2).status_code == 304
+    assert time.monotonic() - start >= 0.2
+
+def test_long_poll_wait_is_timed_apart(app_context, game_id):
+    reads = REGISTRY.histogram("tictactoe.controller.get_game_state")
+    waits = REGISTRY.histogram("tictactoe.controller.get_game_state.wait")
+    etag, _ = get_game_state(game_id).get_etag()
+    read_total, wait_count = reads.total, waits.count
+    assert get_game_state(game_id, {etag}, wait=0.2).status_code == 304
+    assert waits.count == wait_count + 1
+    assert reads.total - read_total < 0.1e9
+
+def test_new_game_on_a_larger_board(app_context, game_id):
+    response = new_game(game_id, 15, 5)
+    assert response.status_code == 200
+    assert len(response.get_json()["board"]) == 225
+    response = make_moves([0, 15, 1, 16, 2, 17, 3, 18, 4], game_id)
+    assert response.get_json()["winner"] == "X"
+    assert make_move(225, game_id).get_json() == {"error": INVALID_MOVE_ERROR_MSG}
+    response = new_game(game_id)
+    assert len(response.get_json()["board"]) == 9
+
+def test_new_game_rejects_bad_boards(app_context, game_id):
+    for size, k in ((2, 2), (20, 5), (5, 6), ("big", 3)):
+        assert new_game(game_id, size, k).get_json() == {"error": INVALID_BOARD_ERROR_MSG}
+
+def test_undo_move(app_context, game_id):
+    make_moves([0, 4], game_id)
+    response = undo_move(game_id)
+    assert response.status_code == 200
+    assert response.get_json()["board"] == ["X", "", "", "", "", "", "", "", ""]
+    assert response.get_json()["player"] == "O"
+    undo_move(game_id)
+    assert undo_move(game_id).get_json() == {"error": NOTHING_TO_UNDO_ERROR_MSG}
+
+def test_journal_records_the_player_redis_applied(monkeypatch, tmp_path):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    from tictactoe.redis_store import RedisGameStore
+
+    path = str(tmp_path / "moves.journal")
+    journal = MoveJournal(path)
+    monkeypatch.setattr(controller, "JOURNAL", journal)
+    store = RedisGameStore(client=fakeredis.FakeRedis())
+    with store.locked("a") as mine, store.locked("a") as theirs:
+        # Both loaded with X to move; the other worker's move lands first.
+        theirs.move(0)
+        journal_moves("a", theirs, [0])
+        mine.move_many([4, 8])
+        journal_moves("a", mine, [4, 8])
+    journal.close()
+    assert [record[3] for record in game_records(path, "a")] == [MOVE_X, MOVE_O, MOVE_X]
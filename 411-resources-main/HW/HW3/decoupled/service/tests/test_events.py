@@ -0,0 +1,162 @@
+import asyncio
+import os
+import threading
+import uuid
+
+import pytest
+from flask import Flask
+
+from tictactoe import stream
+from tictactoe.controller import make_move, state_events, STORE
+from tictactoe.events import Broadcaster, PollingBroadcaster
+from tictactoe.shm_store import SharedMemoryGameStore
+from tictactoe.stream import stream_app, stream_game_id
+
+app = Flask(__name__)
+
+@pytest.fixture
+def game_id():
+    # Every test plays a game of its own in the shared STORE, removed afterwards.
+    game_id = f"test-{uuid.uuid4().hex}"
+    yield game_id
+    STORE.delete(game_id)
+
+def test_publish_wakes_subscriber():
+    broadcaster = Broadcaster()
+    with broadcaster.subscribe("a") as subscription:
+        assert not subscription.wait(0)
+        assert broadcaster.publish("a") == 1
+        assert broadcaster.publish("b") == 0
+        assert subscription.wait(0)
+        assert not subscription.wait(0)
+    assert len(broadcaster) == 0
+
+def test_publish_from_another_thread_wakes_async_subscriber():
+    broadcaster = Broadcaster()
+
+    async def watch():
+        async with broadcaster.subscribe_async("a") as subscription:
+            threading.Timer(0.01, broadcaster.publish, args=("a",)).start()
+            return await subscription.wait(5)
+
+    assert asyncio.run(watch())
+    assert len(broadcaster) == 0
+
+def test_state_events(game_id):
+    events = state_events(game_id, None, heartbeat=0.01)
+    assert b'"move_number":0' in next(events)
+    assert next(events) == b": keep-alive\n\n"
+    with app.test_request_context():
+        make_move(4, game_id)
+    assert b'"move_number":1' in next(events)
+    events.close()
+
+def test_stream_game_id():
+    assert stream_game_id("/tictactoe/stream") == "default"
+    assert stream_game_id("/tictactoe/abc/stream") == "abc"
+    assert stream_game_id("/tictactoe/abc/board") is None
+
+def test_stream_app(game_id):
+    sent = []
+
+    async def run():
+        disconnect = asyncio.Event()
+
+        async def receive():
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            if len(sent) == 3:
+                disconnect.set()
+
+        def move():
+            with app.test_request_context():
+                make_move(0, game_id)
+
+        scope = {"type": "http", "path": f"/tictactoe/{game_id}/stream", "headers": []}
+        task = asyncio.ensure_future(stream_app(scope, receive, send, heartbeat=0.05))
+        await asyncio.sleep(0.01)
+        await asyncio.get_running_loop().run_in_executor(None, move)
+        await asyncio.wait_for(task, 5)
+
+    asyncio.run(run())
+    assert sent[0]["status"] == 200
+    assert b'"move_number":0' in sent[1]["body"]
+    assert b'"move_number":1' in sent[2]["body"]
+
+def test_stream_app_reads_the_game_off_the_loop(monkeypatch):
+    threads = []
+
+    def reading(game_id, last_version):
+        threads.append(threading.current_thread())
+        return None, last_version
+
+    monkeypatch.setattr(stream, "next_state_event", reading)
+
+    async def run():
+        async def receive():
+            await asyncio.sleep(0.05)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            pass
+
+        scope = {"type": "http", "path": "/tictactoe/test-stream-reads/stream", "headers": []}
+        await asyncio.wait_for(stream.stream_app(scope, receive, send, heartbeat=0.01), 5)
+
+    asyncio.run(run())
+    assert threads and threading.main_thread() not in threads
+
+def test_polling_broadcaster_sees_outside_changes():
+    versions = {"a": 1}
+    broadcaster = PollingBroadcaster(versions.get, interval=0.01)
+    with broadcaster.subscribe("a") as subscription:
+        assert not subscription.wait(0.05)
+        versions["a"] = 2
+        assert subscription.wait(5)
+        assert not subscription.wait(0.05)
+
+def test_shared_memory_broadcaster_sees_other_processes(tmp_path):
+    path = str(tmp_path / "games")
+    store = SharedMemoryGameStore(path, max_games=64, stripes=4)
+    broadcaster = store.broadcaster(interval=0.01)
+    with broadcaster.subscribe("a") as subscription:
+        pid = os.fork()
+        if pid == 0:
+            with SharedMemoryGameStore(path, max_games=64, stripes=4).locked("a") as model:
+                model.move(4)
+            os._exit(0)
+        os.waitpid(pid, 0)
+        assert subscription.wait(5)
+
+def test_redis_broadcaster_relays_between_broadcasters():
+    fakeredis = pytest.importorskip("fakeredis")
+    from tictactoe.redis_store import RedisBroadcaster
+
+    server = fakeredis.FakeServer()
+    here = RedisBroadcaster(fakeredis.FakeRedis(server=server))
+    there = RedisBroadcaster(fakeredis.FakeRedis(server=server))
+    with here.subscribe("a") as subscription:
+        assert there.publish("a") == 0
+        assert subscription.wait(5)
+        assert here.publish("a") == 1
+        assert subscription.wait(0)
+        # Its own message coming back over the channel is not a second wake-up.
+        assert not subscription.wait(0.2)
+
+def test_redis_broadcaster_wakes_async_subscribers():
+    fakeredis = pytest.importorskip("fakeredis")
+    from tictactoe.redis_store import RedisBroadcaster
+
+    server = fakeredis.FakeServer()
+    here = RedisBroadcaster(fakeredis.FakeRedis(server=server))
+    there = RedisBroadcaster(fakeredis.FakeRedis(server=server))
+
+    async def watch():
+        async with here.subscribe_async("a") as subscription:
+            there.publish("a")
+            return await subscription.wait(5)
+
+    assert asyncio.run(watch())
@@ -0,0 +1,46 @@
+import random
+
+from tictactoe import gametree
+from tictactoe.model import Model
+
+
+def test_position_count():
+    assert gametree.POSITIONS == 5478
+
+def test_empty_board_is_a_draw():
+    assert gametree.value(0) == 0
+    assert gametree.winner(0) is None
+
+def test_terminal_winner():
+    key = gametree.position_key(0b000000111, 0b000011000)
+    assert gametree.winner(key) == "X"
+    assert gametree.best_move(key) is None
+
+def test_unreachable_position():
+    key = gametree.position_key(0b000000111, 0)
+    assert gametree.value(key) is None
+
+def test_best_move_takes_the_win():
+    model = Model()
+    for index in (0, 3, 1, 4):
+        model.move(index)
+    assert model.best_move() == 2
+
+def test_best_move_blocks():
+    model = Model()
+    for index in (0, 4, 8, 2):
+        model.move(index)
+    assert model.best_move() == 6
+
+def test_best_move_never_loses():
+    rng = random.Random(411)
+    for game in range(200):
+        model = Model()
+        ai = "X" if game % 2 else "O"
+        while model.get_winner() is None and model.best_move() is not None:
+            if model.get_current_player() == ai:
+                model.move(model.best_move())
+            else:
+                squares = model.get_board_state().squares
+                model.move(rng.choice([i for i, s in enumerate(squares) if s == ""]))
+        assert model.get_winner() in (None, ai)
@@ -0,0 +1,97 @@
+import pytest
+
+from tictactoe import (INVALID_BOARD_ERROR_MSG, NOTHING_TO_UNDO_ERROR_MSG,
+                       SQUARE_OCCUPIED_ERROR_MSG)
+from tictactoe.grid import GridModel, rays
+from tictactoe.model import Model
+
+
+def test_rays_stop_at_the_edge_and_at_k():
+    table = rays(5, 3)
+    # Square 0: right, down, down-right, and nothing down-left.
+    assert table[0] == (((1, 2), ()), ((5, 10), ()), ((6, 12), ()), ((), ()))
+    assert table[12][0] == ((13, 14), (11, 10))
+
+def test_win_in_each_direction():
+    for line in ([0, 1, 2, 3, 4], [0, 15, 30, 45, 60], [0, 16, 32, 48, 64],
+                 [4, 18, 32, 46, 60]):
+        model = GridModel(15, 5)
+        free = iter(i for i in range(100, 225) if i not in line)
+        for index in line[:-1]:
+            model.move(index)
+            model.move(next(free))
+        assert model.winner is None
+        model.move(line[-1])
+        assert model.winner == "X"
+        assert model.is_terminal()
+
+def test_win_through_the_middle_of_a_line():
+    model = GridModel(7, 4)
+    model.move_many([0, 20, 1, 21, 3, 22])
+    assert model.winner is None
+    model.move(2)
+    assert model.winner == "X"
+
+def test_draw_when_full():
+    model = GridModel(3, 3)
+    model.move_many([0, 1, 2, 4, 3, 5, 7, 6, 8])
+    assert model.winner is None
+    assert model.is_draw()
+
+@pytest.mark.parametrize("engine", [Model, lambda: GridModel(3, 3)])
+def test_draws_mean_the_same_in_both_engines(engine):
+    model = engine()
+    # X O X / X O O / O X _ : nobody can win, but one square is still free.
+    model.move_many([0, 1, 2, 4, 3, 5, 7, 6])
+    assert model.is_dead_draw()
+    assert not model.is_draw() and not model.is_terminal()
+    model.move(8)
+    assert model.is_dead_draw() and model.is_draw() and model.is_terminal()
+
+def test_dead_draw_on_a_larger_board():
+    model = GridModel(5, 4)
+    moves = [13, 18, 9, 5, 16, 21, 2, 1, 6, 12, 15, 14, 23, 7, 8, 10, 17]
+    model.move_many(moves[:-1])
+    assert not model.is_dead_draw()
+    model.move(moves[-1])
+    # Every run of four holds both marks, with eight squares still free.
+    assert model.winner is None
+    assert model.is_dead_draw()
+    assert not model.is_draw() and not model.is_terminal()
+
+def test_move_occupied_and_atomic_batch():
+    model = GridModel(9, 5)
+    model.move(40)
+    with pytest.raises(ValueError, match=SQUARE_OCCUPIED_ERROR_MSG):
+        model.move_many([41, 40])
+    assert model.get_move_number() == 1
+    assert model.player == "O"
+
+def test_best_move_wins_then_blocks():
+    model = GridModel(9, 4)
+    model.move_many([0, 80, 1, 79, 2])
+    # O must block X at 3.
+    assert model.best_move() == 3
+    model.move(60)
+    # X completes the row.
+    assert model.best_move() == 3
+
+def test_invalid_board():
+    with pytest.raises(ValueError, match=INVALID_BOARD_ERROR_MSG):
+        GridModel(20, 5)
+
+def test_undo():
+    model = GridModel(7, 4)
+    model.move_many([0, 7, 1, 8, 2, 9, 3])
+    assert model.winner == "X"
+    assert model.undo() == 3
+    assert model.winner is None
+    assert model.player == "X"
+    assert model.get_move_number() == 6
+    model.move(30)
+    model.move(10)
+    assert model.winner == "O"
+    for _ in range(8):
+        model.undo()
+    with pytest.raises(ValueError, match=NOTHING_TO_UNDO_ERROR_MSG):
+        model.undo()
@@ -0,0 +1,140 @@
+import os
+import threading
+
+import pytest
+
+from tictactoe import INVALID_MOVE_ERROR_MSG
+from tictactoe.grid import GridModel
+from tictactoe.journal import game_records, MoveJournal, NEW, replay, SNAPSHOT_RECORD, UNDO
+from tictactoe.model import Model
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "moves.journal")
+
+def play(journal, game_id, model, indices):
+    for index in indices:
+        player = model.get_current_player()
+        model.move(index)
+        journal.moves(game_id, model, [index], player)
+
+def test_replay_to_any_move(path):
+    journal = MoveJournal(path, snapshot_every=2)
+    model = Model()
+    play(journal, "a", model, [4, 0, 8, 2])
+    play(journal, "b", Model(), [1])
+    journal.close()
+    assert replay(path, "a").get_board_state().squares == model.get_board_state().squares
+    assert replay(path, "a", 1).get_board_state().squares == ["", "", "", "", "X", "", "", "", ""]
+    assert replay(path, "a", 3).get_current_player() == "O"
+    assert replay(path, "b").get_move_number() == 1
+    with pytest.raises(ValueError, match=INVALID_MOVE_ERROR_MSG):
+        replay(path, "a", 5)
+
+def test_replay_an_unknown_game(path):
+    journal = MoveJournal(path)
+    play(journal, "a", Model(), [4])
+    journal.close()
+    with pytest.raises(KeyError):
+        replay(path, "b")
+    with pytest.raises(KeyError):
+        replay(path, "b", 0)
+    with pytest.raises(ValueError, match=INVALID_MOVE_ERROR_MSG):
+        replay(path, "a", 2)
+
+def test_undo_below_a_snapshot(path):
+    journal = MoveJournal(path, snapshot_every=2)
+    model = Model()
+    play(journal, "a", model, [0, 1, 2])
+    for _ in range(3):
+        journal.undo("a", model, model.undo())
+    play(journal, "a", model, [5])
+    journal.close()
+    kinds = [record[3] for record in game_records(path, "a")]
+    assert SNAPSHOT_RECORD in kinds and kinds.count(UNDO) == 3
+    assert replay(path, "a").get_board_state().squares == model.get_board_state().squares
+    assert replay(path, "a", 2).get_board_state().squares[:3] == ["X", "O", ""]
+
+def test_new_game_on_a_larger_board(path):
+    journal = MoveJournal(path, snapshot_every=4)
+    journal.new_game("a", Model())
+    model = GridModel(9, 4)
+    journal.new_game("a", model)
+    play(journal, "a", model, [0, 40, 1, 41, 2, 42, 3])
+    journal.close()
+    assert game_records(path, "a")[1][3] == NEW
+    replayed = replay(path, "a")
+    assert (replayed.size, replayed.k) == (9, 4)
+    assert replayed.winner == "X"
+    assert replayed.get_board_state().squares == model.get_board_state().squares
+    assert replay(path, "a", 0).get_move_number() == 0
+
+def test_reopen_appends(path):
+    journal = MoveJournal(path)
+    play(journal, "a", Model(), [0])
+    journal.close()
+    journal = MoveJournal(path)
+    model = replay(path, "a")
+    play(journal, "a", model, [1])
+    journal.close()
+    assert replay(path, "a").get_board_state().squares[:2] == ["X", "O"]
+
+def test_rejects_other_files(path):
+    with open(path, "wb") as fh:
+        fh.write(b"not a journal")
+    with pytest.raises(ValueError):
+        MoveJournal(path)
+
+def test_reopen_cuts_off_a_partial_record(path):
+    journal = MoveJournal(path, snapshot_every=2)
+    model = Model()
+    play(journal, "a", model, [0, 1])
+    journal.close()
+    # A crash mid-write: half a record, and the start of a snapshot.
+    with open(path, "ab") as fh:
+        fh.write(b"\x01" * 7)
+    with open(path + ".snap", "ab") as fh:
+        fh.write(b"\x03\x03")
+    journal = MoveJournal(path, snapshot_every=2)
+    play(journal, "a", model, [2, 3, 4])
+    journal.close()
+    assert replay(path, "a").get_board_state().squares == model.get_board_state().squares
+    assert replay(path, "a", 4).get_move_number() == 4
+    assert [record[2] for record in game_records(path, "a")].count(4) == 2
+
+def test_reopen_after_a_partial_header(path):
+    with open(path, "wb") as fh:
+        fh.write(b"TTT")
+    journal = MoveJournal(path)
+    play(journal, "a", Model(), [4])
+    journal.close()
+    assert replay(path, "a").get_move_number() == 1
+
+def test_forked_child_writes_its_own_journal(tmp_path):
+    template = str(tmp_path / "moves-{pid}.journal")
+    journal = MoveJournal(template, flush_interval=0.01)
+    play(journal, "a", Model(), [4])
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            play(journal, "b", Model(), [0])
+            flushers = [thread for thread in threading.enumerate()
+                        if thread.name == "journal-flush"]
+            # Written by the child's own flush thread, without a close.
+            if journal.path == template.format(pid=os.getpid()) and flushers:
+                threading.Event().wait(0.5)
+                code = 0 if replay(journal.path, "b").get_move_number() == 1 else 1
+        finally:
+            os._exit(code)
+    _, status = os.waitpid(pid, 0)
+    journal.close()
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert journal.path == template.format(pid=os.getpid())
+    assert replay(journal.path, "a").get_move_number() == 1
+    with pytest.raises(KeyError):
+        replay(journal.path, "b")
+    child = template.format(pid=pid)
+    with pytest.raises(KeyError):
+        replay(child, "a")
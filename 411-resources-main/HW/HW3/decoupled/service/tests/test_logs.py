@@ -0,0 +1,42 @@
+import logging
+import queue
+
+from tictactoe import logs
+
+
+def make_record(level=logging.INFO):
+    return logging.LogRecord("tictactoe.test", level, __file__, 1, "message %s", ("arg",), None)
+
+def test_dropping_queue_handler():
+    handler = logs.DroppingQueueHandler(queue.Queue(1))
+    handler.handle(make_record())
+    handler.handle(make_record())
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
+
+def test_sampling_filter():
+    never = logs.SamplingFilter(0.0)
+    assert not never.filter(make_record(logging.INFO))
+    assert never.filter(make_record(logging.WARNING))
+    assert logs.SamplingFilter(1.0).filter(make_record(logging.INFO))
+
+def test_setup_logging_is_idempotent():
+    handler = logs.setup_logging()
+    assert logs.setup_logging() is handler
+    package_logger = logging.getLogger(logs.PACKAGE_LOGGER)
+    assert package_logger.handlers.count(handler) == 1
+
+def test_add_listener_handler_is_idempotent():
+    handler = logging.NullHandler()
+    logs.add_listener_handler(handler)
+    logs.add_listener_handler(handler)
+    assert logs._listener.handlers.count(handler) == 1
+
+def test_route_logger_sampling(monkeypatch):
+    monkeypatch.setenv("TICTACTOE_LOG_SAMPLE", "sampled=0.25")
+    logger = logs.route_logger("sampled")
+    assert logs.route_logger("sampled") is logger
+    filters = [f for f in logger.filters if isinstance(f, logs.SamplingFilter)]
+    assert len(filters) == 1
+    assert filters[0].rate == 0.25
+    assert not logs.route_logger("unsampled").filters
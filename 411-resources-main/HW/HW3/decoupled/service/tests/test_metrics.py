@@ -0,0 +1,87 @@
+import json
+import threading
+
+import pytest
+
+from tictactoe import metrics
+
+
+def test_histogram_percentiles():
+    histogram = metrics.Histogram()
+    for us in range(1, 101):
+        histogram.record(us * 1000)
+    assert histogram.count == 100
+    assert histogram.total == sum(range(1, 101)) * 1000
+    # Accurate to one bucket, and never above the largest value.
+    assert 50e-6 <= histogram.percentile(0.5) <= 50e-6 * 2 ** 0.25
+    assert 99e-6 <= histogram.percentile(0.99) <= 100e-6
+    assert histogram.percentile(1.0) == 100e-6
+
+def test_empty_histogram():
+    summary = metrics.Histogram().snapshot()
+    assert summary["count"] == 0
+    assert summary["p99"] == 0.0
+
+def test_timed_counts_calls_and_errors():
+    registry = metrics.Registry()
+
+    @registry.timed("f")
+    def f(fail=False):
+        if fail:
+            raise ValueError
+        return 1
+
+    assert f() == 1
+    with pytest.raises(ValueError):
+        f(fail=True)
+    assert registry.snapshot()["f"]["count"] == 2
+
+def test_timed_default_name():
+    registry = metrics.Registry()
+
+    @registry.timed()
+    def g():
+        pass
+
+    g()
+    assert f"{__name__}.test_timed_default_name.<locals>.g" in registry.snapshot()
+
+def test_disabled_registry_returns_function():
+    def h():
+        pass
+    assert metrics.Registry(enabled=False).timed()(h) is h
+
+def test_timer_is_thread_safe():
+    registry = metrics.Registry()
+
+    def work():
+        for _ in range(1000):
+            with registry.timer("block"):
+                pass
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert registry.snapshot()["block"]["count"] == 8000
+
+def test_exports():
+    registry = metrics.Registry()
+    with registry.timer("block"):
+        pass
+    assert json.loads(registry.to_json())["block"]["count"] == 1
+    text = registry.to_text()
+    assert 'tictactoe_call_seconds{name="block",quantile="0.99"}' in text
+    assert 'tictactoe_call_seconds_count{name="block"} 1' in text
+    registry.reset()
+    assert registry.snapshot()["block"]["count"] == 0
+
+def test_metrics_route():
+    from app import app
+    client = app.test_client()
+    client.get("/tictactoe/test-metrics/board")
+    response = client.get("/metrics?format=json")
+    assert response.status_code == 200
+    assert response.get_json()["tictactoe.controller.get_board_state"]["count"] >= 1
+    assert b"tictactoe_call_seconds_count" in client.get("/metrics").data
@@ -1,6 +1,9 @@
+import subprocess
+import sys
+
 import pytest
 
-from tictactoe import Board, SQUARE_OCCUPIED_ERROR_MSG
+from tictactoe import Board, NOTHING_TO_UNDO_ERROR_MSG, SQUARE_OCCUPIED_ERROR_MSG
 from tictactoe.model import Model
 
 
@@ -65,4 +68,70 @@ def test_move_occupied(model):
     model.board.squares = ["X", "O", "X", "O", "X", "O", "", "", ""]
     with pytest.raises(ValueError,
                        match=SQUARE_OCCUPIED_ERROR_MSG):
-        model.move(0)
\ No newline at end of file
+        model.move(0)
+
+def test_get_move_number(model):
+    assert model.get_move_number() == 0
+    model.move(4)
+    model.move(0)
+    assert model.get_move_number() == 2
+
+def test_snapshot_restore(model):
+    model.move(4)
+    snapshot = model.snapshot()
+    model.move(0)
+    model.restore(snapshot)
+    assert model.board.squares == ["", "", "", "", "X", "", "", "", ""]
+    assert model.player == "O"
+
+def test_dead_draw_detected_before_board_is_full(model):
+    # X O X / X O O / O X _ : every line holds both marks, one square early.
+    for index in (0, 1, 2, 4, 3, 5, 7, 6):
+        model.move(index)
+    assert model.winner is None
+    assert model.is_dead_draw()
+    assert not model.is_draw()
+    assert not model.is_terminal()
+    model.move(8)
+    assert model.is_draw() and model.is_dead_draw()
+    assert model.is_terminal()
+
+def test_terminal_on_win(model):
+    for index in (0, 3, 1, 4, 2):
+        model.move(index)
+    assert model.winner == "X"
+    assert not model.is_draw()
+    assert not model.is_dead_draw()
+    assert model.is_terminal()
+
+def test_counters_follow_direct_assignment(model):
+    model.move(4)
+    assert not model.is_terminal()
+    model.board.squares = ["X", "O", "X", "X", "O", "O", "O", "X", ""]
+    assert model.is_dead_draw()
+    model.board.squares = ["X", "X", "", "O", "O", "", "", "", ""]
+    model.player = "X"
+    model.move(2)
+    assert model.winner == "X"
+
+def test_undo(model):
+    model.move_many([0, 3, 1, 4, 2])
+    assert model.winner == "X"
+    assert model.undo() == 2
+    assert model.winner is None
+    assert model.player == "X"
+    assert model.get_board_state().squares == ["X", "X", "", "O", "O", "", "", "", ""]
+    model.move(5)
+    assert model.player == "O"
+    while model.get_move_number():
+        model.undo()
+    with pytest.raises(ValueError, match=NOTHING_TO_UNDO_ERROR_MSG):
+        model.undo()
+    assert model.player == "X"
+
+def test_engine_imports_without_flask():
+    code = ("import sys, tictactoe.model, tictactoe.grid, tictactoe.gametree; "
+            "print(sorted(m for m in ('flask', 'werkzeug') if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            check=True)
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,94 @@
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from tictactoe import NOTHING_TO_UNDO_ERROR_MSG, SQUARE_OCCUPIED_ERROR_MSG
+from tictactoe.redis_store import RedisGameStore
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+@pytest.fixture
+def store(server):
+    return RedisGameStore(client=fakeredis.FakeRedis(server=server))
+
+def test_new_game_is_empty(store):
+    with store.locked("a") as model:
+        assert model.get_board_state().squares == [""] * 9
+        assert model.get_current_player() == "X"
+        assert model.get_winner() is None
+    assert store.version("a") is None
+
+def test_move(store):
+    with store.locked("a") as model:
+        model.move(4)
+        assert model.get_board_state().squares[4] == "X"
+        assert model.get_current_player() == "O"
+    assert store.version("a") == model.version
+
+def test_move_occupied(store):
+    with store.locked("a") as model:
+        model.move(4)
+    with store.locked("a") as model:
+        with pytest.raises(ValueError, match=SQUARE_OCCUPIED_ERROR_MSG):
+            model.move(4)
+
+def test_winner(store):
+    with store.locked("a") as model:
+        model.move_many([0, 3, 1, 4, 2])
+        assert model.get_winner() == "X"
+    with store.locked("a") as model:
+        assert model.get_winner() == "X"
+
+def test_move_many_is_atomic(store):
+    with store.locked("a") as model:
+        model.move(0)
+        version = model.version
+        with pytest.raises(ValueError):
+            model.move_many([1, 2, 0])
+    assert store.version("a") == version
+    with store.locked("a") as model:
+        assert model.get_board_state().squares[:3] == ["X", "", ""]
+
+def test_stores_share_games(server, store):
+    other = RedisGameStore(client=fakeredis.FakeRedis(server=server))
+    with store.locked("a") as model:
+        model.move(8)
+    with other.locked("a") as model:
+        assert model.get_board_state().squares[8] == "X"
+        model.move(0)
+    with store.locked("a") as model:
+        assert model.get_board_state().squares[0] == "O"
+
+def test_stores_share_an_epoch(server, store):
+    other = RedisGameStore(client=fakeredis.FakeRedis(server=server))
+    assert store.epoch == other.epoch
+    fresh = RedisGameStore(client=fakeredis.FakeRedis(server=fakeredis.FakeServer()))
+    assert fresh.epoch != store.epoch
+
+def test_delete(store):
+    with store.locked("a") as model:
+        model.move(8)
+    assert "a" in store
+    store.delete("a")
+    assert "a" not in store
+
+def test_undo(store):
+    with store.locked("a") as model:
+        model.move_many([0, 3, 1, 4, 2])
+    with store.locked("a") as model:
+        assert model.undo() == 2
+        assert model.get_winner() is None
+        assert model.get_current_player() == "X"
+    assert store.version("a") == model.version
+    with store.locked("a") as model:
+        assert model.get_board_state().squares[:3] == ["X", "X", ""]
+        model.undo()
+        model.undo()
+        model.undo()
+        model.undo()
+        with pytest.raises(ValueError, match=NOTHING_TO_UNDO_ERROR_MSG):
+            model.undo()
@@ -0,0 +1,42 @@
+import pytest
+
+from tictactoe.model import Model
+from tictactoe.selfplay import (decode, iter_records, play_games, read_games, self_play,
+                                write_games)
+
+
+def test_games_replay_through_model():
+    for outcome, length, moves in map(decode, iter_records(play_games(500, seed=1))):
+        model = Model()
+        for index in moves:
+            assert model.winner is None
+            model.move(index)
+        assert model.get_move_number() == length
+        assert (model.winner or "draw") == outcome
+        assert model.is_terminal()
+
+def test_optimal_play():
+    games = [decode(record) for record in iter_records(play_games(200, "optimal", "optimal"))]
+    assert {outcome for outcome, _, _ in games} == {"draw"}
+    games = [decode(record) for record in iter_records(play_games(500, "random", "optimal"))]
+    assert "X" not in {outcome for outcome, _, _ in games}
+
+def test_first_free_square():
+    assert decode(next(iter_records(play_games(1, "first", "first")))) == ("X", 7, list(range(7)))
+
+def test_results_do_not_depend_on_workers():
+    one = b"".join(self_play(300, workers=1, task_size=100, seed=7))
+    two = b"".join(self_play(300, workers=2, task_size=100, seed=7))
+    assert one == two
+    assert len(one) == 300 * 6
+
+def test_write_and_read(tmp_path):
+    path = str(tmp_path / "games.bin")
+    summary = write_games(path, self_play(250, workers=1, task_size=100))
+    games = list(read_games(path))
+    assert summary.games == len(games) == 250
+    assert summary.outcomes[1] == sum(1 for outcome, _, _ in games if outcome == "X")
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        next(self_play(10, "clever", workers=1))
@@ -0,0 +1,142 @@
+import gc
+import logging
+import multiprocessing
+import random
+
+import pytest
+
+from tictactoe import shm_store, SQUARE_OCCUPIED_ERROR_MSG, UNSUPPORTED_BOARD_ERROR_MSG
+from tictactoe.grid import GridModel
+from tictactoe.model import Model
+from tictactoe.shm_store import SharedMemoryGameStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "games")
+
+@pytest.fixture
+def store(path):
+    return SharedMemoryGameStore(path, max_games=64, stripes=4)
+
+def test_new_game_is_empty(store):
+    assert store.version("a") is None
+    with store.locked("a") as model:
+        assert model.get_board_state().squares == [""] * 9
+        assert model.get_current_player() == "X"
+    assert "a" in store
+    assert len(store) == 1
+
+def test_stores_share_games(path, store):
+    other = SharedMemoryGameStore(path, max_games=64, stripes=4)
+    with store.locked("a") as model:
+        model.move_many([0, 3, 1, 4, 2])
+    assert other.version("a") == model.version
+    with other.locked("a") as model:
+        assert model.get_winner() == "X"
+        assert model.undo() == 2
+    with store.locked("a") as model:
+        assert model.get_winner() is None
+        assert model.get_current_player() == "X"
+
+def test_move_many_is_atomic(store):
+    with store.locked("a") as model:
+        model.move(0)
+        version = model.version
+        with pytest.raises(ValueError, match=SQUARE_OCCUPIED_ERROR_MSG):
+            model.move_many([1, 2, 0])
+    assert store.version("a") == version
+    with store.locked("a") as model:
+        assert model.get_board_state().squares[:3] == ["X", "", ""]
+
+def test_versions_are_unique_across_games(store):
+    versions = set()
+    for game in range(20):
+        with store.locked(f"g{game}") as model:
+            model.move(4)
+            versions.add(model.version)
+    assert len(versions) == 20
+
+def test_create_and_delete(store):
+    with store.locked("a") as model:
+        model.move(4)
+    store.create("a", Model())
+    with store.locked("a") as model:
+        assert model.get_move_number() == 0
+    with pytest.raises(ValueError, match=UNSUPPORTED_BOARD_ERROR_MSG):
+        store.create("a", GridModel(15, 5))
+    store.delete("a")
+    assert store.version("a") is None
+
+def test_eviction(path):
+    now = [0.0]
+    store = SharedMemoryGameStore(path, max_games=2, stripes=1, ttl=10, clock=lambda: now[0])
+    for game in ("a", "b", "c"):
+        with store.locked(game) as model:
+            model.move(0)
+        now[0] += 1
+    assert "a" not in store and len(store) == 2
+    now[0] += 60
+    assert store.version("b") is None and len(store) == 0
+
+def test_eviction_is_only_logged_when_a_slot_is_reused(path, caplog):
+    now = [0.0]
+    store = SharedMemoryGameStore(path, max_games=2, stripes=1, ttl=10, clock=lambda: now[0])
+    with store.locked("a") as model:
+        model.move(0)
+    now[0] += 60
+    with caplog.at_level(logging.INFO, logger="tictactoe.shm_store"):
+        assert store.version("a") is None
+        assert "a" not in store
+        assert not caplog.records
+        with store.locked("a"):
+            pass
+    assert [record.getMessage() for record in caplog.records] == ["Evicted game a - idle for 60s"]
+
+def test_stores_share_one_fork_hook(path):
+    stores = [SharedMemoryGameStore(path, max_games=64, stripes=4) for _ in range(3)]
+    assert all(store in shm_store._STORES for store in stores)
+    del stores
+    gc.collect()
+    assert not any(store.path == path for store in shm_store._STORES)
+
+def test_epoch_belongs_to_the_file(path, store, tmp_path):
+    assert SharedMemoryGameStore(path, max_games=64, stripes=4).epoch == store.epoch
+    other = SharedMemoryGameStore(str(tmp_path / "other"), max_games=64, stripes=4)
+    assert other.epoch != store.epoch
+
+def test_layout_mismatch(path, store):
+    with pytest.raises(ValueError):
+        SharedMemoryGameStore(path, max_games=64, stripes=8)
+
+def play(args):
+    path, worker, games = args
+    store = SharedMemoryGameStore(path, max_games=64, stripes=4)
+    rng = random.Random(worker)
+    played = []
+    for _ in range(20):
+        for game in range(games):
+            squares = list(range(9))
+            rng.shuffle(squares)
+            for index in squares:
+                with store.locked(f"g{game}") as model:
+                    try:
+                        model.move(index)
+                        played.append((game, index, model.version))
+                    except ValueError:
+                        pass
+    return played
+
+def test_concurrent_moves_from_many_processes(path, store):
+    games, workers = 12, 6
+    with multiprocessing.get_context("fork").Pool(workers) as pool:
+        results = pool.map(play, [(path, worker, games) for worker in range(workers)])
+    played = [move for result in results for move in result]
+    # Every square of every game was taken exactly once, by one process.
+    assert sorted((game, index) for game, index, _ in played) == \
+        [(game, index) for game in range(games) for index in range(9)]
+    assert len({version for _, _, version in played}) == len(played)
+    for game in range(games):
+        with store.locked(f"g{game}") as model:
+            squares = model.get_board_state().squares
+            assert squares.count("X") == 5 and squares.count("O") == 4
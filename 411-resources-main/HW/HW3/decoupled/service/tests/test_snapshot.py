@@ -0,0 +1,144 @@
+import pytest
+
+from tictactoe.grid import GridModel
+from tictactoe.snapshot import encode, restore, SnapshotFile, Snapshotter
+from tictactoe.store import GameStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "games.snapshot")
+
+@pytest.fixture
+def store():
+    store = GameStore()
+    with store.locked("classic") as model:
+        model.move_many([0, 4, 8])
+    with store.locked("won") as model:
+        model.move_many([0, 3, 1, 4, 2])
+    grid = GridModel(size=5, k=4)
+    grid.move_many([0, 6, 1, 7, 2])
+    store.create("grid", grid)
+    return store
+
+def restored(path):
+    store = GameStore()
+    assert restore(store, path) is not None
+    return store
+
+def test_round_trip(path, store):
+    stats = Snapshotter(store, path).snapshot()
+    assert stats.games == 3
+    store = restored(path)
+    assert len(store) == 3
+    assert "classic" in store and "missing" not in store
+    with store.locked("classic") as model:
+        assert model.get_board_state().squares == ["X", "", "", "", "O", "", "", "", "X"]
+        assert model.get_current_player() == "O"
+        assert model.undo() == 8
+    with store.locked("won") as model:
+        assert model.get_winner() == "X"
+    with store.locked("grid") as model:
+        assert isinstance(model, GridModel)
+        assert (model.size, model.k) == (5, 4)
+        assert model.get_board_state().squares[:8] == ["X", "X", "X", "", "", "", "O", "O"]
+        assert model.get_current_player() == "O"
+    assert len(store) == 3
+
+def test_games_are_built_on_first_use(path, store):
+    Snapshotter(store, path).snapshot()
+    store = restored(path)
+    with store.locked("classic"):
+        pass
+    assert len(store.pending) == 2
+    with store.locked("unknown") as model:
+        assert model.get_board_state().squares == [""] * 9
+    assert len(store) == 4
+
+def test_delete_and_create_replace_restored_games(path, store):
+    Snapshotter(store, path).snapshot()
+    store = restored(path)
+    store.delete("won")
+    store.create("classic", GridModel(size=4, k=3))
+    assert "won" not in store
+    assert len(store) == 2
+    with store.locked("classic") as model:
+        assert model.size == 4
+    with store.locked("won") as model:
+        assert model.get_winner() is None
+
+def test_snapshot_keeps_unused_restored_games(path, store):
+    Snapshotter(store, path).snapshot()
+    store = restored(path)
+    with store.locked("classic") as model:
+        model.move(1)
+    Snapshotter(store, path).snapshot()
+    store = restored(path)
+    assert len(store) == 3
+    with store.locked("classic") as model:
+        assert model.get_board_state().squares[:2] == ["X", "O"]
+    with store.locked("grid") as model:
+        assert model.k == 4
+
+def test_snapshot_copies_unused_restored_games_without_building_them(path, store, monkeypatch):
+    Snapshotter(store, path).snapshot()
+    store = restored(path)
+    with store.locked("classic") as model:
+        model.move(1)
+
+    def build(offset):
+        raise AssertionError("built a game nobody used")
+
+    monkeypatch.setattr(store.pending, "_build", build)
+    assert Snapshotter(store, path).snapshot().games == 3
+    monkeypatch.undo()
+    store = restored(path)
+    with store.locked("won") as model:
+        assert model.get_winner() == "X"
+    with store.locked("grid") as model:
+        assert model.get_board_state().squares[:3] == ["X", "X", "X"]
+
+def test_one_snapshotter_per_file(path, store):
+    first = Snapshotter(store, path, interval=60)
+    second = Snapshotter(store, path, interval=60)
+    assert first.start()
+    assert not second.start()
+    second.stop()
+    assert restore(GameStore(), path) is None
+    first.stop()
+    assert len(restored(path)) == 3
+    assert second.start()
+    second.release()
+
+def test_later_state_wins(path):
+    store = GameStore()
+    with store.locked("a") as model:
+        model.move(0)
+    early = model.snapshot()
+    model.move(1)
+    with open(path, "wb") as fh:
+        fh.write(encode([("a", early), ("a", model.snapshot())], bytearray()))
+    snapshot = SnapshotFile(path)
+    assert len(snapshot) == 1
+    assert snapshot.pop("a").get_board_state().squares[:2] == ["X", "O"]
+    assert snapshot.pop("a") is None
+
+def test_many_games(path):
+    store = GameStore()
+    for i in range(2000):
+        with store.locked(f"game-{i}") as model:
+            model.move(i % 9)
+    Snapshotter(store, path).snapshot()
+    store = restored(path)
+    assert len(store) == 2000
+    for i in range(0, 2000, 7):
+        with store.locked(f"game-{i}") as model:
+            assert model.get_board_state().squares[i % 9] == "X"
+
+def test_missing_or_corrupt_file(path):
+    assert restore(GameStore(), path) is None
+    with open(path, "wb") as fh:
+        fh.write(b"not a snapshot")
+    store = GameStore()
+    assert restore(store, path) is None
+    assert store.pending is None
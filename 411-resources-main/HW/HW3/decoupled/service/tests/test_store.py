@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+from tictactoe.store import GameStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def store(clock):
+    return GameStore(ttl=60.0, clock=clock)
+
+def test_games_are_isolated(store):
+    with store.locked("a") as model:
+        model.move(0)
+    with store.locked("b") as model:
+        assert model.get_board_state().squares[0] == ""
+    with store.locked("a") as model:
+        assert model.get_board_state().squares[0] == "X"
+    assert len(store) == 2
+
+def test_lru_eviction(store):
+    store.max_games = 2
+    with store.locked("a"):
+        pass
+    with store.locked("b"):
+        pass
+    with store.locked("a"):
+        pass
+    with store.locked("c"):
+        pass
+    assert "a" in store
+    assert "b" not in store
+    assert "c" in store
+
+def test_ttl_eviction(store, clock):
+    with store.locked("a"):
+        pass
+    clock.now = 30.0
+    with store.locked("b"):
+        pass
+    clock.now = 61.0
+    with store.locked("c"):
+        pass
+    assert "a" not in store
+    assert "b" in store
+
+def test_delete(store):
+    with store.locked("a") as model:
+        model.move(4)
+    store.delete("a")
+    assert "a" not in store
+    with store.locked("a") as model:
+        assert model.get_board_state().squares[4] == ""
+
+def test_concurrent_games(store):
+    def play(game_id):
+        for index in range(9):
+            with store.locked(game_id) as model:
+                model.move(index)
+
+    threads = [threading.Thread(target=play, args=(f"g{i}",)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for i in range(16):
+        with store.locked(f"g{i}") as model:
+            assert model.get_board_state().squares == ["X", "O"] * 4 + ["X"]
@@ -52,3 +52,47 @@ def test_error(view, app_context):
         assert response.get_json() == {
             "error": error_msg
         }
+
+def test_game_state(view, app_context):
+    board = Board(["X", "", "", "", "", "", "", "", ""])
+
+    with app.test_request_context():
+        response = view.game_state(board, None, "O", 1)
+        assert response.status_code == 200
+        assert response.get_json() == {
+            "board": ["X", "", "", "", "", "", "", "", ""],
+            "winner": None,
+            "player": "O",
+            "move_number": 1
+        }
+
+def test_etag_cache(view, app_context):
+    board = Board(["", "", "", "", "X", "", "", "", ""])
+
+    with app.test_request_context():
+        etag = view.etag("board", "e", 7)
+        assert view.cached(etag) is None
+        response = view.board_state(board, etag)
+        assert response.get_etag() == (etag, False)
+        cached = view.cached(etag)
+        assert cached.status_code == 200
+        assert cached.get_etag() == (etag, False)
+        assert cached.get_json() == response.get_json()
+
+def test_not_modified(view, app_context):
+    with app.test_request_context():
+        response = view.not_modified("board-7")
+        assert response.status_code == 304
+        assert response.get_etag() == ("board-7", False)
+
+def test_bodies_match_jsonify(view, app_context):
+    from flask import jsonify
+
+    board = Board(["X", "O", "", "", "X", "", "", "", "O"])
+    with app.test_request_context():
+        assert view.board_state(board).get_data() == jsonify({"board": board.squares}).get_data()
+        assert view.get_winner("O").get_data() == jsonify({"winner": "O"}).get_data()
+        assert view.game_state(board, None, "X", 4).get_data() == jsonify({
+            "board": board.squares, "winner": None, "player": "X", "move_number": 4
+        }).get_data()
+        assert view.error("anything").get_data() == jsonify({"error": "anything"}).get_data()
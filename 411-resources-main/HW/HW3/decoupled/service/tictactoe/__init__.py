@@ -1,13 +1,23 @@
+"""
+The tictactoe game engine.
+
+Importing the package, ``tictactoe.model``, ``tictactoe.grid`` or
+``tictactoe.gametree`` needs nothing beyond the standard library, so batch
+jobs and workers can use the engine without the web stack. Flask is only
+imported by the web layer (``tictactoe.controller``, ``tictactoe.view`` and
+``app``), which also installs the logging pipeline.
+"""
 from dataclasses import dataclass
-import logging
 from typing import List
-import sys
-
-from flask import current_app, has_request_context
 
 
 SQUARE_OCCUPIED_ERROR_MSG = "Square already occupied"
 INVALID_MOVE_ERROR_MSG = "Invalid move"
+INVALID_GAME_ID_ERROR_MSG = "Invalid game id"
+GAME_OVER_ERROR_MSG = "Game is over"
+INVALID_BOARD_ERROR_MSG = "Invalid board size"
+UNSUPPORTED_BOARD_ERROR_MSG = "Board size not supported by this store"
+NOTHING_TO_UNDO_ERROR_MSG = "Nothing to undo"
 
 
 @dataclass
@@ -15,24 +25,10 @@ class Board:
     squares: List[str]
 
 
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)  # Set the desired logging level here
-
-# Create a console handler that logs to stderr
-handler = logging.StreamHandler(sys.stderr)
-handler.setLevel(logging.DEBUG)
-
-# Create a formatter with a timestamp
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-
-# Add the formatter to the handler
-handler.setFormatter(formatter)
-
-# Add the handler to the logger
-logger.addHandler(handler)
-
-def configure_logger():
-    if has_request_context():
-        app_logger = current_app.logger
-        for handler in app_logger.handlers:
-            logger.addHandler(handler)
\ No newline at end of file
+def __getattr__(name: str):
+    # configure_logger moved to tictactoe.logs; it is loaded on first use so
+    # importing the package does not import Flask.
+    if name == "configure_logger":
+        from tictactoe.logs import configure_logger
+        return configure_logger
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,43 +1,259 @@
 import logging
+import re
+import time
+from typing import Container, Iterator, List, Optional, Tuple
 
 from flask import Response
 
-from tictactoe import Board, configure_logger, INVALID_MOVE_ERROR_MSG
+from tictactoe import (Board, GAME_OVER_ERROR_MSG, INVALID_BOARD_ERROR_MSG,
+                       INVALID_GAME_ID_ERROR_MSG, INVALID_MOVE_ERROR_MSG)
+from tictactoe.grid import GridModel
+from tictactoe.journal import open_journal
+from tictactoe.logs import configure_logger
+from tictactoe.metrics import timed
 from tictactoe.model import Model
+from tictactoe.snapshot import open_snapshots
+from tictactoe.store import create_store, DEFAULT_GAME_ID
 from tictactoe.view import View
 
 
-MODEL = Model()
+STORE = create_store()
+# Restores games from TICTACTOE_SNAPSHOT if it is set, and snapshots them there
+# unless another worker already does.
+SNAPSHOTS = open_snapshots(STORE)
 VIEW = View()
+# Wakes long-polls and streams; for a shared store, also on other workers' moves.
+BROADCASTER = STORE.broadcaster()
+# Every move is appended here if TICTACTOE_JOURNAL names a file.
+JOURNAL = open_journal()
+
+GAME_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+# Upper bound on how long a long-poll request may hold its connection.
+MAX_WAIT = 60.0
 
 
 logger = logging.getLogger(__name__)
 configure_logger()
 
 
-def get_board_state() -> Response:
+def validate_game_id(game_id: str) -> str:
+    """
+    Validates the provided game id.
+
+    Parameters
+    ----------
+    game_id : str
+        The game id to validate.
+
+    Returns
+    -------
+    str
+        The validated game id.
+
+    Raises
+    ------
+    ValueError
+        If the game id is not 1 to 64 letters, digits, '-' or '_'.
+    """
+    if not isinstance(game_id, str) or not GAME_ID_PATTERN.fullmatch(game_id):
+        raise ValueError(INVALID_GAME_ID_ERROR_MSG)
+    return game_id
+
+def cached_response(kind: str, game_id: str, if_none_match: Container[str]) -> Optional[Response]:
+    """
+    Answers a read from the game's version alone, without locking or reading the model.
+
+    Parameters
+    ----------
+    kind : str
+        What the response holds, e.g. 'board' or 'winner'.
+    game_id : str
+        The game to read.
+    if_none_match : Container[str]
+        The ETags the client already holds.
+
+    Returns
+    -------
+    Optional[Response]
+        A 304 response if the client is up to date, a response built from the
+        cached body if there is one, or None if the caller has to render.
+    """
+    version = STORE.version(game_id)
+    if version is None:
+        return None
+    etag = VIEW.etag(kind, STORE.epoch, version)
+    if etag in if_none_match:
+        return VIEW.not_modified(etag)
+    return VIEW.cached(etag)
+
+def render_state(model: Model) -> Response:
+    """
+    Renders the whole state of a game through the view.
+
+    Parameters
+    ----------
+    model : Model
+        The game to render. The caller must hold the game's lock.
+
+    Returns
+    -------
+    Response
+        A Flask response object containing the board, winner, current player
+        and move number.
+    """
+    return VIEW.game_state(model.get_board_state(), model.get_winner(),
+                           model.get_current_player(), model.get_move_number(),
+                           VIEW.etag("state", STORE.epoch, model.version))
+
+@timed(f"{__name__}.get_game_state")
+def read_game_state(game_id: str, if_none_match: Container[str] = ()) -> Response:
+    """
+    Reads the board, winner, current player and move number in one response.
+
+    Parameters
+    ----------
+    game_id : str
+        The game to read.
+    if_none_match : Container[str], optional
+        The ETags the client already holds (default is none).
+
+    Returns
+    -------
+    Response
+        A Flask response object containing the game state as JSON, or a 304
+        if the client is up to date.
+    """
+    try:
+        game_id = validate_game_id(game_id)
+        response = cached_response("state", game_id, if_none_match)
+        if response is not None:
+            return response
+        with STORE.locked(game_id) as model:
+            return render_state(model)
+    except ValueError as e:
+        return VIEW.error(str(e), 400)
+
+@timed(f"{__name__}.get_game_state.wait")
+def wait_for_change(game_id: str, if_none_match: Container[str], wait: float) -> bool:
+    """
+    Blocks until the game no longer matches the client's ETags, or ``wait`` seconds pass.
+
+    Parameters
+    ----------
+    game_id : str
+        The game to watch. It must already be validated.
+    if_none_match : Container[str]
+        The ETags the client already holds.
+    wait : float
+        Seconds to wait at most.
+
+    Returns
+    -------
+    bool
+        True if the game changed.
+    """
+    deadline = time.monotonic() + wait
+    with BROADCASTER.subscribe(game_id) as subscription:
+        # A wake-up only says the game may have changed, so keep waiting
+        # until it really has or the time is up.
+        while True:
+            response = cached_response("state", game_id, if_none_match)
+            if response is None or response.status_code != 304:
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not subscription.wait(remaining):
+                return False
+
+def get_game_state(game_id: str = DEFAULT_GAME_ID,
+                   if_none_match: Container[str] = (), wait: float = 0.0) -> Response:
+    """
+    Retrieves the board, winner, current player and move number in one response.
+
+    With ``wait`` set this is a long poll: if the client is already up to
+    date, the request is held until the game changes or ``wait`` seconds pass.
+    The reads are timed as 'tictactoe.controller.get_game_state' and the
+    wait on its own, so held requests do not skew the latency histogram.
+
+    Parameters
+    ----------
+    game_id : str, optional
+        The game to read (default is the shared default game).
+    if_none_match : Container[str], optional
+        The ETags the client already holds (default is none).
+    wait : float, optional
+        Seconds to hold an up-to-date request, at most MAX_WAIT (default is 0).
+
+    Returns
+    -------
+    Response
+        A Flask response object containing the game state as JSON.
+    """
+    response = read_game_state(game_id, if_none_match)
+    if wait > 0 and response.status_code == 304 and \
+            wait_for_change(game_id, if_none_match, min(wait, MAX_WAIT)):
+        response = read_game_state(game_id, if_none_match)
+    return response
+
+@timed()
+def get_board_state(game_id: str = DEFAULT_GAME_ID,
+                    if_none_match: Container[str] = ()) -> Response:
     """
     Retrieves the current state of the board.
 
+    Parameters
+    ----------
+    game_id : str, optional
+        The game to read (default is the shared default game).
+    if_none_match : Container[str], optional
+        The ETags the client already holds (default is none).
+
     Returns
     -------
     Response
         A Flask response object containing the board state as JSON.
     """
-    pass
+    try:
+        game_id = validate_game_id(game_id)
+        response = cached_response("board", game_id, if_none_match)
+        if response is not None:
+            return response
+        with STORE.locked(game_id) as model:
+            board, version = model.get_board_state(), model.version
+        return VIEW.board_state(board, VIEW.etag("board", STORE.epoch, version))
+    except ValueError as e:
+        return VIEW.error(str(e), 400)
 
-def get_winner() -> Response:
+@timed()
+def get_winner(game_id: str = DEFAULT_GAME_ID,
+               if_none_match: Container[str] = ()) -> Response:
     """
     Retrieves the winner of the game, if there is one.
 
+    Parameters
+    ----------
+    game_id : str, optional
+        The game to read (default is the shared default game).
+    if_none_match : Container[str], optional
+        The ETags the client already holds (default is none).
+
     Returns
     -------
     Response
         A Flask response object containing the winner as JSON.
     """
-    pass
+    try:
+        game_id = validate_game_id(game_id)
+        response = cached_response("winner", game_id, if_none_match)
+        if response is not None:
+            return response
+        with STORE.locked(game_id) as model:
+            winner, version = model.get_winner(), model.version
+        return VIEW.get_winner(winner, VIEW.etag("winner", STORE.epoch, version))
+    except ValueError as e:
+        return VIEW.error(str(e), 400)
 
-def validate_index(index: str) -> int:
+def validate_index(index: str, squares: int = 9) -> int:
     """
     Validates the provided index for a move.
 
@@ -45,6 +261,8 @@ def validate_index(index: str) -> int:
     ----------
     index : str
         The index to validate.
+    squares : int, optional
+        The number of squares on the board (default is 9).
 
     Returns
     -------
@@ -56,9 +274,103 @@ def validate_index(index: str) -> int:
     ValueError
         If the index is not a valid integer or is out of bounds.
     """
-    pass
+    try:
+        index = int(index)
+    except (TypeError, ValueError):
+        raise ValueError(INVALID_MOVE_ERROR_MSG)
+    if not 0 <= index < squares:
+        raise ValueError(INVALID_MOVE_ERROR_MSG)
+    return index
+
+def validate_board(size, k) -> Tuple[int, int]:
+    """
+    Validates the size and k of a new game.
+
+    Parameters
+    ----------
+    size
+        The number of rows and columns.
+    k
+        How many marks in a row win.
+
+    Returns
+    -------
+    Tuple[int, int]
+        The validated size and k.
+
+    Raises
+    ------
+    ValueError
+        If either is not an integer, or the board is not one GridModel can play.
+    """
+    if isinstance(size, bool) or isinstance(k, bool):
+        raise ValueError(INVALID_BOARD_ERROR_MSG)
+    try:
+        size, k = int(size), int(k)
+    except (TypeError, ValueError):
+        raise ValueError(INVALID_BOARD_ERROR_MSG)
+    return size, k
+
+@timed()
+def new_game(game_id: str = DEFAULT_GAME_ID, size=3, k=3) -> Response:
+    """
+    Starts a game over, on a board of any supported size.
 
-def make_move(index: str) -> Response:
+    A 3×3 board with 3 in a row is the classic game with its perfect-play
+    AI; anything else is played by ``tictactoe.grid.GridModel``.
+
+    Parameters
+    ----------
+    game_id : str, optional
+        The game to start (default is the shared default game).
+    size : int, optional
+        The number of rows and columns (default is 3).
+    k : int, optional
+        How many marks in a row win (default is 3).
+
+    Returns
+    -------
+    Response
+        A Flask response object containing the new game's state, or an error.
+    """
+    try:
+        game_id = validate_game_id(game_id)
+        size, k = validate_board(size, k)
+        model = Model() if (size, k) == (Model.size, Model.k) else GridModel(size, k)
+        STORE.create(game_id, model)
+        with STORE.locked(game_id) as model:
+            if JOURNAL is not None:
+                JOURNAL.new_game(game_id, model)
+            response = render_state(model)
+        BROADCASTER.publish(game_id)
+        return response
+    except ValueError as e:
+        logger.error("Error starting game: %s", e)
+        return VIEW.error(str(e), 400)
+
+def journal_moves(game_id: str, model: Model, indices: List[int]) -> None:
+    """
+    Journals moves that were just made, if TICTACTOE_JOURNAL is set.
+
+    The player of the first move is read off the board the moves produced,
+    not the one loaded before them: with the Redis store another worker's
+    move can land in between, and the script then plays the other mark.
+
+    Parameters
+    ----------
+    game_id : str
+        The game.
+    model : Model
+        The game after the moves.
+    indices : List[int]
+        The squares played, in order.
+    """
+    if JOURNAL is not None and indices:
+        player = model.get_board_state().squares[indices[0]]
+        JOURNAL.moves(game_id, model, indices, player)
+
+@timed()
+def make_move(index: str, game_id: str = DEFAULT_GAME_ID) -> Response:
     """
     Makes a move at the specified index.
 
@@ -66,14 +378,225 @@ def make_move(index: str) -> Response:
     ----------
     index : str
         The index at which to make the move.
+    game_id : str, optional
+        The game to play in (default is the shared default game).
+
+    Returns
+    -------
+    Response
+        A Flask response object containing the game state after the move,
+        or an error.
+    """
+    try:
+        game_id = validate_game_id(game_id)
+        with STORE.locked(game_id) as model:
+            index = validate_index(index, model.size * model.size)
+            model.move(index)
+            journal_moves(game_id, model, [index])
+            response = render_state(model)
+        BROADCASTER.publish(game_id)
+        return response
+    except ValueError as e:
+        logger.error("Error making move: %s", e)
+        return VIEW.error(str(e), 400)
+
+@timed()
+def make_moves(indices: list, game_id: str = DEFAULT_GAME_ID) -> Response:
+    """
+    Makes a list of moves atomically: either all of them are applied or none.
+
+    Parameters
+    ----------
+    indices : list
+        The indices at which to move, in order.
+    game_id : str, optional
+        The game to play in (default is the shared default game).
+
+    Returns
+    -------
+    Response
+        A Flask response object containing the game state after the moves,
+        or an error if any of the moves is invalid.
+    """
+    try:
+        if not isinstance(indices, list):
+            raise ValueError(INVALID_MOVE_ERROR_MSG)
+        game_id = validate_game_id(game_id)
+        with STORE.locked(game_id) as model:
+            squares = model.size * model.size
+            indices = [validate_index(index, squares) for index in indices]
+            model.move_many(indices)
+            journal_moves(game_id, model, indices)
+            response = render_state(model)
+        BROADCASTER.publish(game_id)
+        return response
+    except ValueError as e:
+        logger.error("Error making moves: %s", e)
+        return VIEW.error(str(e), 400)
+
+@timed()
+def make_ai_move(game_id: str = DEFAULT_GAME_ID) -> Response:
+    """
+    Makes the perfect-play move for the current player.
+
+    Parameters
+    ----------
+    game_id : str, optional
+        The game to play in (default is the shared default game).
+
+    Returns
+    -------
+    Response
+        A Flask response object containing the game state after the move,
+        or an error if the game is already over.
+    """
+    try:
+        game_id = validate_game_id(game_id)
+        with STORE.locked(game_id) as model:
+            index = model.best_move()
+            if index is None:
+                raise ValueError(GAME_OVER_ERROR_MSG)
+            model.move(index)
+            journal_moves(game_id, model, [index])
+            response = render_state(model)
+        BROADCASTER.publish(game_id)
+        return response
+    except ValueError as e:
+        logger.error("Error making AI move: %s", e)
+        return VIEW.error(str(e), 400)
+
+@timed()
+def undo_move(game_id: str = DEFAULT_GAME_ID) -> Response:
+    """
+    Takes back the last move.
+
+    Parameters
+    ----------
+    game_id : str, optional
+        The game to play in (default is the shared default game).
+
+    Returns
+    -------
+    Response
+        A Flask response object containing the game state after the undo,
+        or an error if there is no move to take back.
+    """
+    try:
+        game_id = validate_game_id(game_id)
+        with STORE.locked(game_id) as model:
+            index = model.undo()
+            if JOURNAL is not None:
+                JOURNAL.undo(game_id, model, index)
+            response = render_state(model)
+        BROADCASTER.publish(game_id)
+        return response
+    except ValueError as e:
+        logger.error("Error undoing move: %s", e)
+        return VIEW.error(str(e), 400)
+
+def event_version(last_event_id: Optional[str]) -> Optional[int]:
+    """
+    Returns the version a reconnecting client has seen, from its Last-Event-ID.
+
+    Parameters
+    ----------
+    last_event_id : Optional[str]
+        The id of the last message the client received, '<epoch>-<version>'.
+
+    Returns
+    -------
+    Optional[int]
+        The version, or None if there is no id, it is malformed, or it is
+        from another epoch: a version counted by another process or an
+        earlier run says nothing about this one.
+    """
+    if last_event_id is None:
+        return None
+    epoch, _, version = last_event_id.rpartition("-")
+    if epoch != STORE.epoch or not version.isdigit():
+        return None
+    return int(version)
+
+@timed()
+def next_state_event(game_id: str, last_version: Optional[int]) -> Tuple[Optional[bytes], Optional[int]]:
+    """
+    Encodes the game state as a Server-Sent Events message if it has changed.
+
+    Parameters
+    ----------
+    game_id : str
+        The game to read. It must already be validated.
+    last_version : Optional[int]
+        The version the subscriber has already seen, if any.
+
+    Returns
+    -------
+    Tuple[Optional[bytes], Optional[int]]
+        The message, or None if the game is unchanged, and the version the
+        subscriber has now seen.
+    """
+    if last_version is not None and STORE.version(game_id) == last_version:
+        return None, last_version
+    with STORE.locked(game_id) as model:
+        version = model.version
+        event = VIEW.state_event(model.get_board_state(), model.get_winner(),
+                                 model.get_current_player(), model.get_move_number(),
+                                 STORE.epoch, version)
+    return event, version
+
+def state_events(game_id: str, last_version: Optional[int],
+                 heartbeat: float) -> Iterator[bytes]:
+    """
+    Yields a Server-Sent Events message every time the game changes.
+
+    A heartbeat comment is sent after ``heartbeat`` idle seconds, which also
+    notices clients that have gone away.
+
+    Parameters
+    ----------
+    game_id : str
+        The game to watch. It must already be validated.
+    last_version : Optional[int]
+        The version the subscriber has already seen, if any.
+    heartbeat : float
+        Seconds between heartbeats on an idle stream.
+
+    Yields
+    ------
+    bytes
+        Encoded messages and heartbeats.
+    """
+    with BROADCASTER.subscribe(game_id) as subscription:
+        fired = True
+        while True:
+            event, last_version = next_state_event(game_id, last_version)
+            if event is not None:
+                yield event
+            elif not fired:
+                yield VIEW.HEARTBEAT
+            fired = subscription.wait(heartbeat)
+
+def stream_game_state(game_id: str = DEFAULT_GAME_ID, last_event_id: Optional[str] = None,
+                      heartbeat: float = 15.0) -> Response:
+    """
+    Streams the game state as Server-Sent Events, one message per change.
+
+    Parameters
+    ----------
+    game_id : str, optional
+        The game to watch (default is the shared default game).
+    last_event_id : Optional[str], optional
+        The id of the last message a reconnecting client received (default is None).
+    heartbeat : float, optional
+        Seconds between heartbeats on an idle stream (default is 15).
 
     Returns
     -------
     Response
-        A Flask response object indicating success or failure.
+        A Flask response object streaming the game state.
     """
     try:
-        pass
+        game_id = validate_game_id(game_id)
     except ValueError as e:
-        logger.error(f"Error making move: {e}")
-        return VIEW.error(str(e), 400)
\ No newline at end of file
+        return VIEW.error(str(e), 400)
+    return VIEW.event_stream(state_events(game_id, event_version(last_event_id), heartbeat))
@@ -0,0 +1,295 @@
+"""
+Fan-out of game updates to subscribers waiting for a change.
+
+A subscriber registers interest in one game and is woken every time that game
+is published. Subscriptions are level triggered: a wake-up only says
+"something changed", and the subscriber re-reads the game to find out what.
+Sync subscribers block on a ``threading.Event``; async subscribers wait on an
+``asyncio.Event`` in their own loop, so idle watchers on the async path cost
+a set entry and an event rather than a thread each.
+
+``Broadcaster`` only reaches subscribers in its own process. When the game
+store is shared between processes, a change made by another worker has to
+come in through the store: ``PollingBroadcaster`` watches the version of
+every game that has subscribers, and ``tictactoe.redis_store`` relays
+changes over Redis pub/sub. Each store's ``broadcaster()`` picks the right
+one.
+"""
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+import logging
+import os
+import threading
+import time
+from typing import AsyncIterator, Callable, Dict, Iterator, Optional, Set, Union
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    A blocking subscription to one game.
+
+    Methods
+    -------
+    notify() -> None:
+        Marks the subscription as changed. Safe to call from any thread.
+
+    wait(timeout: Optional[float]) -> bool:
+        Blocks until notified or until the timeout expires.
+    """
+
+    __slots__ = ("_event",)
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def notify(self) -> None:
+        self._event.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until notified or until the timeout expires.
+
+        Parameters
+        ----------
+        timeout : Optional[float]
+            Seconds to wait, or None to wait forever.
+
+        Returns
+        -------
+        bool
+            True if the game was published since the last wait.
+        """
+        fired = self._event.wait(timeout)
+        self._event.clear()
+        return fired
+
+
+class AsyncSubscription:
+    """
+    A subscription to one game for a coroutine running in an event loop.
+
+    Methods
+    -------
+    notify() -> None:
+        Marks the subscription as changed. Safe to call from any thread.
+
+    wait(timeout: Optional[float]) -> bool:
+        Waits until notified or until the timeout expires.
+    """
+
+    __slots__ = ("_event", "_loop")
+
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+
+    def notify(self) -> None:
+        self._loop.call_soon_threadsafe(self._event.set)
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until notified or until the timeout expires.
+
+        Parameters
+        ----------
+        timeout : Optional[float]
+            Seconds to wait, or None to wait forever.
+
+        Returns
+        -------
+        bool
+            True if the game was published since the last wait.
+        """
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._event.clear()
+        return True
+
+
+class Broadcaster:
+    """
+    A registry of subscriptions keyed by game id.
+
+    Subscribe before reading the game, then wait: a publish that lands
+    between the read and the wait is not lost, because the subscription is
+    already registered and stays set until the next wait.
+
+    Methods
+    -------
+    subscribe(game_id: str) -> Iterator[Subscription]:
+        Registers a blocking subscription for the duration of the block.
+
+    subscribe_async(game_id: str) -> AsyncIterator[AsyncSubscription]:
+        Registers an async subscription for the duration of the block.
+
+    publish(game_id: str) -> int:
+        Wakes every subscriber of a game.
+    """
+
+    def __init__(self):
+        self._subscriptions: Dict[str, Set[Union[Subscription, AsyncSubscription]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def _add(self, game_id: str, subscription) -> None:
+        with self._lock:
+            self._subscriptions.setdefault(game_id, set()).add(subscription)
+
+    def _watch(self, game_id: str) -> None:
+        # Called once a subscription is registered, before the subscriber
+        # reads the game. Broadcasters fed from outside the process start
+        # listening here.
+        pass
+
+    def _remove(self, game_id: str, subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(game_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[game_id]
+
+    @contextmanager
+    def subscribe(self, game_id: str) -> Iterator[Subscription]:
+        """
+        Registers a blocking subscription for the duration of the block.
+
+        Parameters
+        ----------
+        game_id : str
+            The game to watch.
+
+        Yields
+        ------
+        Subscription
+            The subscription to wait on.
+        """
+        subscription = Subscription()
+        self._add(game_id, subscription)
+        self._watch(game_id)
+        try:
+            yield subscription
+        finally:
+            self._remove(game_id, subscription)
+
+    @asynccontextmanager
+    async def subscribe_async(self, game_id: str) -> AsyncIterator[AsyncSubscription]:
+        """
+        Registers an async subscription for the duration of the block.
+
+        Parameters
+        ----------
+        game_id : str
+            The game to watch.
+
+        Yields
+        ------
+        AsyncSubscription
+            The subscription to await on.
+        """
+        subscription = AsyncSubscription()
+        self._add(game_id, subscription)
+        # Watching may read the store or wait on a connection: not on the loop.
+        await asyncio.get_running_loop().run_in_executor(None, self._watch, game_id)
+        try:
+            yield subscription
+        finally:
+            self._remove(game_id, subscription)
+
+    def publish(self, game_id: str) -> int:
+        """
+        Wakes every subscriber of a game.
+
+        Parameters
+        ----------
+        game_id : str
+            The game that changed.
+
+        Returns
+        -------
+        int
+            The number of subscribers notified in this process.
+        """
+        return self._notify(game_id)
+
+    def _notify(self, game_id: str) -> int:
+        # Wakes this process's subscribers of a game.
+        with self._lock:
+            subscriptions = tuple(self._subscriptions.get(game_id, ()))
+        for subscription in subscriptions:
+            subscription.notify()
+        return len(subscriptions)
+
+
+class PollingBroadcaster(Broadcaster):
+    """
+    A broadcaster that also notices changes made by other processes.
+
+    A background thread reads the version of every game that has
+    subscribers in this process every ``interval`` seconds, and wakes them
+    when it has moved. It suits stores whose version read is cheap and
+    local, like ``tictactoe.shm_store``. The thread is started by the first
+    subscription in each process, so a broadcaster created before the
+    server forks its workers polls in every worker.
+
+    Methods
+    -------
+    subscribe(game_id: str) -> Iterator[Subscription]:
+        Registers a blocking subscription for the duration of the block.
+
+    subscribe_async(game_id: str) -> AsyncIterator[AsyncSubscription]:
+        Registers an async subscription for the duration of the block.
+
+    publish(game_id: str) -> int:
+        Wakes every subscriber of a game in this process.
+    """
+
+    def __init__(self, version: Callable[[str], Optional[int]], interval: float = 0.05):
+        """
+        Parameters
+        ----------
+        version : Callable[[str], Optional[int]]
+            Returns a game's version, e.g. the store's ``version``.
+        interval : float, optional
+            Seconds between polls (default is 0.05).
+        """
+        super().__init__()
+        self.version = version
+        self.interval = interval
+        # The last version seen of every watched game.
+        self._seen: Dict[str, Optional[int]] = {}
+        self._poller_pid: Optional[int] = None
+
+    def _watch(self, game_id: str) -> None:
+        with self._lock:
+            if game_id not in self._seen:
+                self._seen[game_id] = self.version(game_id)
+            if self._poller_pid != os.getpid():
+                self._poller_pid = os.getpid()
+                threading.Thread(target=self._poll, name="broadcast-poll", daemon=True).start()
+
+    def _poll(self) -> None:
+        pid = os.getpid()
+        while self._poller_pid == pid:
+            time.sleep(self.interval)
+            with self._lock:
+                for game_id in self._seen.keys() - self._subscriptions.keys():
+                    del self._seen[game_id]
+                watched = list(self._seen.items())
+            for game_id, seen in watched:
+                try:
+                    version = self.version(game_id)
+                except (OSError, ValueError):
+                    logger.exception('Could not read the version of game %s', game_id)
+                    continue
+                if version != seen:
+                    with self._lock:
+                        if game_id in self._seen:
+                            self._seen[game_id] = version
+                    self._notify(game_id)
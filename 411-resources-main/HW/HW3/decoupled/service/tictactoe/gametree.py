@@ -0,0 +1,156 @@
+"""
+The full Tic Tac Toe game tree, solved once at import time.
+
+Every position reachable from the empty board with 'X' moving first is
+enumerated, and its minimax score, best move and winner are stored in flat
+arrays indexed by the position's base-3 key (square i contributes 3**i times
+0, 1 or 2 for empty, 'X' or 'O'). Answering "who won" or "what is the best
+reply" is then a single array lookup.
+"""
+from array import array
+import logging
+from typing import Optional
+
+from tictactoe.model import WINNING
+
+logger = logging.getLogger(__name__)
+
+
+SIZE = 3 ** 9
+
+# TERNARY[bits] is the base-3 value of a bitboard with a 1 digit on every set bit.
+TERNARY = tuple(
+    sum(3 ** i for i in range(9) if bits >> i & 1) for bits in range(1 << 9)
+)
+
+NO_MOVE = -1
+UNREACHABLE = -128
+
+# Winner codes stored in the WINNER table.
+NONE, X, O = 0, 1, 2
+_WINNER_NAMES = (None, "X", "O")
+
+
+def position_key(x: int, o: int) -> int:
+    """
+    Returns the base-3 key of a position.
+
+    Parameters
+    ----------
+    x : int
+        The bitboard for 'X'.
+    o : int
+        The bitboard for 'O'.
+
+    Returns
+    -------
+    int
+        The key, in the range 0 to 3**9 - 1.
+    """
+    return TERNARY[x] + 2 * TERNARY[o]
+
+
+def _solve() -> tuple[array, array, bytearray, int]:
+    """
+    Walks the game tree depth first and fills in the tables.
+
+    Scores are from the point of view of 'X': positive when 'X' wins with
+    perfect play, negative when 'O' wins and 0 for a draw. The magnitude is
+    one more than the number of empty squares left when the game ends, so
+    sooner wins and later losses score better.
+    """
+    scores = array("b", [UNREACHABLE]) * SIZE
+    best = array("b", [NO_MOVE]) * SIZE
+    winners = bytearray(SIZE)
+
+    def visit(x: int, o: int, key: int, x_to_move: bool) -> int:
+        score = scores[key]
+        if score != UNREACHABLE:
+            return score
+        empty = ~(x | o) & 0x1FF
+        if WINNING[x] or WINNING[o]:
+            winners[key] = X if WINNING[x] else O
+            score = (1 + bin(empty).count("1")) * (1 if WINNING[x] else -1)
+        elif not empty:
+            score = 0
+        else:
+            score = None
+            for index in range(9):
+                bit = 1 << index
+                if not empty & bit:
+                    continue
+                if x_to_move:
+                    child = visit(x | bit, o, key + 3 ** index, False)
+                    better = score is None or child > score
+                else:
+                    child = visit(x, o | bit, key + 2 * 3 ** index, True)
+                    better = score is None or child < score
+                if better:
+                    score = child
+                    best[key] = index
+        scores[key] = score
+        return score
+
+    visit(0, 0, 0, True)
+    positions = sum(1 for score in scores if score != UNREACHABLE)
+    return scores, best, winners, positions
+
+
+SCORE, BEST_MOVE, WINNER, POSITIONS = _solve()
+
+
+def best_move(key: int) -> Optional[int]:
+    """
+    Returns the best move for the player to move in a position.
+
+    Parameters
+    ----------
+    key : int
+        The base-3 key of the position.
+
+    Returns
+    -------
+    Optional[int]
+        The index to play, or None if the game is over or the position cannot
+        be reached with 'X' moving first.
+    """
+    index = BEST_MOVE[key]
+    return None if index == NO_MOVE else index
+
+
+def winner(key: int) -> Optional[str]:
+    """
+    Returns the winner of a position.
+
+    Parameters
+    ----------
+    key : int
+        The base-3 key of the position.
+
+    Returns
+    -------
+    Optional[str]
+        'X', 'O', or None if nobody has won.
+    """
+    return _WINNER_NAMES[WINNER[key]]
+
+
+def value(key: int) -> Optional[int]:
+    """
+    Returns the outcome of a position under perfect play.
+
+    Parameters
+    ----------
+    key : int
+        The base-3 key of the position.
+
+    Returns
+    -------
+    Optional[int]
+        1 if 'X' wins, -1 if 'O' wins, 0 for a draw, or None if the position
+        cannot be reached with 'X' moving first.
+    """
+    score = SCORE[key]
+    if score == UNREACHABLE:
+        return None
+    return (score > 0) - (score < 0)
@@ -0,0 +1,371 @@
+"""
+An N×N, k-in-a-row board engine for the larger variants (e.g. 15×15, 5 in a row).
+
+The board is a bytearray with one cell per square. For every square the
+engine precomputes, once per (size, k), the squares reached by stepping up to
+k - 1 times in each of the four line directions. A move then checks for a
+win by walking those rays out from the square it was played on, so a move
+costs O(k) whatever the board size.
+"""
+from functools import lru_cache
+import logging
+from typing import List, Optional, Tuple
+
+from tictactoe import (Board, INVALID_BOARD_ERROR_MSG, NOTHING_TO_UNDO_ERROR_MSG,
+                       SQUARE_OCCUPIED_ERROR_MSG)
+from tictactoe.model import _VERSIONS
+
+logger = logging.getLogger(__name__)
+
+
+EMPTY, X, O = 0, 1, 2
+_MARKS = ("", "X", "O")
+_CODES = {"": EMPTY, "X": X, "O": O}
+
+# Row and column steps: along a row, down a column and the two diagonals.
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+MIN_SIZE = 3
+MAX_SIZE = 19
+
+Ray = Tuple[int, ...]
+
+
+@lru_cache(maxsize=None)
+def rays(size: int, k: int) -> Tuple[Tuple[Tuple[Ray, Ray], ...], ...]:
+    """
+    Returns the line rays out of every square of a size × size board.
+
+    Parameters
+    ----------
+    size : int
+        The number of rows and columns.
+    k : int
+        How many in a row win. Rays are at most k - 1 squares long.
+
+    Returns
+    -------
+    tuple
+        ``rays(size, k)[square]`` holds one (forward, backward) pair per
+        direction, each a tuple of the squares stepped onto in order.
+    """
+    table = []
+    for square in range(size * size):
+        row, column = divmod(square, size)
+        pairs = []
+        for dr, dc in DIRECTIONS:
+            pair = []
+            for sign in (1, -1):
+                ray = []
+                r, c = row + sign * dr, column + sign * dc
+                while len(ray) < k - 1 and 0 <= r < size and 0 <= c < size:
+                    ray.append(r * size + c)
+                    r, c = r + sign * dr, c + sign * dc
+                pair.append(tuple(ray))
+            pairs.append(tuple(pair))
+        table.append(tuple(pairs))
+    return tuple(table)
+
+
+class GridModel:
+    """
+    The model of an N×N game won by k marks in a row.
+
+    It has the same interface as ``tictactoe.model.Model``, so the store,
+    controller and view serve it unchanged. Squares are numbered row by row,
+    ``row * size + column``.
+
+    Attributes
+    ----------
+    size : int
+        The number of rows and columns.
+    k : int
+        How many marks in a row win.
+    player : str
+        The current player ('X' or 'O').
+    winner : Optional[str]
+        The winner of the game (if any).
+    version : int
+        Increases every time the board changes.
+
+    Methods
+    -------
+    get_current_player() -> str:
+        Returns the current player.
+
+    get_winner() -> Optional[str]:
+        Returns the winner of the game (if any).
+
+    get_board_state() -> Board:
+        Returns a copy of the current board state.
+
+    get_move_number() -> int:
+        Returns the number of moves played so far.
+
+    is_draw() -> bool:
+        Returns whether the board is full without a winner.
+
+    is_dead_draw() -> bool:
+        Returns whether neither player can win any more.
+
+    is_terminal() -> bool:
+        Returns whether the game is over, won or drawn.
+
+    snapshot() -> tuple:
+        Captures the state of the game so it can be restored later.
+
+    restore(snapshot: tuple) -> None:
+        Puts the game back into a captured state.
+
+    move(index: int) -> None:
+        Makes a move at the specified index, changes the player, and checks for a winner.
+
+    move_many(indices: List[int]) -> None:
+        Makes several moves atomically: all of them or none.
+
+    undo() -> int:
+        Takes back the last move.
+
+    best_move() -> Optional[int]:
+        Returns a quick heuristic move for the player to move, if any.
+    """
+
+    __slots__ = ("size", "k", "player", "winner", "version", "_cells", "_moves", "_rays",
+                 "_history", "_won_at")
+
+    def __init__(self, size: int = 15, k: int = 5):
+        """
+        Initializes an empty board with 'X' to move.
+
+        Parameters
+        ----------
+        size : int, optional
+            The number of rows and columns (default is 15).
+        k : int, optional
+            How many marks in a row win (default is 5).
+
+        Raises
+        ------
+        ValueError
+            If the size is not MIN_SIZE to MAX_SIZE, or k is not 3 to size.
+        """
+        if not MIN_SIZE <= size <= MAX_SIZE or not 3 <= k <= size:
+            raise ValueError(INVALID_BOARD_ERROR_MSG)
+        self.size = size
+        self.k = k
+        self.player = "X"
+        self.winner: Optional[str] = None
+        self.version = next(_VERSIONS)
+        self._cells = bytearray(size * size)
+        self._moves = 0
+        self._rays = rays(size, k)
+        self._history: List[int] = []
+        # The move number the winner won on, 0 if there is no winner.
+        self._won_at = 0
+
+    def get_current_player(self) -> str:
+        return self.player
+
+    def change_player(self) -> None:
+        self.player = "O" if self.player == "X" else "X"
+
+    def get_winner(self) -> Optional[str]:
+        return self.winner
+
+    def get_board_state(self) -> Board:
+        """
+        Returns a copy of the current board state.
+
+        Returns
+        -------
+        Board
+            The squares row by row, each '', 'X' or 'O'.
+        """
+        return Board([_MARKS[cell] for cell in self._cells])
+
+    def get_move_number(self) -> int:
+        return self._moves
+
+    def is_draw(self) -> bool:
+        return self.winner is None and self._moves == len(self._cells)
+
+    def is_dead_draw(self) -> bool:
+        """
+        Returns whether neither player can win any more: there is no winner,
+        and every run of k squares in a row, column or diagonal holds marks
+        of both players. This can be true before the board is full.
+
+        Every run is checked, so this is O(size² · k).
+
+        Returns
+        -------
+        bool
+            True if the game can only end in a draw.
+        """
+        if self.winner is not None:
+            return False
+        size, k, cells = self.size, self.k, self._cells
+        for step_row, step_column in DIRECTIONS:
+            for row in range(size):
+                for column in range(size):
+                    end_row = row + step_row * (k - 1)
+                    end_column = column + step_column * (k - 1)
+                    if not (0 <= end_row < size and 0 <= end_column < size):
+                        continue
+                    start, step = row * size + column, step_row * size + step_column
+                    marks = {cells[start + i * step] for i in range(k)}
+                    if X not in marks or O not in marks:
+                        return False
+        return True
+
+    def is_terminal(self) -> bool:
+        return self.winner is not None or self._moves == len(self._cells)
+
+    def snapshot(self) -> tuple:
+        return (bytes(self._cells), self.player, self.winner, self._moves,
+                tuple(self._history), self._won_at)
+
+    def restore(self, snapshot: tuple) -> None:
+        cells, self.player, self.winner, self._moves, history, self._won_at = snapshot
+        self._cells[:] = cells
+        self._history = list(history)
+        self.version = next(_VERSIONS)
+
+    def run_length(self, index: int, code: int, limit: int) -> int:
+        """
+        Returns the longest line of ``code`` marks through ``index``, counting
+        ``index`` itself, in any direction.
+
+        Parameters
+        ----------
+        index : int
+            The square the line goes through.
+        code : int
+            The mark to count, X or O.
+        limit : int
+            Stop looking once a line this long is found.
+
+        Returns
+        -------
+        int
+            The length of the longest line found, at most ``limit``.
+        """
+        cells = self._cells
+        longest = 0
+        for forward, backward in self._rays[index]:
+            run = 1
+            for square in forward:
+                if cells[square] != code:
+                    break
+                run += 1
+            for square in backward:
+                if cells[square] != code:
+                    break
+                run += 1
+            if run >= limit:
+                return limit
+            longest = max(longest, run)
+        return longest
+
+    def move(self, index: int) -> None:
+        """
+        Makes a move at the specified index, changes the player, and checks for a winner.
+
+        Only the four lines through ``index`` are checked, at most k - 1
+        squares each way.
+
+        Parameters
+        ----------
+        index : int
+            The index at which to make the move, ``row * size + column``.
+
+        Raises
+        ------
+        ValueError
+            If the specified index is already occupied.
+        """
+        if self._cells[index]:
+            logger.error('Move failed at index %d - square already occupied', index)
+            raise ValueError(SQUARE_OCCUPIED_ERROR_MSG)
+        code = _CODES[self.player]
+        self._cells[index] = code
+        self._moves += 1
+        self._history.append(index)
+        if self.winner is None and self.run_length(index, code, self.k) >= self.k:
+            self.winner = self.player
+            self._won_at = self._moves
+        self.change_player()
+        self.version = next(_VERSIONS)
+
+    def move_many(self, indices: List[int]) -> None:
+        """
+        Makes several moves in order, atomically: if one fails, none are applied.
+
+        Parameters
+        ----------
+        indices : List[int]
+            The indices at which to move.
+
+        Raises
+        ------
+        ValueError
+            If one of the indices is already occupied.
+        """
+        snapshot = self.snapshot()
+        try:
+            for index in indices:
+                self.move(index)
+        except ValueError:
+            self.restore(snapshot)
+            raise
+
+    def undo(self) -> int:
+        """
+        Takes back the last move, in O(1).
+
+        Returns
+        -------
+        int
+            The index of the move taken back.
+
+        Raises
+        ------
+        ValueError
+            If there is no move to take back.
+        """
+        if not self._history:
+            raise ValueError(NOTHING_TO_UNDO_ERROR_MSG)
+        index = self._history.pop()
+        self.player = _MARKS[self._cells[index]]
+        self._cells[index] = EMPTY
+        if self._won_at == self._moves:
+            self.winner = None
+            self._won_at = 0
+        self._moves -= 1
+        self.version = next(_VERSIONS)
+        return index
+
+    def best_move(self) -> Optional[int]:
+        """
+        Returns a quick heuristic move: win if possible, else block the
+        opponent's win, else the free square nearest the centre.
+
+        Each candidate square costs O(k), so this is O(size² · k).
+
+        Returns
+        -------
+        Optional[int]
+            The index to play, or None if the game is over.
+        """
+        if self.is_terminal():
+            return None
+        mine = _CODES[self.player]
+        theirs = X + O - mine
+        free = [index for index, cell in enumerate(self._cells) if not cell]
+        for code in (mine, theirs):
+            for index in free:
+                if self.run_length(index, code, self.k) >= self.k:
+                    return index
+        centre = (self.size - 1) / 2
+        return min(free, key=lambda index: (index // self.size - centre) ** 2
+                   + (index % self.size - centre) ** 2)
@@ -0,0 +1,500 @@
+"""
+An append-only journal of every move, for auditing, crash recovery and replay.
+
+The journal is an 8-byte header followed by fixed 16-byte records:
+
+    game    uint64  the first 8 bytes of the BLAKE2b hash of the game id
+    aux     uint32  the square played or freed, the board size for a new
+                    game, or an offset into the snapshot file
+    move    uint16  the number of moves on the board after the record
+    kind    uint8   NEW, MOVE_X, MOVE_O, UNDO or SNAPSHOT
+    arg     uint8   k for a new game
+
+Records are buffered and written in batches by a background thread every
+``flush_interval`` seconds, so a crash loses at most that much. A crash
+mid-write can leave a partial record at the end of the journal, or a partial
+snapshot at the end of the snapshot file; both are cut off when the journal
+is reopened, so later records stay aligned. Every
+``snapshot_every`` moves a game's board is written to a snapshot file next
+to the journal (``<path>.snap``), so a replay starts from the last snapshot
+instead of from the first move.
+
+One process writes one journal: put ``{pid}`` in the path when serving with
+several worker processes. A journal opened before ``fork()`` is reopened in
+the child, under the child's pid, with its own flush thread.
+"""
+from functools import lru_cache
+from hashlib import blake2b
+import atexit
+import logging
+import mmap
+import os
+import struct
+import threading
+import weakref
+from typing import List, Optional, Tuple
+
+from tictactoe import INVALID_MOVE_ERROR_MSG
+from tictactoe.grid import GridModel
+from tictactoe.model import Model, squares_to_bits
+
+logger = logging.getLogger(__name__)
+
+
+MAGIC = b"TTTJ"
+VERSION = 1
+HEADER = struct.Struct("<4sHH")
+RECORD = struct.Struct("<QIHBB")
+# A snapshot: size, k, player, winner, then size * size cells of 0, 1 or 2.
+SNAPSHOT = struct.Struct("<BBBB")
+
+NEW, MOVE_X, MOVE_O, UNDO, SNAPSHOT_RECORD = range(5)
+_MOVES = {"X": MOVE_X, "O": MOVE_O}
+_MARKS = ("", "X", "O")
+_CODES = {"": 0, "X": 1, "O": 2}
+
+
+# Every open journal, to be reopened in a forked child.
+_JOURNALS: "weakref.WeakSet[MoveJournal]" = weakref.WeakSet()
+
+
+def _reopen_all() -> None:
+    for journal in list(_JOURNALS):
+        journal._reopen_after_fork()
+
+
+os.register_at_fork(after_in_child=_reopen_all)
+
+
+@lru_cache(maxsize=4096)
+def game_key(game_id: str) -> int:
+    """
+    Returns the 64-bit key a game's records are filed under.
+
+    Parameters
+    ----------
+    game_id : str
+        The game id.
+
+    Returns
+    -------
+    int
+        The key, the same in every process.
+    """
+    return int.from_bytes(blake2b(game_id.encode(), digest_size=8).digest(), "little")
+
+
+class MoveJournal:
+    """
+    Writes moves to an append-only journal.
+
+    Every method is thread-safe.
+
+    Methods
+    -------
+    new_game(game_id: str, model: Model) -> None:
+        Records that a game was started over.
+
+    moves(game_id: str, model: Model, indices: List[int], first_player: str) -> None:
+        Records moves that were just made.
+
+    undo(game_id: str, model: Model, index: int) -> None:
+        Records that a move was taken back.
+
+    flush() -> None:
+        Writes out the buffered records.
+
+    close() -> None:
+        Flushes and closes the journal.
+    """
+
+    def __init__(self, path: str, buffer_records: int = 512, flush_interval: float = 1.0,
+                 snapshot_every: int = 32):
+        """
+        Opens a journal for appending, creating it if needed.
+
+        Parameters
+        ----------
+        path : str
+            The journal file. ``{pid}`` is replaced by the process id, again
+            in a forked child.
+        buffer_records : int, optional
+            Records to hold before writing them out (default is 512).
+        flush_interval : float, optional
+            The longest a record is held, in seconds (default is 1).
+        snapshot_every : int, optional
+            Moves between snapshots of a game (default is 32).
+
+        Raises
+        ------
+        ValueError
+            If the file exists but is not a journal.
+        """
+        self.template = path
+        self.buffer_records = buffer_records
+        self.flush_interval = flush_interval
+        self.snapshot_every = snapshot_every
+        self._lock = threading.Lock()
+        self._buffer: List[bytes] = []
+        self._closed = threading.Event()
+        self._open()
+        _JOURNALS.add(self)
+
+    def _open(self) -> None:
+        self.path = self.template.replace("{pid}", str(os.getpid()))
+        if os.path.exists(self.path):
+            truncate_partial_record(self.path)
+        self._log = open(self.path, "ab")
+        if self._log.tell() == 0:
+            self._log.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+            # Nothing is left in the file buffers, for a forked child to write again.
+            self._log.flush()
+        if os.path.exists(self.path + ".snap"):
+            truncate_partial_snapshot(self.path + ".snap")
+        self._snapshots = open(self.path + ".snap", "ab")
+        threading.Thread(target=self._flush_every, name="journal-flush", daemon=True).start()
+
+    def _reopen_after_fork(self) -> None:
+        # The parent writes out its own buffered records, and the flush
+        # thread and any lock holder did not survive the fork.
+        self._lock = threading.Lock()
+        if self._closed.is_set():
+            return
+        self._buffer = []
+        self._log.close()
+        self._snapshots.close()
+        self._open()
+
+    def _flush_every(self) -> None:
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def _append(self, records: List[bytes]) -> None:
+        # Must hold the lock.
+        self._buffer.extend(records)
+        if len(self._buffer) >= self.buffer_records:
+            self._flush()
+
+    def _flush(self) -> None:
+        # Must hold the lock.
+        if self._buffer:
+            self._log.write(b"".join(self._buffer))
+            self._log.flush()
+            self._buffer = []
+
+    def _snapshot(self, key: int, model: Model) -> bytes:
+        # Must hold the lock. The snapshot file is flushed before the record
+        # that points into it can reach the journal.
+        squares = model.get_board_state().squares
+        payload = SNAPSHOT.pack(model.size, model.k, _CODES[model.get_current_player()],
+                                _CODES[model.get_winner() or ""])
+        payload += bytes(_CODES[square] for square in squares)
+        offset = self._snapshots.tell()
+        self._snapshots.write(payload)
+        self._snapshots.flush()
+        return RECORD.pack(key, offset, model.get_move_number(), SNAPSHOT_RECORD, 0)
+
+    def new_game(self, game_id: str, model: Model) -> None:
+        """
+        Records that a game was started over on the model's board.
+
+        Parameters
+        ----------
+        game_id : str
+            The game.
+        model : Model
+            The new game.
+        """
+        with self._lock:
+            self._append([RECORD.pack(game_key(game_id), model.size, 0, NEW, model.k)])
+
+    def moves(self, game_id: str, model: Model, indices: List[int], first_player: str) -> None:
+        """
+        Records moves that were just made, in order, and a snapshot of the
+        game if it passed a multiple of ``snapshot_every`` moves.
+
+        Parameters
+        ----------
+        game_id : str
+            The game.
+        model : Model
+            The game after the moves.
+        indices : List[int]
+            The squares played.
+        first_player : str
+            The player who made the first of the moves.
+        """
+        key = game_key(game_id)
+        end = model.get_move_number()
+        start = end - len(indices)
+        players = (first_player, "O" if first_player == "X" else "X")
+        records = [RECORD.pack(key, index, start + i + 1, _MOVES[players[i % 2]], 0)
+                   for i, index in enumerate(indices)]
+        with self._lock:
+            if start // self.snapshot_every != end // self.snapshot_every:
+                records.append(self._snapshot(key, model))
+            self._append(records)
+
+    def undo(self, game_id: str, model: Model, index: int) -> None:
+        """
+        Records that a move was taken back.
+
+        Parameters
+        ----------
+        game_id : str
+            The game.
+        model : Model
+            The game after the undo.
+        index : int
+            The square freed.
+        """
+        with self._lock:
+            self._append([RECORD.pack(game_key(game_id), index, model.get_move_number(),
+                                      UNDO, 0)])
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._closed.is_set():
+                self._flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed.is_set():
+                return
+            self._closed.set()
+            self._flush()
+            self._log.close()
+            self._snapshots.close()
+
+
+def check_header(path: str) -> None:
+    with open(path, "rb") as fh:
+        header = fh.read(HEADER.size)
+    if len(header) < HEADER.size or HEADER.unpack(header) != (MAGIC, VERSION, RECORD.size):
+        raise ValueError(f"{path} is not a version {VERSION} move journal")
+
+
+def truncate_partial_record(path: str) -> int:
+    """
+    Cuts a journal back to its last whole record.
+
+    A file shorter than the header that holds the start of one is taken
+    for a journal whose header write was cut short, and emptied.
+
+    Parameters
+    ----------
+    path : str
+        The journal.
+
+    Returns
+    -------
+    int
+        The number of bytes cut off.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a journal.
+    """
+    size = os.path.getsize(path)
+    if size < HEADER.size:
+        with open(path, "rb") as fh:
+            start = fh.read()
+        if not HEADER.pack(MAGIC, VERSION, RECORD.size).startswith(start):
+            raise ValueError(f"{path} is not a version {VERSION} move journal")
+        end = 0
+    else:
+        check_header(path)
+        end = size - (size - HEADER.size) % RECORD.size
+    if end != size:
+        logger.warning('Cutting %d bytes of a partial record off %s', size - end, path)
+        os.truncate(path, end)
+    return size - end
+
+
+def truncate_partial_snapshot(path: str) -> int:
+    """
+    Cuts a snapshot file back to its last whole snapshot.
+
+    Parameters
+    ----------
+    path : str
+        The snapshot file.
+
+    Returns
+    -------
+    int
+        The number of bytes cut off.
+    """
+    size = os.path.getsize(path)
+    end = 0
+    with open(path, "rb") as fh:
+        while end + SNAPSHOT.size <= size:
+            fh.seek(end)
+            board = SNAPSHOT.unpack(fh.read(SNAPSHOT.size))[0]
+            if end + SNAPSHOT.size + board * board > size:
+                break
+            end += SNAPSHOT.size + board * board
+    if end != size:
+        logger.warning('Cutting %d bytes of a partial snapshot off %s', size - end, path)
+        os.truncate(path, end)
+    return size - end
+
+
+def game_records(path: str, game_id: str) -> List[Tuple[int, int, int, int, int]]:
+    """
+    Returns every record of one game, oldest first.
+
+    The journal is memory-mapped and searched for the game's key, so other
+    games' records are never unpacked.
+
+    Parameters
+    ----------
+    path : str
+        The journal.
+    game_id : str
+        The game.
+
+    Returns
+    -------
+    List[Tuple[int, int, int, int, int]]
+        The (game, aux, move, kind, arg) of each record.
+    """
+    check_header(path)
+    needle = game_key(game_id).to_bytes(8, "little")
+    records = []
+    with open(path, "rb") as fh:
+        size = os.fstat(fh.fileno()).st_size
+        end = HEADER.size + (size - HEADER.size) // RECORD.size * RECORD.size
+        if end == HEADER.size:
+            return records
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            position = mm.find(needle, HEADER.size, end)
+            while position != -1:
+                offset = (position - HEADER.size) % RECORD.size
+                if offset == 0:
+                    records.append(RECORD.unpack_from(mm, position))
+                    position = mm.find(needle, position + RECORD.size, end)
+                else:
+                    # The key's bytes turned up inside another record.
+                    position = mm.find(needle, position + 1, end)
+    return records
+
+
+def load_model(size: int, k: int, cells: bytes, player: str, winner: Optional[str]) -> Model:
+    """
+    Builds a game holding a snapshot's board. Its moves cannot be undone.
+
+    Parameters
+    ----------
+    size : int
+        The number of rows and columns.
+    k : int
+        How many marks in a row win.
+    cells : bytes
+        The squares row by row, each 0, 1 for 'X' or 2 for 'O'.
+    player : str
+        The player to move.
+    winner : Optional[str]
+        The winner, if any.
+
+    Returns
+    -------
+    Model
+        A Model for the classic board, a GridModel for any other.
+    """
+    if (size, k) == (Model.size, Model.k):
+        model = Model()
+        x, o = squares_to_bits([_MARKS[cell] for cell in cells])
+        model.restore((x, o, player, winner, 0))
+    else:
+        model = GridModel(size, k)
+        moves = sum(1 for cell in cells if cell)
+        model.restore((cells, player, winner, moves, (), moves if winner else 0))
+    return model
+
+
+def replay(path: str, game_id: str, move_number: int = None) -> Model:
+    """
+    Rebuilds a game from the journal.
+
+    Parameters
+    ----------
+    path : str
+        The journal.
+    game_id : str
+        The game.
+    move_number : int, optional
+        Rebuild the game as it was right after its latest move with this
+        number. Defaults to the game's current state.
+
+    Returns
+    -------
+    Model
+        The game. Moves before its last snapshot cannot be undone.
+
+    Raises
+    ------
+    KeyError
+        If the journal has no records of the game.
+    ValueError
+        If the journal never saw the game reach that move number.
+    """
+    records = game_records(path, game_id)
+    if not records:
+        raise KeyError(game_id)
+    if move_number is None:
+        target = len(records) - 1
+    else:
+        target = next((i for i in range(len(records) - 1, -1, -1)
+                       if records[i][2] == move_number and records[i][3] in (NEW, MOVE_X, MOVE_O)),
+                      None)
+        if target is None and move_number != 0:
+            raise ValueError(INVALID_MOVE_ERROR_MSG)
+        if target is None:
+            return Model()
+    # Start from the latest new game or snapshot that no later undo reached below.
+    start, lowest = None, None
+    for i in range(target, -1, -1):
+        _, _, move, kind, _ = records[i]
+        if kind == UNDO:
+            lowest = move if lowest is None else min(lowest, move)
+        elif kind == NEW or (kind == SNAPSHOT_RECORD and (lowest is None or lowest >= move)):
+            start = i
+            break
+    model = Model()
+    if start is not None:
+        _, aux, _, kind, arg = records[start]
+        if kind == NEW:
+            model = Model() if (aux, arg) == (Model.size, Model.k) else GridModel(aux, arg)
+        else:
+            with open(path + ".snap", "rb") as fh:
+                fh.seek(aux)
+                size, k, player, winner = SNAPSHOT.unpack(fh.read(SNAPSHOT.size))
+                cells = fh.read(size * size)
+            model = load_model(size, k, cells, _MARKS[player], _MARKS[winner] or None)
+    for _, aux, _, kind, _ in records[(start + 1 if start is not None else 0):target + 1]:
+        if kind == UNDO:
+            model.undo()
+        elif kind != SNAPSHOT_RECORD:
+            model.player = "X" if kind == MOVE_X else "O"
+            model.move(aux)
+    return model
+
+
+def open_journal() -> Optional[MoveJournal]:
+    """
+    Opens the journal named by the TICTACTOE_JOURNAL environment variable.
+
+    Returns
+    -------
+    Optional[MoveJournal]
+        The journal, or None if the variable is not set.
+    """
+    path = os.environ.get("TICTACTOE_JOURNAL")
+    if not path:
+        return None
+    journal = MoveJournal(path)
+    atexit.register(journal.close)
+    logger.info('Journaling moves to %s', journal.path)
+    return journal
@@ -0,0 +1,188 @@
+"""
+Non-blocking logging for the tictactoe package.
+
+Records logged under the ``tictactoe`` logger are put on a bounded queue and
+written to stderr by a listener thread, so a request never waits on I/O to
+log. When the queue is full, records are dropped and counted instead of
+blocking. Messages are formatted on the listener thread, so pass arguments
+with %-style placeholders rather than pre-formatting them.
+"""
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import os
+import queue
+import random
+import sys
+import threading
+from typing import Optional
+
+PACKAGE_LOGGER = "tictactoe"
+FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    A queue handler that drops records instead of blocking when the queue is full.
+
+    Attributes
+    ----------
+    dropped : int
+        The number of records dropped so far.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener shares this process, so the record can be handed over
+        # as is and its message formatted on the listener thread.
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Lets through a random fraction of the records below WARNING.
+
+    Warnings and errors always pass.
+
+    Attributes
+    ----------
+    rate : float
+        The fraction of records to keep, between 0 and 1.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+_lock = threading.Lock()
+_handler: Optional[DroppingQueueHandler] = None
+_listener: Optional[QueueListener] = None
+
+
+def _start_listener(queue_size: int, handlers: tuple) -> None:
+    global _listener
+    log_queue = queue.Queue(queue_size)
+    _handler.queue = log_queue
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def _restart_after_fork() -> None:
+    # The listener thread does not survive fork(), so give each child its own.
+    global _lock
+    _lock = threading.Lock()
+    if _listener is not None:
+        _start_listener(_listener.queue.maxsize, _listener.handlers)
+
+
+def _stop() -> None:
+    if _listener is not None:
+        _listener.stop()
+
+
+def setup_logging(level: str = None, queue_size: int = 10_000) -> DroppingQueueHandler:
+    """
+    Installs the queue-based pipeline on the package logger. Safe to call repeatedly.
+
+    Parameters
+    ----------
+    level : str, optional
+        The package log level. Defaults to the TICTACTOE_LOG_LEVEL environment
+        variable, or INFO if it is not set.
+    queue_size : int, optional
+        How many records may wait for the listener before new ones are
+        dropped (default is 10000).
+
+    Returns
+    -------
+    DroppingQueueHandler
+        The handler installed on the package logger.
+    """
+    global _handler
+    with _lock:
+        if _handler is not None:
+            return _handler
+        logger = logging.getLogger(PACKAGE_LOGGER)
+        logger.setLevel(level or os.environ.get("TICTACTOE_LOG_LEVEL", "INFO"))
+        stream = logging.StreamHandler(sys.stderr)
+        stream.setFormatter(logging.Formatter(FORMAT))
+        _handler = DroppingQueueHandler(queue.Queue(queue_size))
+        _start_listener(queue_size, (stream,))
+        logger.addHandler(_handler)
+        atexit.register(_stop)
+        os.register_at_fork(after_in_child=_restart_after_fork)
+        return _handler
+
+
+def add_listener_handler(handler: logging.Handler) -> None:
+    """
+    Adds a handler to the listener thread, unless it is already there.
+
+    Parameters
+    ----------
+    handler : logging.Handler
+        The handler to write records to, off the request path.
+    """
+    setup_logging()
+    with _lock:
+        if handler not in _listener.handlers:
+            _listener.handlers = _listener.handlers + (handler,)
+
+
+def configure_logger() -> None:
+    """
+    Installs the logging pipeline and, inside a request, routes package
+    records to the Flask app's handlers as well. Safe to call repeatedly.
+    """
+    from flask import current_app, has_request_context
+
+    setup_logging()
+    if has_request_context():
+        for handler in current_app.logger.handlers:
+            add_listener_handler(handler)
+
+
+def route_logger(route: str, sample_rate: float = None) -> logging.Logger:
+    """
+    Returns the logger for one route, with optional sampling.
+
+    Parameters
+    ----------
+    route : str
+        The name of the route.
+    sample_rate : float, optional
+        The fraction of records below WARNING to keep. Defaults to the rate
+        for this route in TICTACTOE_LOG_SAMPLE (e.g. "board=0.01,move=1"),
+        or 1 if it is not listed.
+
+    Returns
+    -------
+    logging.Logger
+        A child of the package logger.
+    """
+    logger = logging.getLogger(f"{PACKAGE_LOGGER}.routes.{route}")
+    if sample_rate is None:
+        rates = dict(item.split("=", 1) for item in
+                     os.environ.get("TICTACTOE_LOG_SAMPLE", "").split(",") if "=" in item)
+        sample_rate = float(rates.get(route, 1.0))
+    for existing in logger.filters:
+        if isinstance(existing, SamplingFilter):
+            existing.rate = sample_rate
+            break
+    else:
+        if sample_rate < 1.0:
+            logger.addFilter(SamplingFilter(sample_rate))
+    return logger
@@ -1,22 +1,147 @@
+import itertools
 import logging
-from typing import Optional
+import os
+from typing import List, Optional
 
-from tictactoe import Board, SQUARE_OCCUPIED_ERROR_MSG
+from tictactoe import Board, NOTHING_TO_UNDO_ERROR_MSG, SQUARE_OCCUPIED_ERROR_MSG
 
 logger = logging.getLogger(__name__)
 
+
+# Versions are drawn from one process-wide counter, so a game that is dropped
+# and recreated never reuses a version an earlier game handed out.
+_VERSIONS = itertools.count(1)
+
+
+def _new_epoch() -> str:
+    return os.urandom(8).hex()
+
+# The counter starts over in every process, so a version alone does not name
+# a state once the process restarts or forks. The epoch does: it is drawn
+# afresh for every process, and anything that outlives the process (an ETag,
+# a stream event id) carries it next to the version.
+_EPOCH = _new_epoch()
+
+
+def _reset_epoch() -> None:
+    global _EPOCH
+    _EPOCH = _new_epoch()
+
+
+os.register_at_fork(after_in_child=_reset_epoch)
+
+
+def process_epoch() -> str:
+    """
+    Returns the epoch of this process's version counter.
+
+    Returns
+    -------
+    str
+        16 random hex digits, different in every process, forked children included.
+    """
+    return _EPOCH
+
+# Bit i of a player's bitboard is set when that player holds square i.
+WIN_LINES = (
+    0b000000111, 0b000111000, 0b111000000,  # rows
+    0b001001001, 0b010010010, 0b100100100,  # columns
+    0b100010001, 0b001010100,               # diagonals
+)
+
+# WINNING[bits] is 1 when the 9-bit board ``bits`` contains a full win line,
+# so a winner check is a single index instead of a scan of the lines.
+WINNING = bytes(
+    any(bits & line == line for line in WIN_LINES) for bits in range(1 << 9)
+)
+
+# Line counters pack, for each of the 8 win lines, how many of its squares a
+# player holds into 2 bits: line n is bits 2n and 2n+1. A count never exceeds
+# 3, so the counters only ever change by adding INCREMENT[square], the sum of
+# the units of the lines through that square.
+INCREMENT = tuple(
+    sum(1 << 2 * n for n, line in enumerate(WIN_LINES) if line >> square & 1)
+    for square in range(9)
+)
+# The low bit of every line's counter. ``c & c >> 1 & LOW_BITS`` is non-zero
+# when a line count is 3 (a win), and ``(c | c >> 1) & LOW_BITS`` marks the
+# lines a player has played in.
+LOW_BITS = 0x5555
+# Every square taken.
+FULL_BOARD = (1 << 9) - 1
+# LINE_COUNTS[bits] is the counter for the 9-bit board ``bits``.
+LINE_COUNTS = tuple(
+    sum(INCREMENT[i] for i in range(9) if bits >> i & 1) for bits in range(1 << 9)
+)
+
+
+def squares_to_bits(squares: List[str]) -> tuple[int, int]:
+    """
+    Packs a list of squares into a pair of bitboards.
+
+    Parameters
+    ----------
+    squares : List[str]
+        The squares of the board, each '', 'X' or 'O'.
+
+    Returns
+    -------
+    tuple[int, int]
+        The bitboards for 'X' and 'O'.
+    """
+    x = o = 0
+    for i, square in enumerate(squares):
+        if square == "X":
+            x |= 1 << i
+        elif square == "O":
+            o |= 1 << i
+    return x, o
+
+
+def bits_to_squares(x: int, o: int) -> List[str]:
+    """
+    Unpacks a pair of bitboards into a list of squares.
+
+    Parameters
+    ----------
+    x : int
+        The bitboard for 'X'.
+    o : int
+        The bitboard for 'O'.
+
+    Returns
+    -------
+    List[str]
+        The squares of the board, each '', 'X' or 'O'.
+    """
+    return ["X" if x >> i & 1 else "O" if o >> i & 1 else "" for i in range(9)]
+
+
 class Model:
     """
     A class to represent the model for the Tic Tac Toe game.
 
+    The board is stored as two 9-bit integers, one per player, alongside
+    per-line counters that each move updates for the lines through its
+    square only, so wins and draws are seen without rescanning the board.
+    The ``Board`` with its list of squares is only built when it is asked
+    for, and direct assignment to ``board.squares`` is picked up on the next
+    call.
+
     Attributes
     ----------
     board : Board
         The current state of the Tic Tac Toe board.
+    size : int
+        The number of rows and columns, 3.
+    k : int
+        How many marks in a row win, 3.
     player : str
         The current player ('X' or 'O').
     winner : Optional[str]
         The winner of the game (if any).
+    version : int
+        Increases every time the board changes.
 
     Methods
     -------
@@ -32,18 +157,100 @@ class Model:
     get_winner() -> Optional[str]:
         Returns the winner of the game (if any).
 
-    get_board_state() -> list[str]:
+    get_board_state() -> Board:
         Returns a copy of the current board state.
 
+    get_move_number() -> int:
+        Returns the number of moves played so far.
+
+    is_draw() -> bool:
+        Returns whether the board is full without a winner.
+
+    is_dead_draw() -> bool:
+        Returns whether neither player can win any more.
+
+    is_terminal() -> bool:
+        Returns whether the game is over, won or drawn.
+
+    snapshot() -> tuple:
+        Captures the state of the game so it can be restored later.
+
+    restore(snapshot: tuple) -> None:
+        Puts the game back into a captured state.
+
     move(index: int) -> None:
         Makes a move at the specified index, changes the player, and checks for a winner.
+
+    move_many(indices: List[int]) -> None:
+        Makes several moves atomically: all of them or none.
+
+    undo() -> int:
+        Takes back the last move.
+
+    best_move() -> Optional[int]:
+        Returns the perfect-play move for the player to move, if any.
     """
 
+    __slots__ = ("player", "winner", "version", "_x", "_o", "_cx", "_co", "_history",
+                 "_board", "_squares")
+
+    # The classic 3×3 board; tictactoe.grid.GridModel plays larger ones.
+    size = 3
+    k = 3
+
     def __init__(self):
         """
         Initializes the Model with an empty board and sets the starting player to 'X'.
         """
-        pass
+        self.player = "X"
+        self.winner: Optional[str] = None
+        self.version = next(_VERSIONS)
+        self._x = 0
+        self._o = 0
+        self._cx = 0
+        self._co = 0
+        # The moves that can be undone, 4 bits each (index + 1), the last
+        # move in the lowest bits.
+        self._history = 0
+        self._board: Optional[Board] = None
+        self._squares: Optional[List[str]] = None
+
+    @property
+    def board(self) -> Board:
+        """
+        The board, built from the bitboards the first time it is read.
+        """
+        if self._board is None:
+            self._squares = bits_to_squares(self._x, self._o)
+            self._board = Board(self._squares)
+        return self._board
+
+    @board.setter
+    def board(self, board: Board) -> None:
+        self._board = board
+        self._squares = None
+        self._sync()
+
+    def _sync(self) -> None:
+        """
+        Reloads the bitboards if ``board.squares`` was replaced from outside.
+        """
+        board = self._board
+        if board is not None and board.squares is not self._squares:
+            self._squares = board.squares
+            self._set_bits(*squares_to_bits(self._squares))
+            self.version = next(_VERSIONS)
+
+    def _set_bits(self, x: int, o: int) -> None:
+        """
+        Replaces both bitboards and rebuilds the line counters from them.
+        The moves that led here are unknown, so nothing can be undone.
+        """
+        self._x = x
+        self._o = o
+        self._cx = LINE_COUNTS[x]
+        self._co = LINE_COUNTS[o]
+        self._history = 0
 
     def get_current_player(self) -> str:
         """
@@ -54,19 +261,23 @@ class Model:
         str
             The current player ('X' or 'O').
         """
-        pass
+        return self.player
 
     def change_player(self) -> None:
         """
         Switches the current player from 'X' to 'O' or from 'O' to 'X'.
         """
-        pass
+        self.player = "O" if self.player == "X" else "X"
 
     def set_winner(self) -> None:
         """
         Checks for a winner and sets the winner attribute if there is one.
         """
-        pass
+        self._sync()
+        if WINNING[self._x]:
+            self.winner = "X"
+        elif WINNING[self._o]:
+            self.winner = "O"
 
     def get_winner(self) -> Optional[str]:
         """
@@ -77,23 +288,107 @@ class Model:
         Optional[str]
             The winner of the game, or None if there is no winner yet.
         """
-        pass
+        return self.winner
 
-    def get_board_state(self) -> list[str]:
+    def get_board_state(self) -> Board:
         """
         Returns a copy of the current board state.
 
         Returns
         -------
-        list[str]
+        Board
             A copy of the current board state.
         """
-        pass
+        self._sync()
+        return Board(bits_to_squares(self._x, self._o))
+
+    def get_move_number(self) -> int:
+        """
+        Returns the number of moves played so far.
+
+        Returns
+        -------
+        int
+            The number of occupied squares.
+        """
+        self._sync()
+        return bin(self._x | self._o).count("1")
+
+    def is_draw(self) -> bool:
+        """
+        Returns whether the game is drawn: the board is full and nobody won.
+
+        Returns
+        -------
+        bool
+            True if the game ended in a draw.
+        """
+        self._sync()
+        return self.winner is None and self._x | self._o == FULL_BOARD
+
+    def is_dead_draw(self) -> bool:
+        """
+        Returns whether neither player can win any more: there is no winner,
+        and every line holds marks of both players. This can be true before
+        the board is full.
+
+        Returns
+        -------
+        bool
+            True if the game can only end in a draw.
+        """
+        if self.winner is not None:
+            return False
+        self._sync()
+        cx, co = self._cx, self._co
+        return (cx | cx >> 1) & (co | co >> 1) & LOW_BITS == LOW_BITS
+
+    def is_terminal(self) -> bool:
+        """
+        Returns whether the game is over.
+
+        Returns
+        -------
+        bool
+            True if there is a winner or the board is full.
+        """
+        return self.winner is not None or self.is_draw()
+
+    def snapshot(self) -> tuple:
+        """
+        Captures the state of the game so it can be restored later.
+
+        Returns
+        -------
+        tuple
+            An opaque, immutable copy of the game state.
+        """
+        self._sync()
+        return self._x, self._o, self.player, self.winner, self._history
+
+    def restore(self, snapshot: tuple) -> None:
+        """
+        Puts the game back into a state captured by ``snapshot``.
+
+        Parameters
+        ----------
+        snapshot : tuple
+            A value returned by ``snapshot``.
+        """
+        x, o, self.player, self.winner, history = snapshot
+        self._set_bits(x, o)
+        self._history = history
+        self.version = next(_VERSIONS)
+        self._board = None
+        self._squares = None
 
     def move(self, index: int) -> None:
         """
         Makes a move at the specified index, changes the player, and checks for a winner.
 
+        Only the counters of the lines through ``index`` change, so the
+        winner check does not rescan the board.
+
         Parameters
         ----------
         index : int
@@ -104,8 +399,104 @@ class Model:
         ValueError
             If the specified index is already occupied.
         """
-        if True:
-            pass
+        self._sync()
+        bit = 1 << index
+        if not (self._x | self._o) & bit:
+            if self.player == "X":
+                self._x |= bit
+                self._cx += INCREMENT[index]
+            else:
+                self._o |= bit
+                self._co += INCREMENT[index]
+            if self._squares is not None:
+                self._squares[index] = self.player
+            self._history = self._history << 4 | index + 1
+            self.change_player()
+            # The same outcome as set_winner(), read from the counters.
+            cx, co = self._cx, self._co
+            if cx & cx >> 1 & LOW_BITS:
+                self.winner = "X"
+            elif co & co >> 1 & LOW_BITS:
+                self.winner = "O"
+            self.version = next(_VERSIONS)
         else:
-            logger.error(f'Move failed at index {index} - square already occupied')
+            logger.error('Move failed at index %d - square already occupied', index)
             raise ValueError(SQUARE_OCCUPIED_ERROR_MSG)
+
+    def move_many(self, indices: List[int]) -> None:
+        """
+        Makes several moves in order, atomically: if one fails, none are applied.
+
+        Parameters
+        ----------
+        indices : List[int]
+            The indices at which to move.
+
+        Raises
+        ------
+        ValueError
+            If one of the indices is already occupied.
+        """
+        snapshot = self.snapshot()
+        try:
+            for index in indices:
+                self.move(index)
+        except ValueError:
+            self.restore(snapshot)
+            raise
+
+    def undo(self) -> int:
+        """
+        Takes back the last move: clears its square, gives the turn back to
+        the player who made it and rechecks the winner, all in O(1).
+
+        Moves made before a direct assignment to ``board.squares`` cannot
+        be undone.
+
+        Returns
+        -------
+        int
+            The index of the move taken back.
+
+        Raises
+        ------
+        ValueError
+            If there is no move to take back.
+        """
+        self._sync()
+        if not self._history:
+            raise ValueError(NOTHING_TO_UNDO_ERROR_MSG)
+        index = (self._history & 0xF) - 1
+        self._history >>= 4
+        bit = 1 << index
+        if self._x & bit:
+            self._x ^= bit
+            self._cx -= INCREMENT[index]
+            self.player = "X"
+        else:
+            self._o ^= bit
+            self._co -= INCREMENT[index]
+            self.player = "O"
+        if self._squares is not None:
+            self._squares[index] = ""
+        cx, co = self._cx, self._co
+        self.winner = "X" if cx & cx >> 1 & LOW_BITS else "O" if co & co >> 1 & LOW_BITS else None
+        self.version = next(_VERSIONS)
+        return index
+
+    def best_move(self) -> Optional[int]:
+        """
+        Returns the perfect-play move for the player to move.
+
+        The answer is read from the solved game tree in ``tictactoe.gametree``.
+
+        Returns
+        -------
+        Optional[int]
+            The index to play, or None if the game is over or the position
+            cannot be reached with 'X' moving first.
+        """
+        from tictactoe import gametree
+
+        self._sync()
+        return gametree.best_move(gametree.position_key(self._x, self._o))
@@ -0,0 +1,503 @@
+"""
+A game store kept in Redis, so every worker process shares the same games.
+
+Each game is one hash with the 'X' and 'O' bitboards, the winner code and
+the version. A move, or a batch of moves, is applied by a Lua script that
+checks the squares, places the marks, updates the winner and bumps the
+version atomically in one round trip. Connections come from one pool per
+Redis URL, shared by every store in the process. Changes are announced on a
+pub/sub channel, so a long-poll or stream in one worker process wakes up for
+a move made in another.
+"""
+from contextlib import contextmanager
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+import redis
+
+from tictactoe import (NOTHING_TO_UNDO_ERROR_MSG, SQUARE_OCCUPIED_ERROR_MSG,
+                       UNSUPPORTED_BOARD_ERROR_MSG)
+from tictactoe.events import Broadcaster
+from tictactoe.metrics import timed, timer
+from tictactoe.model import Model, process_epoch
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_URL = "redis://localhost:6379/0"
+KEY_PREFIX = "tictactoe:game:"
+# One counter for every game, so versions are never reused after a game expires.
+VERSION_KEY = "tictactoe:version"
+# Set once, next to the counter, so ETags from before Redis lost its data
+# never match versions counted again from 1.
+EPOCH_KEY = "tictactoe:epoch"
+# Every change is published here as '<sender> <game id>'.
+CHANNEL = "tictactoe:changes"
+
+_WINNERS = (None, "X", "O")
+
+# Shared by both scripts: the win lines and bit helpers.
+_LUA_PRELUDE = """
+local lines = {{0, 1, 2}, {3, 4, 5}, {6, 7, 8}, {0, 3, 6}, {1, 4, 7}, {2, 5, 8},
+               {0, 4, 8}, {2, 4, 6}}
+
+-- Plain arithmetic rather than the bit library, which not every Lua has.
+local function has(b, i)
+    return math.floor(b / 2 ^ i) % 2 == 1
+end
+
+local function wins(b)
+    for _, line in ipairs(lines) do
+        if has(b, line[1]) and has(b, line[2]) and has(b, line[3]) then
+            return true
+        end
+    end
+    return false
+end
+
+local function count(b)
+    local n = 0
+    for i = 0, 8 do
+        if has(b, i) then
+            n = n + 1
+        end
+    end
+    return n
+end
+
+local state = redis.call('HMGET', KEYS[1], 'x', 'o', 'w', 'h')
+local x = tonumber(state[1]) or 0
+local o = tonumber(state[2]) or 0
+local w = tonumber(state[3]) or 0
+-- The moves that can be undone, 4 bits each (index + 1), the last one lowest.
+local h = tonumber(state[4]) or 0
+"""
+
+_LUA_SAVE = """
+local v = redis.call('INCR', KEYS[2])
+redis.call('HSET', KEYS[1], 'x', x, 'o', o, 'w', w, 'v', v, 'h', h)
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+"""
+
+# KEYS[1] is the game hash, KEYS[2] the version counter. ARGV[1] is the TTL in
+# seconds and ARGV[2..] are the squares to play, in order. Returns {0} without
+# writing anything if a square is taken, else {1, x, o, winner, version, history}.
+MOVE_SCRIPT = _LUA_PRELUDE + """
+for i = 2, #ARGV do
+    local index = tonumber(ARGV[i])
+    if has(x, index) or has(o, index) then
+        return {0}
+    end
+    if count(x) == count(o) then
+        x = x + 2 ^ index
+    else
+        o = o + 2 ^ index
+    end
+    h = h * 16 + index + 1
+    if w == 0 then
+        if wins(x) then
+            w = 1
+        elseif wins(o) then
+            w = 2
+        end
+    end
+end
+""" + _LUA_SAVE + """
+return {1, x, o, w, v, h}
+"""
+
+# The same keys and TTL as MOVE_SCRIPT. Takes back the last move and returns
+# the same reply followed by the square freed, or {0} if there is nothing to undo.
+UNDO_SCRIPT = _LUA_PRELUDE + """
+if h == 0 then
+    return {0}
+end
+local index = h % 16 - 1
+h = math.floor(h / 16)
+if has(x, index) then
+    x = x - 2 ^ index
+else
+    o = o - 2 ^ index
+end
+w = 0
+if wins(x) then
+    w = 1
+elseif wins(o) then
+    w = 2
+end
+""" + _LUA_SAVE + """
+return {1, x, o, w, v, h, index}
+"""
+
+_pools: Dict[str, redis.ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def connection_pool(url: str) -> redis.ConnectionPool:
+    """
+    Returns the process-wide connection pool for a Redis URL.
+
+    Parameters
+    ----------
+    url : str
+        The Redis URL, e.g. 'redis://localhost:6379/0'.
+
+    Returns
+    -------
+    redis.ConnectionPool
+        The pool, created on first use.
+    """
+    with _pools_lock:
+        pool = _pools.get(url)
+        if pool is None:
+            pool = _pools[url] = redis.ConnectionPool.from_url(url)
+        return pool
+
+
+class RedisBroadcaster(Broadcaster):
+    """
+    A broadcaster that relays every publish through a Redis channel.
+
+    A publish wakes this process's subscribers at once and is sent to
+    CHANNEL for every other process. A listener thread, started by the first
+    subscription in each process, wakes local subscribers for messages from
+    other senders. The sender is drawn per process, so workers forked from
+    one broadcaster still hear each other.
+
+    Methods
+    -------
+    subscribe(game_id: str) -> Iterator[Subscription]:
+        Registers a blocking subscription for the duration of the block.
+
+    subscribe_async(game_id: str) -> AsyncIterator[AsyncSubscription]:
+        Registers an async subscription for the duration of the block.
+
+    publish(game_id: str) -> int:
+        Wakes every subscriber of a game, in every process.
+    """
+
+    def __init__(self, client: redis.Redis):
+        """
+        Parameters
+        ----------
+        client : redis.Redis
+            The client to publish and listen with.
+        """
+        super().__init__()
+        self.client = client
+        self._listener_pid: Optional[int] = None
+
+    def _sender(self) -> str:
+        return f"{process_epoch()}.{id(self)}"
+
+    def publish(self, game_id: str) -> int:
+        """
+        Wakes every subscriber of a game, in every process.
+
+        Parameters
+        ----------
+        game_id : str
+            The game that changed.
+
+        Returns
+        -------
+        int
+            The number of subscribers notified in this process.
+        """
+        notified = self._notify(game_id)
+        try:
+            self.client.publish(CHANNEL, f"{self._sender()} {game_id}")
+        except redis.RedisError as e:
+            logger.error('Could not publish a change to game %s: %s', game_id, e)
+        return notified
+
+    def _watch(self, game_id: str) -> None:
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+        ready = threading.Event()
+        threading.Thread(target=self._listen, args=(ready,), name="broadcast-listen",
+                         daemon=True).start()
+        # Subscribed before the caller reads the game, so no change is missed.
+        ready.wait(5.0)
+
+    def _listen(self, ready: threading.Event) -> None:
+        pid = os.getpid()
+        while self._listener_pid == pid:
+            try:
+                with self.client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    pubsub.subscribe(CHANNEL)
+                    ready.set()
+                    while self._listener_pid == pid:
+                        message = pubsub.get_message(timeout=1.0)
+                        if message is None:
+                            continue
+                        data = message["data"]
+                        sender, _, game_id = (data.decode() if isinstance(data, bytes)
+                                              else data).partition(" ")
+                        if sender != self._sender():
+                            self._notify(game_id)
+            except redis.RedisError as e:
+                ready.set()
+                logger.error('Lost the change channel, resubscribing: %s', e)
+                time.sleep(1.0)
+
+
+class RedisModel(Model):
+    """
+    A Model loaded from Redis whose moves are applied by the store's Lua script.
+
+    The player to move is derived from the number of marks on the board.
+    Reads use the state loaded with the model; moves go to Redis and the
+    model is refreshed from the script's reply.
+    """
+
+    __slots__ = ("_store", "_key")
+
+    def __init__(self, store: "RedisGameStore", key: str, x: int, o: int, winner: int,
+                 version: int, history: int = 0):
+        super().__init__()
+        self._store = store
+        self._key = key
+        self._load(x, o, winner, version, history)
+
+    def _load(self, x: int, o: int, winner: int, version: int, history: int = 0) -> None:
+        self._set_bits(x, o)
+        self._history = history
+        self.player = "X" if bin(x).count("1") == bin(o).count("1") else "O"
+        self.winner = _WINNERS[winner]
+        self.version = version
+        self._board = None
+        self._squares = None
+
+    def move(self, index: int) -> None:
+        """
+        Makes a move at the specified index in Redis.
+
+        Parameters
+        ----------
+        index : int
+            The index at which to make the move.
+
+        Raises
+        ------
+        ValueError
+            If the specified index is already occupied.
+        """
+        self.move_many([index])
+
+    @timed()
+    def move_many(self, indices: List[int]) -> None:
+        """
+        Makes several moves in Redis in one atomic script call.
+
+        Parameters
+        ----------
+        indices : List[int]
+            The indices at which to move.
+
+        Raises
+        ------
+        ValueError
+            If one of the indices is already occupied. Nothing is written.
+        """
+        if not indices:
+            return
+        result = self._store.move_script(keys=[self._key, VERSION_KEY],
+                                         args=[self._store.ttl, *indices])
+        if not result[0]:
+            logger.error('Move failed at indices %s - square already occupied', indices)
+            raise ValueError(SQUARE_OCCUPIED_ERROR_MSG)
+        self._load(*(int(value) for value in result[1:]))
+
+    def undo(self) -> int:
+        """
+        Takes back the last move in Redis in one atomic script call.
+
+        Returns
+        -------
+        int
+            The index of the move taken back.
+
+        Raises
+        ------
+        ValueError
+            If there is no move to take back.
+        """
+        result = self._store.undo_script(keys=[self._key, VERSION_KEY], args=[self._store.ttl])
+        if not result[0]:
+            raise ValueError(NOTHING_TO_UNDO_ERROR_MSG)
+        self._load(*(int(value) for value in result[1:6]))
+        return int(result[6])
+
+
+class RedisGameStore:
+    """
+    A game store kept in Redis and shared by every process that uses it.
+
+    Games expire after ``ttl`` idle seconds; the memory cap is Redis's own
+    ``maxmemory`` setting. There are no locks: every write is a single
+    atomic script call.
+
+    Attributes
+    ----------
+    shared : bool
+        True: every process connected to the same Redis sees the same games.
+    epoch : str
+        Names the shared version counter, so every process agrees on it.
+    ttl : int
+        Seconds a game may sit idle before Redis expires it.
+
+    Methods
+    -------
+    locked(game_id: str) -> Iterator[Model]:
+        Yields the game's model, loaded from Redis.
+
+    create(game_id: str, model: Model) -> None:
+        Starts a game over, 3×3 only.
+
+    version(game_id: str) -> Optional[int]:
+        Returns the game's version.
+
+    delete(game_id: str) -> None:
+        Removes a game from the store.
+
+    broadcaster() -> RedisBroadcaster:
+        Returns a broadcaster that relays changes between processes.
+    """
+
+    shared = True
+
+    def __init__(self, url: str = None, ttl: int = 3600, client: redis.Redis = None):
+        """
+        Initializes the store.
+
+        Parameters
+        ----------
+        url : str, optional
+            The Redis URL. Defaults to the REDIS_URL environment variable, or
+            DEFAULT_URL if it is not set.
+        ttl : int, optional
+            Seconds a game may sit idle before it expires (default is 1 hour).
+        client : redis.Redis, optional
+            A client to use instead of one on the shared pool for ``url``.
+        """
+        self.ttl = ttl
+        if client is None:
+            url = url or os.environ.get("REDIS_URL", DEFAULT_URL)
+            client = redis.Redis(connection_pool=connection_pool(url))
+        self.client = client
+        self.move_script = client.register_script(MOVE_SCRIPT)
+        self.undo_script = client.register_script(UNDO_SCRIPT)
+        self._epoch: Optional[str] = None
+
+    @property
+    def epoch(self) -> str:
+        # Read on first use rather than in __init__, so the store can be
+        # created before Redis is reachable.
+        if self._epoch is None:
+            with self.client.pipeline() as pipe:
+                pipe.set(EPOCH_KEY, os.urandom(8).hex(), nx=True)
+                pipe.get(EPOCH_KEY)
+                _, epoch = pipe.execute()
+            self._epoch = epoch.decode() if isinstance(epoch, bytes) else epoch
+        return self._epoch
+
+    @staticmethod
+    def key(game_id: str) -> str:
+        return KEY_PREFIX + game_id
+
+    def __contains__(self, game_id: str) -> bool:
+        return bool(self.client.exists(self.key(game_id)))
+
+    @contextmanager
+    def locked(self, game_id: str) -> Iterator[Model]:
+        """
+        Yields the game's model, loaded from Redis, and refreshes its TTL.
+
+        Both happen in one pipelined round trip. No lock is held: concurrent
+        moves are serialized by Redis.
+
+        Parameters
+        ----------
+        game_id : str
+            The game to use. A game that does not exist reads as empty.
+
+        Yields
+        ------
+        Model
+            The model of the game.
+        """
+        key = self.key(game_id)
+        with timer(f"{__name__}.RedisGameStore.load"), \
+                self.client.pipeline(transaction=False) as pipe:
+            pipe.hmget(key, "x", "o", "w", "v", "h")
+            pipe.expire(key, self.ttl)
+            (x, o, w, v, h), _ = pipe.execute()
+        yield RedisModel(self, key, int(x or 0), int(o or 0), int(w or 0), int(v or 0),
+                         int(h or 0))
+
+    def create(self, game_id: str, model: Model) -> None:
+        """
+        Starts a game over. The Lua script only plays 3×3 games.
+
+        Parameters
+        ----------
+        game_id : str
+            The game to start.
+        model : Model
+            The new game. Only its board size is used.
+
+        Raises
+        ------
+        ValueError
+            If the model is not a 3×3 board.
+        """
+        if (model.size, model.k) != (Model.size, Model.k):
+            raise ValueError(UNSUPPORTED_BOARD_ERROR_MSG)
+        self.delete(game_id)
+
+    @timed()
+    def version(self, game_id: str) -> Optional[int]:
+        """
+        Returns the game's version.
+
+        Parameters
+        ----------
+        game_id : str
+            The game to look up.
+
+        Returns
+        -------
+        Optional[int]
+            The version of the game, or None if it is not in the store.
+        """
+        version = self.client.hget(self.key(game_id), "v")
+        return None if version is None else int(version)
+
+    @timed()
+    def delete(self, game_id: str) -> None:
+        """
+        Removes a game from the store.
+
+        Parameters
+        ----------
+        game_id : str
+            The game to remove. Unknown ids are ignored.
+        """
+        self.client.delete(self.key(game_id))
+
+    def broadcaster(self) -> RedisBroadcaster:
+        """
+        Returns a broadcaster that relays changes between processes.
+
+        Returns
+        -------
+        RedisBroadcaster
+            A broadcaster on this store's client.
+        """
+        return RedisBroadcaster(self.client)
@@ -0,0 +1,308 @@
+"""
+Self-play: generates large numbers of complete 3×3 games for fixtures and analysis.
+
+Games are played on the same bitboards as ``tictactoe.model.Model``, with
+each side choosing moves through a policy:
+
+random
+    A uniformly random free square.
+first
+    The lowest-numbered free square.
+optimal
+    The perfect-play move from the solved game tree in ``tictactoe.gametree``.
+
+The free squares of every occupancy and the winner of every bitboard are
+looked up in precomputed tables, so a move is a few list lookups instead of a
+call into Model. Games are played in tasks of ``task_size`` games spread over
+a process pool, and each task returns its games already encoded, 6 bytes per
+game:
+
+    bits  0-35  the squares played, 4 bits each, the first move lowest
+    bits 36-39  the number of moves
+    bits 40-41  the outcome, 0 for a draw, 1 if 'X' won, 2 if 'O' won
+
+A games file is MAGIC followed by these records.
+
+Usage
+-----
+    python -m tictactoe.selfplay --games 1000000 --x random --o optimal --out games.bin
+"""
+import argparse
+from multiprocessing import Pool
+import os
+import random
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from tictactoe.model import WINNING
+
+MAGIC = b"TTTG"
+RECORD_SIZE = 6
+
+DRAW, X_WINS, O_WINS = 0, 1, 2
+OUTCOMES = ("draw", "X", "O")
+
+# FREE[occupied] lists the empty squares of a board whose occupied squares are ``occupied``.
+FREE: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(i for i in range(9) if not occupied >> i & 1) for occupied in range(1 << 9)
+)
+POW3 = tuple(3 ** i for i in range(9))
+
+# A policy picks the square to play from the bitboards of the player to move
+# and its opponent, the base-3 key of the position and a random generator.
+Policy = Callable[[int, int, int, random.Random], int]
+
+
+def random_policy(mine: int, theirs: int, key: int, rng: random.Random) -> int:
+    free = FREE[mine | theirs]
+    return free[int(rng.random() * len(free))]
+
+
+def first_policy(mine: int, theirs: int, key: int, rng: random.Random) -> int:
+    return FREE[mine | theirs][0]
+
+
+def optimal_policy(mine: int, theirs: int, key: int, rng: random.Random) -> int:
+    from tictactoe.gametree import BEST_MOVE
+    return BEST_MOVE[key]
+
+
+POLICIES: Dict[str, Policy] = {
+    "random": random_policy,
+    "first": first_policy,
+    "optimal": optimal_policy,
+}
+
+
+def play_games(count: int, x_policy: str = "random", o_policy: str = "random",
+               seed: int = 0) -> bytes:
+    """
+    Plays games to the end and encodes them.
+
+    Parameters
+    ----------
+    count : int
+        The number of games to play.
+    x_policy : str, optional
+        The policy 'X' plays with (default is 'random').
+    o_policy : str, optional
+        The policy 'O' plays with (default is 'random').
+    seed : int, optional
+        Seeds the random generator, so the same seed plays the same games
+        (default is 0).
+
+    Returns
+    -------
+    bytes
+        ``count`` records of RECORD_SIZE bytes.
+    """
+    policies = (POLICIES[x_policy], POLICIES[o_policy])
+    if "optimal" in (x_policy, o_policy):
+        import tictactoe.gametree  # noqa: F401 -- solve the tree before timing moves
+    rng = random.Random(seed)
+    winning, pow3 = WINNING, POW3
+    out = bytearray()
+    for _ in range(count):
+        boards = [0, 0]
+        key = moves = length = 0
+        outcome = DRAW
+        while length < 9:
+            side = length & 1
+            index = policies[side](boards[side], boards[1 - side], key, rng)
+            boards[side] |= 1 << index
+            key += pow3[index] << side  # 3**i for 'X', 2 * 3**i for 'O'
+            moves |= index << 4 * length
+            length += 1
+            if winning[boards[side]]:
+                outcome = X_WINS + side
+                break
+        out += (moves | length << 36 | outcome << 40).to_bytes(RECORD_SIZE, "little")
+    return bytes(out)
+
+
+def _play_task(task: Tuple[int, str, str, int]) -> bytes:
+    return play_games(*task)
+
+
+def self_play(games: int, x_policy: str = "random", o_policy: str = "random",
+              workers: Optional[int] = None, seed: int = 0,
+              task_size: int = 20_000) -> Iterator[bytes]:
+    """
+    Plays games across a process pool and yields them as they finish.
+
+    Parameters
+    ----------
+    games : int
+        The number of games to play.
+    x_policy : str, optional
+        The policy 'X' plays with (default is 'random').
+    o_policy : str, optional
+        The policy 'O' plays with (default is 'random').
+    workers : int, optional
+        The number of processes, 1 to play in this process. Defaults to the
+        number of CPUs.
+    seed : int, optional
+        The base seed. Task i is seeded with ``seed`` and ``i``, so the
+        result does not depend on the number of workers (default is 0).
+    task_size : int, optional
+        Games per task (default is 20000).
+
+    Yields
+    ------
+    bytes
+        The encoded games of one task, in task order.
+
+    Raises
+    ------
+    ValueError
+        If a policy is unknown.
+    """
+    for policy in (x_policy, o_policy):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}, expected one of {', '.join(POLICIES)}")
+    tasks = [(min(task_size, games - start), x_policy, o_policy, seed << 32 | i)
+             for i, start in enumerate(range(0, games, task_size))]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        yield from map(_play_task, tasks)
+        return
+    with Pool(workers) as pool:
+        yield from pool.imap(_play_task, tasks)
+
+
+def decode(record: int) -> Tuple[str, int, List[int]]:
+    """
+    Decodes one game.
+
+    Parameters
+    ----------
+    record : int
+        The record, read as a little-endian integer.
+
+    Returns
+    -------
+    Tuple[str, int, List[int]]
+        The outcome ('draw', 'X' or 'O'), the number of moves and the squares played.
+    """
+    length = record >> 36 & 0xF
+    return OUTCOMES[record >> 40 & 0x3], length, [record >> 4 * i & 0xF for i in range(length)]
+
+
+def iter_records(data: bytes) -> Iterator[int]:
+    for start in range(0, len(data) - RECORD_SIZE + 1, RECORD_SIZE):
+        yield int.from_bytes(data[start:start + RECORD_SIZE], "little")
+
+
+def read_games(path: str) -> Iterator[Tuple[str, int, List[int]]]:
+    """
+    Reads a games file.
+
+    Parameters
+    ----------
+    path : str
+        A file written by ``write_games``.
+
+    Yields
+    ------
+    Tuple[str, int, List[int]]
+        Each game, as returned by ``decode``.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a games file.
+    """
+    with open(path, "rb") as fh:
+        if fh.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a games file")
+        while True:
+            chunk = fh.read(RECORD_SIZE * 65536)
+            if not chunk:
+                return
+            for record in iter_records(chunk):
+                yield decode(record)
+
+
+class Summary:
+    """
+    Outcome counts and game lengths of a run.
+
+    Methods
+    -------
+    add(chunk: bytes) -> None:
+        Counts the games of one encoded chunk.
+
+    report() -> str:
+        Returns the counts as text.
+    """
+
+    def __init__(self):
+        self.games = 0
+        self.moves = 0
+        self.outcomes = [0, 0, 0]
+
+    def add(self, chunk: bytes) -> None:
+        for record in iter_records(chunk):
+            self.games += 1
+            self.moves += record >> 36 & 0xF
+            self.outcomes[record >> 40 & 0x3] += 1
+
+    def report(self) -> str:
+        if not self.games:
+            return "no games"
+        shares = ", ".join(f"{name} {count / self.games:.2%}"
+                           for name, count in zip(("X wins", "O wins", "draws"),
+                                                  self.outcomes[1:] + self.outcomes[:1]))
+        return f"{self.games:,} games, {self.moves / self.games:.2f} moves on average: {shares}"
+
+
+def write_games(path: str, chunks: Iterable[bytes]) -> Summary:
+    """
+    Streams encoded games to a file as they arrive.
+
+    Parameters
+    ----------
+    path : str
+        The file to write.
+    chunks : Iterable[bytes]
+        Encoded games, e.g. from ``self_play``.
+
+    Returns
+    -------
+    Summary
+        The outcome counts of the games written.
+    """
+    summary = Summary()
+    with open(path, "wb") as fh:
+        fh.write(MAGIC)
+        for chunk in chunks:
+            fh.write(chunk)
+            summary.add(chunk)
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Play Tic Tac Toe against itself.")
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--x", choices=POLICIES, default="random", help="policy for 'X'")
+    parser.add_argument("--o", choices=POLICIES, default="random", help="policy for 'O'")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="file to write the games to")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    chunks = self_play(args.games, args.x, args.o, args.workers, args.seed)
+    if args.out:
+        summary = write_games(args.out, chunks)
+    else:
+        summary = Summary()
+        for chunk in chunks:
+            summary.add(chunk)
+    elapsed = time.perf_counter() - start
+    print(summary.report())
+    print(f"{summary.games / elapsed:,.0f} games/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,468 @@
+"""
+A game store in a memory-mapped file, shared by every worker process on the host.
+
+The file holds a fixed table of 96-byte slots, one per game, split into
+stripes. A game id hashes to one stripe and to a starting slot within it,
+and is found by probing the stripe's slots in order. Each slot packs the
+game id, both bitboards, the player to move, the winner, the version, the
+undo history and the time of last use, so a read is a struct unpack from
+shared memory, with no serialization and no network hop.
+
+Each stripe has its own lock: a threading lock for the threads of one
+process, then an fcntl record lock on one byte of the file for the other
+processes. Games in different stripes never wait on each other. Versions
+come from a counter per stripe, spaced so that no two stripes hand out the
+same version. The epoch in the file header tells one file's counters from
+another's.
+
+The file lives in /dev/shm by default, so it is kept in memory and goes
+away on reboot. It outlives the processes that use it: delete it to clear
+every game. Only 3×3 games fit in a slot.
+"""
+from contextlib import contextmanager
+import fcntl
+from hashlib import blake2b
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Callable, Iterator, List, Optional, Tuple
+import weakref
+
+from tictactoe import UNSUPPORTED_BOARD_ERROR_MSG
+from tictactoe.events import PollingBroadcaster
+from tictactoe.model import Model
+
+logger = logging.getLogger(__name__)
+
+
+MAGIC = b"TTTSHM02"
+# The magic, the number of stripes, the slots per stripe and the epoch: 8
+# random bytes drawn when the file is laid out, so versions counted again in
+# a new file never pass for ones from an old file. A uint64 version counter
+# per stripe follows.
+HEADER = struct.Struct("<8sII8s")
+COUNTER = struct.Struct("<Q")
+# A slot: its state and the length of its game id, then STATE, then the id.
+SLOT = struct.Struct("<BBHHBBQQd64s")
+# x, o, player, winner, version, history and last access, at offset 2.
+STATE = struct.Struct("<HHBBQQd")
+STATE_OFFSET = 2
+
+EMPTY, USED, DELETED = range(3)
+_PLAYERS = ("X", "O")
+_WINNERS = (None, "X", "O")
+_WINNER_CODES = {None: 0, "X": 1, "O": 2}
+
+
+def default_path() -> str:
+    """
+    Returns where the store file is kept unless TICTACTOE_SHM_PATH says otherwise.
+
+    Returns
+    -------
+    str
+        A file in /dev/shm if it exists, else in the temporary directory.
+    """
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "tictactoe-games")
+
+
+# Every open store, so one fork hook can reset all their thread locks.
+_STORES: "weakref.WeakSet[SharedMemoryGameStore]" = weakref.WeakSet()
+
+
+def _reset_all_locks() -> None:
+    for store in list(_STORES):
+        store._reset_locks()
+
+
+os.register_at_fork(after_in_child=_reset_all_locks)
+
+
+class SharedModel(Model):
+    """
+    A Model loaded from a slot, written back to it after every change.
+
+    Its version comes from the store, so every process agrees on it.
+    """
+
+    __slots__ = ("_store", "_offset")
+
+    def __init__(self, store: "SharedMemoryGameStore", offset: int, x: int, o: int,
+                 player: str, winner: Optional[str], version: int, history: int):
+        super().__init__()
+        self._store = store
+        self._offset = offset
+        self.restore((x, o, player, winner, history))
+        self.version = version
+
+    def _save(self) -> None:
+        self.version = self._store._save(self._offset, self)
+
+    def move(self, index: int) -> None:
+        """
+        Makes a move at the specified index and writes the game back.
+
+        Parameters
+        ----------
+        index : int
+            The index at which to make the move.
+
+        Raises
+        ------
+        ValueError
+            If the specified index is already occupied.
+        """
+        super().move(index)
+        self._save()
+
+    def move_many(self, indices: List[int]) -> None:
+        """
+        Makes several moves atomically and writes the game back once.
+
+        Parameters
+        ----------
+        indices : List[int]
+            The indices at which to move.
+
+        Raises
+        ------
+        ValueError
+            If one of the indices is already occupied. Nothing is written.
+        """
+        snapshot, version = self.snapshot(), self.version
+        try:
+            for index in indices:
+                Model.move(self, index)
+        except ValueError:
+            self.restore(snapshot)
+            self.version = version
+            raise
+        self._save()
+
+    def undo(self) -> int:
+        """
+        Takes back the last move and writes the game back.
+
+        Returns
+        -------
+        int
+            The index of the move taken back.
+
+        Raises
+        ------
+        ValueError
+            If there is no move to take back.
+        """
+        index = super().undo()
+        self._save()
+        return index
+
+
+class SharedMemoryGameStore:
+    """
+    A game store in a memory-mapped file, shared by every process that opens it.
+
+    A game is dropped once it has been idle for longer than ``ttl`` seconds,
+    or when its stripe is full and room is needed for a new one.
+
+    Attributes
+    ----------
+    shared : bool
+        True: every process that opens the same file sees the same games.
+    epoch : str
+        Names the file's version counters, so every process agrees on it.
+    path : str
+        The store file.
+    ttl : float
+        Seconds a game may sit idle before it is evicted.
+    max_games : int
+        The number of slots.
+
+    Methods
+    -------
+    locked(game_id: str) -> Iterator[Model]:
+        Yields the game's model while holding its stripe's lock.
+
+    create(game_id: str, model: Model) -> None:
+        Starts a game over, 3×3 only.
+
+    version(game_id: str) -> Optional[int]:
+        Returns the game's version without taking any lock.
+
+    delete(game_id: str) -> None:
+        Removes a game from the store.
+
+    broadcaster() -> PollingBroadcaster:
+        Returns a broadcaster that also sees other processes' moves.
+
+    close() -> None:
+        Unmaps the file.
+    """
+
+    shared = True
+
+    def __init__(self, path: str = None, max_games: int = 65536, stripes: int = 256,
+                 ttl: float = 3600.0, clock: Callable[[], float] = time.time):
+        """
+        Opens the store file, creating it on first use.
+
+        Parameters
+        ----------
+        path : str, optional
+            The store file. Defaults to the TICTACTOE_SHM_PATH environment
+            variable, or ``default_path()`` if it is not set.
+        max_games : int, optional
+            The number of slots, rounded up to a multiple of ``stripes``
+            (default is 65536, about 6 MiB).
+        stripes : int, optional
+            The number of locks the slots are split between (default is 256).
+        ttl : float, optional
+            Seconds a game may sit idle before it is evicted (default is 1 hour).
+        clock : Callable[[], float], optional
+            The time source, in seconds. It must agree between processes
+            (default is time.time).
+
+        Raises
+        ------
+        ValueError
+            If the file already holds a store with a different layout.
+        """
+        self.path = path or os.environ.get("TICTACTOE_SHM_PATH") or default_path()
+        self.ttl = ttl
+        self._clock = clock
+        self._stripes = stripes
+        self._per_stripe = max(1, -(-max_games // stripes))
+        self.max_games = stripes * self._per_stripe
+        self._slots = HEADER.size + COUNTER.size * stripes
+        size = self._slots + self.max_games * SLOT.size
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        # Only one process lays out a new file.
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size == 0:
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, HEADER.pack(MAGIC, stripes, self._per_stripe,
+                                                os.urandom(8)), 0)
+            *layout, epoch = HEADER.unpack(os.pread(self._fd, HEADER.size, 0))
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        if layout != [MAGIC, stripes, self._per_stripe]:
+            os.close(self._fd)
+            raise ValueError(f"{self.path} holds a game store with a different layout")
+        self.epoch = epoch.hex()
+        self._mm = mmap.mmap(self._fd, size)
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        _STORES.add(self)
+
+    def _reset_locks(self) -> None:
+        # A lock held by another thread at fork() would never be released in the child.
+        self._locks = [threading.Lock() for _ in range(self._stripes)]
+
+    def _place(self, game_id: str) -> Tuple[int, int, bytes]:
+        """
+        Returns the stripe, the starting slot within it and the encoded id.
+        """
+        key = game_id.encode()
+        h = int.from_bytes(blake2b(key, digest_size=8).digest(), "little")
+        return h % self._stripes, h // self._stripes % self._per_stripe, key
+
+    @contextmanager
+    def _stripe_lock(self, stripe: int) -> Iterator[None]:
+        with self._locks[stripe]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, stripe)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, stripe)
+
+    def _find(self, stripe: int, start: int, key: bytes, now: float,
+              create: bool) -> Optional[int]:
+        """
+        Returns the offset of the game's slot, probing its stripe from ``start``.
+
+        With ``create`` a missing or expired game gets a fresh slot, evicting
+        the least recently used game of the stripe if it is full; without
+        it, None is returned. Must hold the stripe's lock to create.
+        """
+        mm, per = self._mm, self._per_stripe
+        base = self._slots + stripe * per * SLOT.size
+        free = oldest = None
+        oldest_access = float("inf")
+        for i in range(per):
+            offset = base + (start + i) % per * SLOT.size
+            state, length, _, _, _, _, _, _, last_access, game = SLOT.unpack_from(mm, offset)
+            if state == EMPTY:
+                if free is None:
+                    free = offset
+                break
+            if state == USED and game[:length] == key:
+                if now - last_access <= self.ttl:
+                    return offset
+                free = offset
+                break
+            if free is None and (state == DELETED or now - last_access > self.ttl):
+                free = offset
+            if state == USED and last_access < oldest_access:
+                oldest, oldest_access = offset, last_access
+        if not create:
+            return None
+        if free is None:
+            free = oldest
+        # Only a slot that is actually reused evicts the game in it.
+        state, length, _, _, _, _, _, _, last_access, game = SLOT.unpack_from(mm, free)
+        if state == USED:
+            if now - last_access > self.ttl:
+                logger.info('Evicted game %s - idle for %.0fs', game[:length].decode(),
+                            now - last_access)
+            else:
+                logger.info('Evicted game %s - stripe is full', game[:length].decode())
+        SLOT.pack_into(mm, free, USED, len(key), 0, 0, 0, 0, self._next_version(stripe), 0, now,
+                       key)
+        return free
+
+    def _next_version(self, stripe: int) -> int:
+        # Must hold the stripe's lock.
+        offset = HEADER.size + COUNTER.size * stripe
+        count = COUNTER.unpack_from(self._mm, offset)[0] + 1
+        COUNTER.pack_into(self._mm, offset, count)
+        return count * self._stripes + stripe
+
+    def _save(self, offset: int, model: Model) -> int:
+        """
+        Writes a model to its slot with a new version. Must hold the stripe's lock.
+        """
+        stripe = (offset - self._slots) // (self._per_stripe * SLOT.size)
+        version = self._next_version(stripe)
+        x, o, player, winner, history = model.snapshot()
+        STATE.pack_into(self._mm, offset + STATE_OFFSET, x, o, _PLAYERS.index(player),
+                        _WINNER_CODES[winner], version, history, self._clock())
+        return version
+
+    def __len__(self) -> int:
+        now = self._clock()
+        count = 0
+        for offset in range(self._slots, len(self._mm), SLOT.size):
+            state, last_access = SLOT.unpack_from(self._mm, offset)[::8]
+            if state == USED and now - last_access <= self.ttl:
+                count += 1
+        return count
+
+    def __contains__(self, game_id: str) -> bool:
+        stripe, start, key = self._place(game_id)
+        return self._find(stripe, start, key, self._clock(), create=False) is not None
+
+    @contextmanager
+    def locked(self, game_id: str) -> Iterator[Model]:
+        """
+        Yields the game's model while holding its stripe's lock.
+
+        Parameters
+        ----------
+        game_id : str
+            The game to use. It is created if it does not exist.
+
+        Yields
+        ------
+        Model
+            The model of the game. Its changes are written to shared memory
+            as they are made.
+        """
+        stripe, start, key = self._place(game_id)
+        with self._stripe_lock(stripe):
+            now = self._clock()
+            offset = self._find(stripe, start, key, now, create=True)
+            x, o, player, winner, version, history, _ = STATE.unpack_from(
+                self._mm, offset + STATE_OFFSET)
+            STATE.pack_into(self._mm, offset + STATE_OFFSET, x, o, player, winner, version,
+                            history, now)
+            yield SharedModel(self, offset, x, o, _PLAYERS[player], _WINNERS[winner], version,
+                              history)
+
+    def create(self, game_id: str, model: Model) -> None:
+        """
+        Starts a game over. Slots only hold 3×3 games.
+
+        Parameters
+        ----------
+        game_id : str
+            The game to start.
+        model : Model
+            The new game. Only its board size is used.
+
+        Raises
+        ------
+        ValueError
+            If the model is not a 3×3 board.
+        """
+        if (model.size, model.k) != (Model.size, Model.k):
+            raise ValueError(UNSUPPORTED_BOARD_ERROR_MSG)
+        stripe, start, key = self._place(game_id)
+        with self._stripe_lock(stripe):
+            offset = self._find(stripe, start, key, self._clock(), create=True)
+            self._save(offset, Model())
+
+    def version(self, game_id: str) -> Optional[int]:
+        """
+        Returns the game's version without taking any lock.
+
+        The value may be stale by the time it is used; it is meant for cheap
+        "has anything changed" checks.
+
+        Parameters
+        ----------
+        game_id : str
+            The game to look up.
+
+        Returns
+        -------
+        Optional[int]
+            The version of the game, or None if it is not in the store.
+        """
+        stripe, start, key = self._place(game_id)
+        offset = self._find(stripe, start, key, self._clock(), create=False)
+        if offset is None:
+            return None
+        return STATE.unpack_from(self._mm, offset + STATE_OFFSET)[4]
+
+    def delete(self, game_id: str) -> None:
+        """
+        Removes a game from the store.
+
+        Parameters
+        ----------
+        game_id : str
+            The game to remove. Unknown ids are ignored.
+        """
+        stripe, start, key = self._place(game_id)
+        with self._stripe_lock(stripe):
+            offset = self._find(stripe, start, key, self._clock(), create=False)
+            if offset is not None:
+                self._mm[offset] = DELETED
+
+    def broadcaster(self, interval: float = 0.05) -> PollingBroadcaster:
+        """
+        Returns a broadcaster that also sees other processes' moves.
+
+        Versions are read straight from shared memory without a lock, so
+        polling the watched games is cheap.
+
+        Parameters
+        ----------
+        interval : float, optional
+            Seconds between polls (default is 0.05).
+
+        Returns
+        -------
+        PollingBroadcaster
+            A broadcaster polling this store's versions.
+        """
+        return PollingBroadcaster(self.version, interval)
+
+    def close(self) -> None:
+        self._mm.close()
+        os.close(self._fd)
@@ -0,0 +1,535 @@
+"""
+Warm restarts: periodic snapshots of every game in the in-memory store.
+
+A background thread writes the store to a compact binary file every
+``interval`` seconds and once more at exit. Requests are only held up while
+the store's lookup table is copied, which is a list copy under the store
+lock. Each game is then read under its own lock, one at a time, and
+encoded off the request path into a buffer that is kept between snapshots,
+so it is only allocated once. Snapshots run one at a time. The buffer is
+written to ``<path>.tmp`` and renamed over ``path``, so the file on disk is
+always a complete snapshot: a crash mid-write leaves the previous one in
+place.
+
+A snapshot file is:
+
+    header   magic, number of 3×3 games, number of larger games, time taken,
+             index slots, index offset
+    3×3      16 bytes per game: x, o, player, winner, undo history, id length
+    ids      the 3×3 game ids, back to back
+    larger   per game: size, k, player, winner, id length, cells, id
+    index    an open-addressing hash table on the CRC-32 of the game id, 8
+             bytes per slot: the offsets of the game's record and of its id
+
+On startup the file is only memory-mapped, and the store serves from it
+lazily: a game is looked up in the index, and its model built, the first
+time it is used. Restoring does not read the games at all, so it takes the
+same time however many there are. Games still pending when the next
+snapshot is written are copied over as saved bytes, without being built.
+
+Only one process writes a given file: the snapshotter holds a lock on
+``<path>.lock`` while it runs, and any other process that tries to start one
+logs a warning and leaves the file alone. Under ``serve.py --mode prefork``
+the master gives the file up before forking, and its worker takes it.
+
+Set TICTACTOE_SNAPSHOT to the file to turn this on. It only applies to the
+per-process memory store; the Redis and shared-memory stores keep their
+games outside the process already. With several workers each has its own
+memory store, so serve.py turns snapshots off rather than keep only one
+worker's games.
+"""
+from array import array
+import atexit
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from zlib import crc32
+
+from tictactoe.grid import GridModel
+from tictactoe.journal import load_model
+from tictactoe.metrics import REGISTRY
+from tictactoe.model import Model
+from tictactoe.store import GameStore
+
+logger = logging.getLogger(__name__)
+
+
+MAGIC = b"TTTSNAP2"
+HEADER = struct.Struct("<8sIIdII")
+CLASSIC = struct.Struct("<HHBBQH")
+GRID = struct.Struct("<BBBBH")
+SLOT = struct.Struct("<II")
+
+_PLAYERS = ("X", "O")
+_WINNERS = (None, "X", "O")
+_WINNER_CODES = {None: 0, "X": 1, "O": 2}
+
+
+class SnapshotStats(NamedTuple):
+    games: int
+    pause: float
+    encode: float
+    write: float
+    bytes: int
+
+
+def encode(games: List[Tuple[str, tuple]], buffer: bytearray,
+           saved: Iterable[Tuple[bytes, bool, bytes]] = ()) -> bytearray:
+    """
+    Encodes games into a snapshot, reusing ``buffer``.
+
+    Parameters
+    ----------
+    games : List[Tuple[str, tuple]]
+        Game ids and the ``snapshot()`` of their models, oldest first. A
+        3×3 snapshot has 5 fields; a larger one has 6, then k. If an id
+        appears twice, the later state is kept.
+    buffer : bytearray
+        Cleared and filled with the snapshot.
+    saved : Iterable[Tuple[bytes, bool, bytes]], optional
+        Games copied as they are from an earlier snapshot, from
+        ``SnapshotFile.saved()``. A game in ``games`` too is written from
+        ``games``.
+
+    Returns
+    -------
+    bytearray
+        The buffer.
+    """
+    # encoded id -> whether it is a larger game, and its record without the id.
+    records: Dict[bytes, Tuple[bool, bytes]] = {key: (grid, record)
+                                                for key, grid, record in saved}
+    pack = CLASSIC.pack
+    for game_id, state in games:
+        key = game_id.encode()
+        if len(state) == 5:
+            x, o, player, winner, history = state
+            records[key] = (False, pack(x, o, player == "O", _WINNER_CODES[winner], history,
+                                        len(key)))
+        else:
+            cells, player, winner = state[:3]
+            size = int(len(cells) ** 0.5)
+            records[key] = (True, GRID.pack(size, state[6], player == "O",
+                                            _WINNER_CODES[winner], len(key)) + cells)
+    classic = [(key, record) for key, (grid, record) in records.items() if not grid]
+    grids = [(key, record + key) for key, (grid, record) in records.items() if grid]
+
+    # (key, record offset, id offset) of every game, for the index.
+    entries = []
+    position = HEADER.size
+    id_position = position + len(classic) * CLASSIC.size
+    for key, _ in classic:
+        entries.append((key, position, id_position))
+        position += CLASSIC.size
+        id_position += len(key)
+    position = id_position
+    for key, record in grids:
+        entries.append((key, position, position + len(record) - len(key)))
+        position += len(record)
+    table_offset = position + -position % SLOT.size
+
+    slots = 1
+    while slots < 2 * len(entries):
+        slots <<= 1
+    mask = slots - 1
+    table = array("I", bytes(slots * SLOT.size))
+    for key, record_offset, id_offset in entries:
+        slot = crc32(key) & mask
+        while table[2 * slot]:
+            slot = (slot + 1) & mask
+        table[2 * slot] = record_offset
+        table[2 * slot + 1] = id_offset
+
+    del buffer[:]
+    buffer += HEADER.pack(MAGIC, len(classic), len(grids), time.time(), slots, table_offset)
+    buffer += b"".join(record for _, record in classic)
+    buffer += b"".join(key for key, _ in classic)
+    buffer += b"".join(record for _, record in grids)
+    buffer += bytes(table_offset - len(buffer))
+    buffer += table.tobytes() if sys.byteorder == "little" else _swapped(table)
+    return buffer
+
+
+def _swapped(table: array) -> bytes:
+    table = array("I", table)
+    table.byteswap()
+    return table.tobytes()
+
+
+def _state(model: Model) -> tuple:
+    # The model's own snapshot, with k added for larger boards.
+    if isinstance(model, GridModel):
+        return model.snapshot() + (model.k,)
+    return model.snapshot()
+
+
+class SnapshotFile:
+    """
+    A memory-mapped snapshot that builds models on demand.
+
+    It is what ``GameStore.attach`` serves restored games from. Games are
+    looked up through the hash table at the end of the file, so opening one
+    does not read the games at all. Games are removed from it as the store
+    takes them.
+
+    Methods
+    -------
+    pop(game_id: str) -> Optional[Model]:
+        Builds and removes one game.
+
+    discard(game_id: str) -> None:
+        Removes one game without building it.
+
+    saved() -> List[Tuple[bytes, bool, bytes]]:
+        Returns the saved bytes of the games not taken yet, for the next snapshot.
+
+    close() -> None:
+        Unmaps the file.
+    """
+
+    def __init__(self, path: str):
+        """
+        Maps a snapshot file.
+
+        Parameters
+        ----------
+        path : str
+            The snapshot file.
+
+        Raises
+        ------
+        ValueError
+            If the file is not a snapshot.
+        """
+        with open(path, "rb") as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = self._mm
+        if len(mm) < HEADER.size:
+            mm.close()
+            raise ValueError(f"{path} is not a game snapshot")
+        magic, self._classic, self._grids, self.created, slots, self._table = \
+            HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or slots & (slots - 1) or self._table + slots * SLOT.size != len(mm):
+            mm.close()
+            raise ValueError(f"{path} is not a game snapshot")
+        self._mask = slots - 1
+        # Records below this offset are 3×3 games, above it larger ones.
+        self._ids = HEADER.size + self._classic * CLASSIC.size
+        # Games the store has taken.
+        self._taken: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._classic + self._grids - len(self._taken)
+
+    def __contains__(self, game_id: str) -> bool:
+        return game_id not in self._taken and self._find(game_id) is not None
+
+    def _find(self, game_id: str) -> Optional[int]:
+        # Linear probing from the id's slot; an empty slot ends the search.
+        mm, mask, table = self._mm, self._mask, self._table
+        key = game_id.encode()
+        slot = crc32(key) & mask
+        while True:
+            offset, id_offset = SLOT.unpack_from(mm, table + slot * SLOT.size)
+            if not offset:
+                return None
+            if offset < self._ids:
+                length = CLASSIC.unpack_from(mm, offset)[5]
+            else:
+                length = GRID.unpack_from(mm, offset)[4]
+            if mm[id_offset:id_offset + length] == key:
+                return offset
+            slot = (slot + 1) & mask
+
+    def _build(self, offset: int) -> Model:
+        if offset < self._ids:
+            x, o, player, winner, history, _ = CLASSIC.unpack_from(self._mm, offset)
+            model = Model()
+            model.restore((x, o, _PLAYERS[player], _WINNERS[winner], history))
+            return model
+        size, k, player, winner, _ = GRID.unpack_from(self._mm, offset)
+        cells = self._mm[offset + GRID.size:offset + GRID.size + size * size]
+        return load_model(size, k, cells, _PLAYERS[player], _WINNERS[winner])
+
+    def pop(self, game_id: str) -> Optional[Model]:
+        """
+        Builds a game's model and removes it from the snapshot.
+
+        Parameters
+        ----------
+        game_id : str
+            The game.
+
+        Returns
+        -------
+        Optional[Model]
+            The model, or None if the snapshot does not hold the game.
+        """
+        with self._lock:
+            if game_id in self._taken:
+                return None
+            offset = self._find(game_id)
+            if offset is None:
+                return None
+            self._taken.add(game_id)
+        return self._build(offset)
+
+    def discard(self, game_id: str) -> None:
+        with self._lock:
+            if game_id not in self._taken and self._find(game_id) is not None:
+                self._taken.add(game_id)
+
+    def saved(self) -> List[Tuple[bytes, bool, bytes]]:
+        """
+        Returns the saved bytes of every game not taken yet, in the form ``encode`` takes.
+
+        The next snapshot copies these as they are, so games nobody has used
+        since the restore are never built into models.
+
+        Returns
+        -------
+        List[Tuple[bytes, bool, bytes]]
+            The encoded id, whether it is a larger game, and its record
+            without the id, oldest first.
+        """
+        with self._lock:
+            taken = {game_id.encode() for game_id in self._taken}
+        mm, games = self._mm, []
+        id_offset = self._ids
+        for offset in range(HEADER.size, self._ids, CLASSIC.size):
+            record = mm[offset:offset + CLASSIC.size]
+            length = CLASSIC.unpack_from(record)[5]
+            key = mm[id_offset:id_offset + length]
+            id_offset += length
+            if key not in taken:
+                games.append((key, False, record))
+        offset = id_offset
+        for _ in range(self._grids):
+            size, _, _, _, length = GRID.unpack_from(mm, offset)
+            start = offset + GRID.size + size * size
+            key = mm[start:start + length]
+            if key not in taken:
+                games.append((key, True, mm[offset:start]))
+            offset = start + length
+        return games
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+def restore(store: GameStore, path: str) -> Optional[SnapshotFile]:
+    """
+    Attaches a snapshot file to the store, if there is one.
+
+    Parameters
+    ----------
+    store : GameStore
+        The store to restore into.
+    path : str
+        The snapshot file.
+
+    Returns
+    -------
+    Optional[SnapshotFile]
+        The attached snapshot, or None if the file does not exist or cannot
+        be read.
+    """
+    if not os.path.exists(path):
+        return None
+    start = time.perf_counter()
+    try:
+        snapshot = SnapshotFile(path)
+    except (OSError, ValueError) as e:
+        logger.error('Could not restore games from %s: %s', path, e)
+        return None
+    store.attach(snapshot)
+    logger.info('Restored %d games from %s in %.1f ms', len(snapshot), path,
+                (time.perf_counter() - start) * 1e3)
+    return snapshot
+
+
+class Snapshotter:
+    """
+    Writes snapshots of a store in the background.
+
+    Methods
+    -------
+    snapshot() -> SnapshotStats:
+        Writes a snapshot now and returns how long each phase took.
+
+    start() -> bool:
+        Starts writing a snapshot every ``interval`` seconds, if no other process is.
+
+    release() -> None:
+        Stops the background thread and gives up the file, without a snapshot.
+
+    stop() -> None:
+        Stops the background thread after writing a last snapshot.
+    """
+
+    def __init__(self, store: GameStore, path: str, interval: float = 30.0):
+        """
+        Parameters
+        ----------
+        store : GameStore
+            The store to snapshot.
+        path : str
+            The snapshot file.
+        interval : float, optional
+            Seconds between snapshots (default is 30).
+        """
+        self.store = store
+        self.path = path
+        self.interval = interval
+        self._buffer = bytearray()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock_fd: Optional[int] = None
+
+    def _capture(self) -> Tuple[List[Tuple[bytes, bool, bytes]], List[Tuple[str, tuple]], float]:
+        """
+        Reads every game: the saved bytes of those still pending in a restored
+        snapshot, then the live ones.
+
+        The pending ones are read first, so a game taken from the snapshot in
+        between is written twice rather than lost; the live copy wins.
+        """
+        pending = self.store.pending
+        saved = pending.saved() if pending is not None else []
+        start = time.perf_counter()
+        game_ids, records = self.store.records()
+        pause = time.perf_counter() - start
+        games = []
+        for game_id, record in zip(game_ids, records):
+            with record.lock:
+                games.append((game_id, _state(record.model)))
+        return saved, games, pause
+
+    def snapshot(self) -> SnapshotStats:
+        """
+        Writes a snapshot of every game now.
+
+        Returns
+        -------
+        SnapshotStats
+            The number of games, the time requests were held up for, the
+            time spent reading and encoding, the time spent writing, and the
+            file size.
+        """
+        with self._lock:
+            start = time.perf_counter()
+            saved, games, pause = self._capture()
+            buffer = encode(games, self._buffer, saved)
+            # A game both saved and live is written once.
+            count = sum(HEADER.unpack_from(buffer)[1:3])
+            encoded = time.perf_counter()
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as fh:
+                fh.write(buffer)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp, self.path)
+            done = time.perf_counter()
+        REGISTRY.histogram(f"{__name__}.pause").record(round(pause * 1e9))
+        REGISTRY.histogram(f"{__name__}.snapshot").record(round((done - start) * 1e9))
+        return SnapshotStats(count, pause, encoded - start, done - encoded, len(buffer))
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self.snapshot()
+            except OSError as e:
+                logger.error('Snapshot to %s failed: %s', self.path, e)
+
+    def start(self) -> bool:
+        """
+        Starts writing a snapshot every ``interval`` seconds, if no other process is.
+
+        The file is claimed with a lock on ``<path>.lock``, held until
+        ``stop`` or ``release``, so of several workers only one writes it.
+
+        Returns
+        -------
+        bool
+            True if this process now writes the snapshots.
+        """
+        if self._lock_fd is not None:
+            return True
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            logger.warning('Not snapshotting to %s: another process already does', self.path)
+            return False
+        self._lock_fd = fd
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="snapshot", daemon=True)
+        self._thread.start()
+        return True
+
+    def release(self) -> None:
+        """
+        Stops the background thread without a last snapshot and gives up the file.
+
+        A prefork master calls this before forking, so a worker can ``start``.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def stop(self) -> None:
+        """
+        Writes a last snapshot and gives up the file, if this process writes it.
+        """
+        if self._lock_fd is None:
+            return
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        try:
+            self.snapshot()
+        except OSError as e:
+            logger.error('Snapshot to %s failed: %s', self.path, e)
+        self.release()
+
+
+def open_snapshots(store) -> Optional[Snapshotter]:
+    """
+    Restores the store from TICTACTOE_SNAPSHOT and keeps snapshotting it there.
+
+    The interval is TICTACTOE_SNAPSHOT_INTERVAL seconds (default 30).
+
+    Parameters
+    ----------
+    store
+        The game store. Only the per-process memory store is snapshotted.
+
+    Returns
+    -------
+    Optional[Snapshotter]
+        The snapshotter, or None if snapshots are off or do not apply to
+        this store. It is not running if another process already writes
+        the file.
+    """
+    path = os.environ.get("TICTACTOE_SNAPSHOT")
+    if not path or not isinstance(store, GameStore):
+        return None
+    restore(store, path)
+    snapshotter = Snapshotter(store, path,
+                              float(os.environ.get("TICTACTOE_SNAPSHOT_INTERVAL", 30.0)))
+    snapshotter.start()
+    atexit.register(snapshotter.stop)
+    return snapshotter
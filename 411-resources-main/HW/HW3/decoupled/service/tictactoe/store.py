@@ -0,0 +1,348 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from tictactoe.events import Broadcaster
+from tictactoe.model import Model, process_epoch
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_GAME_ID = "default"
+
+# Store backends by name, as "module:class" so optional dependencies are only
+# imported when their backend is selected.
+STORES = {
+    "memory": "tictactoe.store:GameStore",
+    "redis": "tictactoe.redis_store:RedisGameStore",
+    "shm": "tictactoe.shm_store:SharedMemoryGameStore",
+}
+
+
+class GameRecord:
+    """
+    A single game held by the store.
+
+    Attributes
+    ----------
+    model : Model
+        The state of the game.
+    lock : threading.Lock
+        Serializes access to this game only.
+    last_access : float
+        The store clock reading of the last time the game was used.
+    """
+
+    __slots__ = ("model", "lock", "last_access")
+
+    def __init__(self, now: float, model: Model = None):
+        self.model = model if model is not None else Model()
+        self.lock = threading.Lock()
+        self.last_access = now
+
+
+def record_size() -> int:
+    """
+    Estimates the bytes held by one empty game record.
+
+    Returns
+    -------
+    int
+        The approximate size of a record, its model and its lock.
+    """
+    record = GameRecord(0.0)
+    # The key string and the OrderedDict link cost roughly one more record.
+    return 2 * (sys.getsizeof(record) + sys.getsizeof(record.model)
+                + sys.getsizeof(record.lock))
+
+
+class GameStore:
+    """
+    An in-memory store of games keyed by game id.
+
+    Games are kept in least recently used order. A game is dropped once it
+    has been idle for longer than ``ttl`` seconds, or when the store is full
+    and room is needed for a new one. The store lock only guards the lookup
+    table; moves on a game are serialized by that game's own lock, so
+    different games never wait on each other.
+
+    Attributes
+    ----------
+    shared : bool
+        Whether other processes see the same games. False here: every worker
+        process has its own store.
+    epoch : str
+        Names this process's version counter; see ``tictactoe.model.process_epoch``.
+    ttl : float
+        Seconds a game may sit idle before it is evicted.
+    max_games : int
+        The number of games that fit in the memory budget.
+
+    Methods
+    -------
+    locked(game_id: str) -> Iterator[Model]:
+        Yields the game's model while holding the game's lock.
+
+    create(game_id: str, model: Model) -> None:
+        Starts a game over with the given model.
+
+    version(game_id: str) -> Optional[int]:
+        Returns the game's version without taking any lock.
+
+    delete(game_id: str) -> None:
+        Removes a game from the store.
+
+    records() -> Tuple[List[str], List[GameRecord]]:
+        Returns every live game.
+
+    attach(source) -> None:
+        Serves games not yet in the store from a restored snapshot.
+
+    broadcaster() -> Broadcaster:
+        Returns a broadcaster for the store's game updates.
+    """
+
+    shared = False
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: float = 3600.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initializes an empty store.
+
+        Parameters
+        ----------
+        max_bytes : int, optional
+            The memory budget for game records (default is 64 MiB).
+        ttl : float, optional
+            Seconds a game may sit idle before it is evicted (default is 1 hour).
+        clock : Callable[[], float], optional
+            The time source, in seconds (default is time.monotonic).
+        """
+        self.ttl = ttl
+        self.max_games = max(1, max_bytes // record_size())
+        self._clock = clock
+        self._games: "OrderedDict[str, GameRecord]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Games restored from a snapshot that have not been used since; see attach().
+        self.pending = None
+
+    @property
+    def epoch(self) -> str:
+        # Versions come from the process-wide counter, so the epoch is the process's.
+        return process_epoch()
+
+    def __len__(self) -> int:
+        return len(self._games) + (len(self.pending) if self.pending is not None else 0)
+
+    def __contains__(self, game_id: str) -> bool:
+        return game_id in self._games or (self.pending is not None and game_id in self.pending)
+
+    def _record(self, game_id: str) -> GameRecord:
+        """
+        Looks up a game, creating it if needed, and marks it as just used.
+        """
+        now = self._clock()
+        with self._lock:
+            self._evict_expired(now)
+            record = self._games.get(game_id)
+            if record is None:
+                if len(self._games) >= self.max_games:
+                    evicted, _ = self._games.popitem(last=False)
+                    logger.info('Evicted game %s - store is full', evicted)
+                model = self.pending.pop(game_id) if self.pending is not None else None
+                record = self._games[game_id] = GameRecord(now, model)
+            else:
+                self._games.move_to_end(game_id)
+                record.last_access = now
+            return record
+
+    def _evict_expired(self, now: float) -> None:
+        """
+        Drops idle games from the cold end of the LRU order. Must hold the store lock.
+        """
+        games = self._games
+        while games:
+            game_id, record = next(iter(games.items()))
+            if now - record.last_access <= self.ttl:
+                break
+            del games[game_id]
+            logger.info('Evicted game %s - idle for %.0fs', game_id, now - record.last_access)
+
+    @contextmanager
+    def locked(self, game_id: str) -> Iterator[Model]:
+        """
+        Yields the game's model while holding the game's lock.
+
+        Parameters
+        ----------
+        game_id : str
+            The game to use. It is created if it does not exist.
+
+        Yields
+        ------
+        Model
+            The model of the game.
+        """
+        record = self._record(game_id)
+        with record.lock:
+            yield record.model
+
+    def create(self, game_id: str, model: Model) -> None:
+        """
+        Starts a game over with the given model, replacing any game with that id.
+
+        Memory is budgeted for 3×3 games, so many large boards may use more
+        than ``max_bytes``.
+
+        Parameters
+        ----------
+        game_id : str
+            The game to start.
+        model : Model
+            The new game, e.g. a ``tictactoe.grid.GridModel`` for a larger board.
+        """
+        now = self._clock()
+        with self._lock:
+            self._evict_expired(now)
+            self._games.pop(game_id, None)
+            if self.pending is not None:
+                self.pending.discard(game_id)
+            if len(self._games) >= self.max_games:
+                evicted, _ = self._games.popitem(last=False)
+                logger.info('Evicted game %s - store is full', evicted)
+            self._games[game_id] = GameRecord(now, model)
+
+    def version(self, game_id: str) -> Optional[int]:
+        """
+        Returns the game's version without taking any lock or touching the LRU order.
+
+        The value may be stale by the time it is used; it is meant for cheap
+        "has anything changed" checks.
+
+        Parameters
+        ----------
+        game_id : str
+            The game to look up.
+
+        Returns
+        -------
+        Optional[int]
+            The version of the game, or None if it is not in the store.
+        """
+        record = self._games.get(game_id)
+        return None if record is None else record.model.version
+
+    def delete(self, game_id: str) -> None:
+        """
+        Removes a game from the store.
+
+        Parameters
+        ----------
+        game_id : str
+            The game to remove. Unknown ids are ignored.
+        """
+        with self._lock:
+            self._games.pop(game_id, None)
+            if self.pending is not None:
+                self.pending.discard(game_id)
+
+    def records(self) -> Tuple[List[str], List[GameRecord]]:
+        """
+        Returns every live game, in no particular order.
+
+        Only the lookup table is copied under the store lock; read a model
+        under its record's lock.
+
+        Returns
+        -------
+        Tuple[List[str], List[GameRecord]]
+            The game ids and, in the same order, their records.
+        """
+        with self._lock:
+            # The plain dict views skip the OrderedDict's linked list, so the
+            # copies are C loops and the lock is held for milliseconds.
+            return list(dict.keys(self._games)), list(dict.values(self._games))
+
+    def attach(self, source) -> None:
+        """
+        Serves games that are not in the store yet from a restored snapshot.
+
+        A game is taken out of ``source`` and becomes a live game the first
+        time it is used, so restoring does not build every model up front.
+
+        Parameters
+        ----------
+        source : tictactoe.snapshot.SnapshotFile
+            Anything with ``pop(game_id) -> Optional[Model]``,
+            ``discard(game_id)``, ``len()`` and ``in``.
+        """
+        with self._lock:
+            self.pending = source
+
+    def broadcaster(self) -> Broadcaster:
+        """
+        Returns a broadcaster for the store's game updates.
+
+        Every game lives in this process, so only this process's moves need
+        to reach its subscribers.
+
+        Returns
+        -------
+        Broadcaster
+            An in-process broadcaster.
+        """
+        return Broadcaster()
+
+
+def store_class(name: str = None) -> type:
+    """
+    Returns the game store backend selected by name.
+
+    Parameters
+    ----------
+    name : str, optional
+        A key of STORES. Defaults to the TICTACTOE_STORE environment
+        variable, or 'memory' if it is not set.
+
+    Returns
+    -------
+    type
+        The store class.
+
+    Raises
+    ------
+    ValueError
+        If the name is not a known backend.
+    """
+    name = name or os.environ.get("TICTACTOE_STORE", "memory")
+    try:
+        module_name, class_name = STORES[name].split(":")
+    except KeyError:
+        raise ValueError(f"Unknown game store {name!r}, expected one of {sorted(STORES)}")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def create_store(name: str = None) -> GameStore:
+    """
+    Creates the game store backend selected by name.
+
+    Parameters
+    ----------
+    name : str, optional
+        A key of STORES. Defaults to the TICTACTOE_STORE environment
+        variable, or 'memory' if it is not set.
+
+    Returns
+    -------
+    GameStore
+        A new store.
+    """
+    cls = store_class(name)
+    logger.info('Using the %s game store', cls.__name__)
+    return cls()
@@ -0,0 +1,104 @@
+"""
+An ASGI application serving the game state stream from an event loop.
+
+It answers the same ``/tictactoe[/<game_id>]/stream`` routes as the Flask
+app, but each watcher is a coroutine waiting on an async subscription
+instead of a server thread, so thousands of idle streams fit in one process.
+Reading the game takes its lock, or a round trip to Redis, so reads run in
+the loop's thread pool. With a shared store, the store's broadcaster wakes
+streams for moves made on other workers too.
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from tictactoe import INVALID_GAME_ID_ERROR_MSG
+from tictactoe.controller import (BROADCASTER, event_version, next_state_event,
+                                  validate_game_id, VIEW)
+from tictactoe.store import DEFAULT_GAME_ID
+
+logger = logging.getLogger(__name__)
+
+
+HEARTBEAT_SECONDS = 15.0
+
+
+def stream_game_id(path: str) -> Optional[str]:
+    """
+    Returns the game id of a stream route, or None if the path is not one.
+
+    Parameters
+    ----------
+    path : str
+        The request path.
+
+    Returns
+    -------
+    Optional[str]
+        The game id, DEFAULT_GAME_ID for the bare route, or None.
+    """
+    parts = path.strip("/").split("/")
+    if parts == ["tictactoe", "stream"]:
+        return DEFAULT_GAME_ID
+    if len(parts) == 3 and parts[0] == "tictactoe" and parts[2] == "stream":
+        return parts[1]
+    return None
+
+
+async def _disconnected(receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def stream_app(scope, receive, send, heartbeat: float = HEARTBEAT_SECONDS) -> None:
+    """
+    Streams the game state as Server-Sent Events, one message per change.
+
+    Parameters
+    ----------
+    scope : dict
+        The ASGI connection scope. The path must be a stream route.
+    receive : Callable
+        The ASGI receive channel.
+    send : Callable
+        The ASGI send channel.
+    heartbeat : float, optional
+        Seconds between heartbeats on an idle stream (default is 15).
+    """
+    try:
+        game_id = validate_game_id(stream_game_id(scope["path"]))
+    except ValueError:
+        await send({"type": "http.response.start", "status": 400,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body",
+                    "body": b'{"error":"%s"}' % INVALID_GAME_ID_ERROR_MSG.encode()})
+        return
+
+    last_version = None
+    for name, value in scope.get("headers", ()):
+        if name == b"last-event-id":
+            last_version = event_version(value.decode("latin-1"))
+
+    await send({"type": "http.response.start", "status": 200, "headers": [
+        (b"content-type", b"text/event-stream"),
+        (b"cache-control", b"no-cache"),
+        (b"x-accel-buffering", b"no"),
+    ]})
+    loop = asyncio.get_running_loop()
+    disconnected = asyncio.ensure_future(_disconnected(receive))
+    try:
+        async with BROADCASTER.subscribe_async(game_id) as subscription:
+            fired = True
+            while not disconnected.done():
+                # The read takes the game's lock, or a round trip to Redis,
+                # so it runs in a worker thread rather than on the loop.
+                event, last_version = await loop.run_in_executor(
+                    None, next_state_event, game_id, last_version)
+                if event is not None:
+                    await send({"type": "http.response.body", "body": event, "more_body": True})
+                elif not fired:
+                    await send({"type": "http.response.body", "body": VIEW.HEARTBEAT,
+                                "more_body": True})
+                fired = await subscription.wait(heartbeat)
+    finally:
+        disconnected.cancel()
@@ -1,27 +1,182 @@
+import json
 import logging
+import threading
+from typing import Iterable, List, Optional
 
-from flask import jsonify, make_response, Response
-from tictactoe import Board
+from flask import Response
+from tictactoe import (Board, GAME_OVER_ERROR_MSG, INVALID_BOARD_ERROR_MSG,
+                       INVALID_GAME_ID_ERROR_MSG, INVALID_MOVE_ERROR_MSG,
+                       NOTHING_TO_UNDO_ERROR_MSG, SQUARE_OCCUPIED_ERROR_MSG,
+                       UNSUPPORTED_BOARD_ERROR_MSG)
+from tictactoe.metrics import timed
 
 logger = logging.getLogger(__name__)
 
+
+# JSON tokens for every value a square, the winner or the player can take.
+_TOKENS = {None: b"null", "": b'""', "X": b'"X"', "O": b'"O"'}
+
+
+def encode(payload: dict) -> bytes:
+    """
+    Encodes a payload the way Flask's jsonify does: compact, sorted keys, trailing newline.
+    """
+    return json.dumps(payload, separators=(",", ":"), sort_keys=True).encode() + b"\n"
+
+
+def encode_board(squares: List[str]) -> bytes:
+    """
+    Encodes a list of squares as a JSON array without building intermediate objects.
+    """
+    return b"[" + b",".join([_TOKENS[square] for square in squares]) + b"]"
+
+
+# The three possible winner bodies and the bodies of the known errors are
+# encoded once, at import time.
+WINNER_BODIES = {winner: encode({"winner": winner}) for winner in (None, "X", "O")}
+ERROR_BODIES = {error: encode({"error": error}) for error in (
+    SQUARE_OCCUPIED_ERROR_MSG, INVALID_MOVE_ERROR_MSG, INVALID_GAME_ID_ERROR_MSG,
+    GAME_OVER_ERROR_MSG, INVALID_BOARD_ERROR_MSG, UNSUPPORTED_BOARD_ERROR_MSG,
+    NOTHING_TO_UNDO_ERROR_MSG)}
+
+
+def json_response(body: bytes, status_code: int = 200) -> Response:
+    """
+    Wraps an encoded JSON body in a response.
+    """
+    return Response(body, status_code, mimetype="application/json")
+
 class View:
     """
     A class to represent the view for the Tic Tac Toe game.
 
+    Bodies are encoded straight to bytes rather than through jsonify, and
+    the constant ones (winners, known errors) are encoded once and reused.
+    Responses rendered with an ETag keep their JSON body in a bounded cache,
+    so a repeated read of an unchanged game is served without serializing.
+
     Methods
     -------
-    board_state(board: Board) -> Response:
+    etag(kind: str, epoch: str, version: int) -> str:
+        Returns the ETag of a response about a given game version.
+
+    cached(etag: str) -> Optional[Response]:
+        Returns a response rebuilt from the cached body for an ETag, if any.
+
+    not_modified(etag: str) -> Response:
+        Returns an empty 304 Not Modified response.
+
+    board_state(board: Board, etag: str = None) -> Response:
         Returns the current state of the board as a JSON response.
 
-    get_winner(winner: str = None) -> Response:
+    get_winner(winner: str = None, etag: str = None) -> Response:
         Returns the winner of the game as a JSON response.
 
-    error(error: str) -> Response:
+    game_state(board: Board, winner: str, player: str, move_number: int, etag: str = None) -> Response:
+        Returns the board, winner, current player and move number as one JSON response.
+
+    state_event(board: Board, winner: str, player: str, move_number: int, epoch: str,
+                version: int) -> bytes:
+        Encodes the game state as one Server-Sent Events message.
+
+    event_stream(events: Iterable[bytes]) -> Response:
+        Returns a streaming Server-Sent Events response.
+
+    error(error: str, status_code: int = 400) -> Response:
         Returns an error message as a JSON response.
     """
 
-    def board_state(self, board: Board) -> Response:
+    # A Server-Sent Events comment line, sent to keep idle streams open.
+    HEARTBEAT = b": keep-alive\n\n"
+
+    def __init__(self, cache_size: int = 4096):
+        """
+        Initializes the View with an empty response cache.
+
+        Parameters
+        ----------
+        cache_size : int, optional
+            The number of response bodies to keep (default is 4096).
+        """
+        self.cache_size = cache_size
+        self._cache: dict[str, bytes] = {}
+        self._cache_lock = threading.Lock()
+
+    @staticmethod
+    def etag(kind: str, epoch: str, version: int) -> str:
+        """
+        Returns the ETag of a response about a given game version.
+
+        Parameters
+        ----------
+        kind : str
+            What the response holds, e.g. 'board' or 'winner'.
+        epoch : str
+            The epoch of the store the version was counted in, so the same
+            version from another process or an earlier run is another ETag.
+        version : int
+            The version of the game the response was rendered from.
+
+        Returns
+        -------
+        str
+            The (unquoted) ETag.
+        """
+        return f"{kind}-{epoch}-{version}"
+
+    def cached(self, etag: str) -> Optional[Response]:
+        """
+        Returns a response rebuilt from the cached body for an ETag.
+
+        Parameters
+        ----------
+        etag : str
+            The ETag to look up.
+
+        Returns
+        -------
+        Optional[Response]
+            The response, or None if the body is not cached.
+        """
+        body = self._cache.get(etag)
+        if body is None:
+            return None
+        response = json_response(body)
+        response.set_etag(etag)
+        return response
+
+    def not_modified(self, etag: str) -> Response:
+        """
+        Returns an empty 304 Not Modified response.
+
+        Parameters
+        ----------
+        etag : str
+            The ETag the client already holds.
+
+        Returns
+        -------
+        Response
+            A Flask response object with status 304.
+        """
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    def _tagged(self, response: Response, etag: Optional[str]) -> Response:
+        """
+        Sets the ETag on a fresh response and caches its body.
+        """
+        if etag is not None:
+            response.set_etag(etag)
+            with self._cache_lock:
+                if len(self._cache) >= self.cache_size:
+                    del self._cache[next(iter(self._cache))]
+                self._cache[etag] = response.get_data()
+        return response
+
+    @timed()
+    def board_state(self, board: Board, etag: str = None) -> Response:
         """
         Returns the current state of the board as a JSON response.
 
@@ -29,15 +184,19 @@ class View:
         ----------
         board : Board
             The current state of the Tic Tac Toe board.
+        etag : str, optional
+            The ETag to send and cache the body under (default is None).
 
         Returns
         -------
         Response
             A Flask response object containing the board state.
         """
-        pass
+        body = b'{"board":' + encode_board(board.squares) + b"}\n"
+        return self._tagged(json_response(body), etag)
 
-    def get_winner(self, winner: str = None) -> Response:
+    @timed()
+    def get_winner(self, winner: str = None, etag: str = None) -> Response:
         """
         Returns the winner of the game as a JSON response.
 
@@ -45,15 +204,101 @@ class View:
         ----------
         winner : str, optional
             The winner of the game (default is None).
+        etag : str, optional
+            The ETag to send and cache the body under (default is None).
 
         Returns
         -------
         Response
             A Flask response object containing the winner.
         """
-        pass
+        return self._tagged(json_response(WINNER_BODIES[winner]), etag)
+
+    @timed()
+    def game_state(self, board: Board, winner: str, player: str,
+                   move_number: int, etag: str = None) -> Response:
+        """
+        Returns the whole state of the game as a single JSON response.
+
+        Parameters
+        ----------
+        board : Board
+            The current state of the Tic Tac Toe board.
+        winner : str
+            The winner of the game, or None.
+        player : str
+            The player to move next ('X' or 'O').
+        move_number : int
+            The number of moves played so far.
+        etag : str, optional
+            The ETag to send and cache the body under (default is None).
+
+        Returns
+        -------
+        Response
+            A Flask response object containing the game state.
+        """
+        body = self._state_json(board, winner, player, move_number) + b"\n"
+        return self._tagged(json_response(body), etag)
+
+    @staticmethod
+    def _state_json(board: Board, winner: str, player: str, move_number: int) -> bytes:
+        return b'{"board":%b,"move_number":%d,"player":%b,"winner":%b}' % (
+            encode_board(board.squares), move_number, _TOKENS[player], _TOKENS[winner])
+
+    @timed()
+    def state_event(self, board: Board, winner: str, player: str,
+                    move_number: int, epoch: str, version: int) -> bytes:
+        """
+        Encodes the game state as one Server-Sent Events message.
+
+        The message id is the store's epoch and the game version, so a
+        reconnecting client sends them back as ``Last-Event-ID``.
+
+        Parameters
+        ----------
+        board : Board
+            The current state of the Tic Tac Toe board.
+        winner : str
+            The winner of the game, or None.
+        player : str
+            The player to move next ('X' or 'O').
+        move_number : int
+            The number of moves played so far.
+        epoch : str
+            The epoch of the store the version was counted in.
+        version : int
+            The version of the game.
+
+        Returns
+        -------
+        bytes
+            The encoded message.
+        """
+        data = self._state_json(board, winner, player, move_number)
+        return b"id: %s-%d\nevent: state\ndata: %b\n\n" % (epoch.encode(), version, data)
+
+    def event_stream(self, events: Iterable[bytes]) -> Response:
+        """
+        Returns a streaming Server-Sent Events response.
+
+        Parameters
+        ----------
+        events : Iterable[bytes]
+            The encoded messages, produced as the game changes.
+
+        Returns
+        -------
+        Response
+            A Flask response object that streams the messages.
+        """
+        response = Response(events, 200, mimetype="text/event-stream")
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers["X-Accel-Buffering"] = "no"
+        return response
 
-    def error(self, error: str) -> Response:
+    @timed()
+    def error(self, error: str, status_code: int = 400) -> Response:
         """
         Returns an error message as a JSON response.
 
@@ -61,10 +306,15 @@ class View:
         ----------
         error : str
             The error message to return.
+        status_code : int, optional
+            The HTTP status code of the response (default is 400).
 
         Returns
         -------
         Response
             A Flask response object containing the error message.
         """
-        pass
+        body = ERROR_BODIES.get(error)
+        if body is None:
+            body = encode({"error": error})
+        return json_response(body, status_code)
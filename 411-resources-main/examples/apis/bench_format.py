@@ -0,0 +1,41 @@
+"""Casts formatted per second: format_throws on each cast against format_batch.
+
+Usage:
+    python bench_format.py [--casts 1000000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+import iching
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--casts', type=int, default=1000000)
+    args = parser.parse_args()
+
+    lines = iching.cast_batch(args.casts, rng=np.random.default_rng(0))
+    rows = lines.tolist()
+
+    start = time.perf_counter()
+    iching.cast_table()
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for row in rows:
+        iching.format_throws(row)
+    before = time.perf_counter() - start
+
+    start = time.perf_counter()
+    iching.format_batch(lines)
+    after = time.perf_counter() - start
+
+    print('table built in {:.1f} ms'.format(build * 1000))
+    print('format_throws {:>12,.0f} casts/s'.format(args.casts / before))
+    print('format_batch  {:>12,.0f} casts/s  ({:.0f}x)'.format(args.casts / after, before / after))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""Casts per second of the one-at-a-time loop against cast_batch.
+
+Usage:
+    python bench_iching.py [--loop 2000] [--batch 1000000]
+"""
+import argparse
+import contextlib
+import io
+import time
+
+import iching
+
+
+def loop_rate(method, casts):
+    start = time.perf_counter()
+    # throw_stalks narrates to stderr; keep that off the terminal but inside the timing
+    with contextlib.redirect_stderr(io.StringIO()):
+        for _ in range(casts):
+            list(iching.build_lines(method(True)))
+    return casts / (time.perf_counter() - start)
+
+
+def batch_rate(coins, casts):
+    start = time.perf_counter()
+    iching.cast_batch(casts, coins)
+    return casts / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--loop', type=int, default=2000, help='casts for the per-cast loop')
+    parser.add_argument('--batch', type=int, default=1000000, help='casts for the batch')
+    args = parser.parse_args()
+
+    print('{:<7} {:>12} {:>14} {:>9}'.format('method', 'loop/s', 'batch/s', 'speedup'))
+    for name, method, coins in (('stalks', iching.throw_stalks, False),
+                                ('coins', iching.throw_coins, True)):
+        before, after = loop_rate(method, args.loop), batch_rate(coins, args.batch)
+        print('{:<7} {:>12,.0f} {:>14,.0f} {:>8.0f}x'.format(name, before, after, after / before))
+
+
+if __name__ == '__main__':
+    main()
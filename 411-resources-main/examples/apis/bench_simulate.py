@@ -0,0 +1,37 @@
+"""Casts per second of simulate.py as workers are added, up to one per CPU.
+
+Usage:
+    python bench_simulate.py [--casts 4000000] [--task-size 250000]
+"""
+import argparse
+import os
+import time
+
+from simulate import simulate
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--casts', type=int, default=4000000)
+    parser.add_argument('--task-size', type=int, default=250000)
+    parser.add_argument('-c', '--coins', action='store_true')
+    args = parser.parse_args()
+
+    workers, counts = 1, []
+    while workers < os.cpu_count():
+        counts.append(workers)
+        workers *= 2
+    counts.append(os.cpu_count())
+
+    print('{:>7} {:>14} {:>8}'.format('workers', 'casts/s', 'scaling'))
+    base = None
+    for workers in counts:
+        start = time.perf_counter()
+        simulate(args.casts, args.coins, workers, seed=0, task_size=args.task_size)
+        rate = args.casts / (time.perf_counter() - start)
+        base = base or rate
+        print('{:>7} {:>14,.0f} {:>7.2f}x'.format(workers, rate, rate / base))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""A buffered pool of random.org numbers.
+
+Instead of one HTTPS request per cast, numbers are fetched from random.org in
+large blocks over a keep-alive session and handed out from memory. When a
+pool runs low it refills itself on a background thread. Whatever is left at
+exit is saved to a file and loaded again on the next run, so no fetched
+number goes to waste. Loading claims the file by renaming it away before
+reading it, so a number is never handed out twice: not by two processes
+starting at once, and not again after a run that was killed before it could
+save. If random.org cannot be reached in time, the missing numbers come from
+the operating system's CSPRNG instead.
+"""
+import atexit
+from collections import deque
+import json
+import os
+import secrets
+import sys
+import threading
+
+import requests
+
+DEFAULT_BASE_URL = 'https://www.random.org'
+DEFAULT_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.iching_entropy.json')
+
+_system_random = secrets.SystemRandom()
+
+# For each kind of number: the random.org query for num of them, how to parse
+# one, and how to make one locally
+KINDS = {
+    'coins': ('/integers/?format=plain&num={num}&min=2&max=3&col=1&base=10&rnd=new', int,
+              lambda: _system_random.randint(2, 3)),
+    'stalks': ('/decimal-fractions/?num={num}&dec=2&col=1&format=plain&rnd=new', float,
+               lambda: round(_system_random.random(), 2)),
+}
+
+
+class EntropyPool:
+    """Numbers of one kind from random.org, fetched in bulk and served from memory"""
+
+    def __init__(self, kind, base_url=DEFAULT_BASE_URL, block=1800, low_water=360,
+                 session=None, timeout=(3.05, 10), wait=5.0):
+        """
+        Args:
+            kind (str): 'coins' for 2s and 3s, or 'stalks' for fractions with 2 decimals
+            base_url (str): Where random.org is, e.g. a local stub for tests
+            block (int): How many numbers to fetch at a time (random.org allows up to 10000)
+            low_water (int): Start a background refill when fewer than this are left
+            session (requests.Session): The session to fetch with. Defaults to a new one
+            timeout (float or (float, float)): The connect and read timeouts for a fetch
+            wait (float): Seconds take() waits for a refill before using the CSPRNG
+        """
+        self.kind = kind
+        self.url = base_url.rstrip('/') + KINDS[kind][0].format(num=block)
+        self.low_water = low_water
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.wait = wait
+        self.fallbacks = 0
+        self._values = deque()
+        self._refilling = False
+        self._closed = False
+        self._thread = None
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return len(self._values)
+
+    def extend(self, values):
+        with self._cond:
+            self._values.extend(values)
+            self._cond.notify_all()
+
+    def fetch(self):
+        """Fetches one block from random.org
+
+        Returns:
+            ([int] or [float]) The numbers, or an empty list if the fetch failed
+        """
+        parse = KINDS[self.kind][1]
+        try:
+            r = self.session.get(self.url, timeout=self.timeout)
+            r.raise_for_status()
+            return [parse(x) for x in r.text.split()]
+        except (requests.RequestException, ValueError) as e:
+            sys.stderr.write('Could not fetch {} from random.org: {}\n'.format(self.kind, e))
+            return []
+
+    def _refill(self):
+        values = self.fetch()
+        with self._cond:
+            self._values.extend(values)
+            self._refilling = False
+            self._cond.notify_all()
+
+    def refill(self):
+        """Starts a background refill, unless one is already running or the pool is closed"""
+        with self._cond:
+            if self._refilling or self._closed:
+                return
+            self._refilling = True
+            self._thread = threading.Thread(target=self._refill, daemon=True)
+            self._thread.start()
+
+    def close(self):
+        """Stops refilling, waiting for a fetch in flight to finish
+
+        take() still hands out what is left, then falls back to the CSPRNG.
+        """
+        with self._cond:
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def take(self, n):
+        """Returns n numbers, from the pool if it has them
+
+        Waits up to `wait` seconds for a refill if the pool is short, then
+        makes up the difference with the CSPRNG.
+
+        Args:
+            n (int): How many numbers to take
+
+        Returns:
+            ([int] or [float]) The numbers
+        """
+        with self._cond:
+            if len(self._values) < n:
+                self.refill()
+                self._cond.wait_for(lambda: len(self._values) >= n or not self._refilling, self.wait)
+            values = [self._values.popleft() for _ in range(min(n, len(self._values)))]
+            low = len(self._values) < self.low_water
+        if low:
+            self.refill()
+        if len(values) < n:
+            self.fallbacks += n - len(values)
+            values += [KINDS[self.kind][2]() for _ in range(n - len(values))]
+        return values
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def load(path):
+    """Takes the numbers saved by save(), or nothing if there is no file
+
+    The file is renamed to one only this process uses before it is read,
+    then removed, so no other process can load the same numbers.
+    """
+    claimed = '{}.{}'.format(path, os.getpid())
+    try:
+        os.rename(path, claimed)
+    except OSError:
+        return {}
+    try:
+        with open(claimed) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    finally:
+        os.unlink(claimed)
+
+
+def save(path=None):
+    """Writes the numbers left in every pool to path, to be used by the next run
+
+    Numbers already saved there, by another process, are kept too.
+    """
+    path = path or os.environ.get('ICHING_ENTROPY_FILE', DEFAULT_CACHE_FILE)
+    saved = load(path)
+    with _pools_lock:
+        pools = list(_pools.items())
+    for kind, pool in pools:
+        with pool._cond:
+            saved[kind] = saved.get(kind, []) + list(pool._values)
+    tmp = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp, 'w') as fh:
+        json.dump(saved, fh)
+    os.replace(tmp, path)
+
+
+def get_pool(kind):
+    """Returns the process-wide pool for kind
+
+    The first call loads the numbers saved by the last run and arranges for
+    the leftovers to be saved at exit. ICHING_RANDOM_URL overrides the
+    random.org address and ICHING_ENTROPY_FILE the file.
+    """
+    with _pools_lock:
+        if not _pools:
+            session = requests.Session()
+            base_url = os.environ.get('ICHING_RANDOM_URL', DEFAULT_BASE_URL)
+            saved = load(os.environ.get('ICHING_ENTROPY_FILE', DEFAULT_CACHE_FILE))
+            for name in KINDS:
+                _pools[name] = EntropyPool(name, base_url, session=session)
+                _pools[name].extend(saved.get(name, []))
+            atexit.register(save)
+        return _pools[kind]
@@ -0,0 +1,125 @@
+"""The 64 hexagrams in the King Wen sequence, with their Wilhelm names.
+
+A hexagram is numbered here by its yang lines as bits, bottom line first, so
+0 is all yin and 63 all yang. The lower trigram is the bottom three bits and
+the upper trigram the top three.
+"""
+
+# Trigrams by their yang lines as bits, bottom line first
+TRIGRAMS = {
+    'Qian': 0b111,
+    'Dui': 0b011,
+    'Li': 0b101,
+    'Zhen': 0b001,
+    'Xun': 0b110,
+    'Kan': 0b010,
+    'Gen': 0b100,
+    'Kun': 0b000,
+}
+
+# King Wen numbers: one row per lower trigram, one column per upper trigram,
+# both in this order
+KING_WEN_ORDER = ('Qian', 'Zhen', 'Kan', 'Gen', 'Kun', 'Xun', 'Li', 'Dui')
+KING_WEN_TABLE = (
+    (1, 34, 5, 26, 11, 9, 14, 43),
+    (25, 51, 3, 27, 24, 42, 21, 17),
+    (6, 40, 29, 4, 7, 59, 64, 47),
+    (33, 62, 39, 52, 15, 53, 56, 31),
+    (12, 16, 8, 23, 2, 20, 35, 45),
+    (44, 32, 48, 18, 46, 57, 50, 28),
+    (13, 55, 63, 22, 36, 37, 30, 49),
+    (10, 54, 60, 41, 19, 61, 38, 58),
+)
+
+NAMES = (
+    None,
+    'The Creative',
+    'The Receptive',
+    'Difficulty at the Beginning',
+    'Youthful Folly',
+    'Waiting (Nourishment)',
+    'Conflict',
+    'The Army',
+    'Holding Together (Union)',
+    'The Taming Power of the Small',
+    'Treading (Conduct)',
+    'Peace',
+    'Standstill (Stagnation)',
+    'Fellowship with Men',
+    'Possession in Great Measure',
+    'Modesty',
+    'Enthusiasm',
+    'Following',
+    'Work on What Has Been Spoiled (Decay)',
+    'Approach',
+    'Contemplation (View)',
+    'Biting Through',
+    'Grace',
+    'Splitting Apart',
+    'Return (The Turning Point)',
+    'Innocence (The Unexpected)',
+    'The Taming Power of the Great',
+    'The Corners of the Mouth (Providing Nourishment)',
+    'Preponderance of the Great',
+    'The Abysmal (Water)',
+    'The Clinging, Fire',
+    'Influence (Wooing)',
+    'Duration',
+    'Retreat',
+    'The Power of the Great',
+    'Progress',
+    'Darkening of the Light',
+    'The Family (The Clan)',
+    'Opposition',
+    'Obstruction',
+    'Deliverance',
+    'Decrease',
+    'Increase',
+    'Break-through (Resoluteness)',
+    'Coming to Meet',
+    'Gathering Together (Massing)',
+    'Pushing Upward',
+    'Oppression (Exhaustion)',
+    'The Well',
+    'Revolution (Molting)',
+    'The Caldron',
+    'The Arousing (Shock, Thunder)',
+    'Keeping Still, Mountain',
+    'Development (Gradual Progress)',
+    'The Marrying Maiden',
+    'Abundance (Fullness)',
+    'The Wanderer',
+    'The Gentle (The Penetrating, Wind)',
+    'The Joyous, Lake',
+    'Dispersion (Dissolution)',
+    'Limitation',
+    'Inner Truth',
+    'Preponderance of the Small',
+    'After Completion',
+    'Before Completion',
+)
+
+
+def _king_wen():
+    numbers = [0] * 64
+    for row, lower in enumerate(KING_WEN_ORDER):
+        for column, upper in enumerate(KING_WEN_ORDER):
+            numbers[TRIGRAMS[lower] | TRIGRAMS[upper] << 3] = KING_WEN_TABLE[row][column]
+    return tuple(numbers)
+
+
+# King Wen number of each hexagram, indexed by its yang bits
+KING_WEN = _king_wen()
+
+
+def king_wen(bits):
+    """Returns the King Wen number and name of a hexagram
+
+    Args:
+        bits (int): The hexagram's yang lines as bits, bottom line first
+
+    Returns:
+        (int, str) The number, 1-64, and the Wilhelm name
+    """
+    number = KING_WEN[bits]
+    return number, NAMES[number]
@@ -1,8 +1,22 @@
 import argparse
+from collections import namedtuple
 from datetime import datetime
+from functools import lru_cache
 import random
-import requests
 import sys
+import time
+
+from entropy import get_pool
+from hexagrams import king_wen
+from journal import JournalWriter
+
+try:
+    import numpy as np
+except ImportError:  # Only the batch mode (--count) needs numpy
+    np = None
+
+# How many casts the batch functions work on at once, to bound memory
+BATCH_CHUNK = 1 << 16
 
 
 def print_fingers(fingers):
@@ -15,25 +29,20 @@ def print_fingers(fingers):
     sys.stderr.write('\n')
 
 def get_coins():
-    """Curls random.org to get the coin flips
+    """Takes the coin flips from the pool of random.org numbers
 
     Returns:
         An array of coin flips
     """
-    url = 'https://www.random.org/integers/?format=plain&num=18&min=2&max=3&col=18&base=10'
-    r = requests.get(url)
-    text = r.text
-    return [int(x) for x in text.strip().split('\t')]
+    return get_pool('coins').take(18)
 
 def get_stalks():
-    """Curls random.org to get the number of stalks
+    """Takes the stalk splits from the pool of random.org numbers
 
     Returns:
         The array of stalk splits
     """
-    r = requests.get('https://www.random.org/decimal-fractions/?num=18&dec=2&col=18&format=plain&rnd=new')
-    text = r.text
-    return [float(x) for x in text.strip().split('\t')]
+    return get_pool('stalks').take(18)
 
 def throw_stalks(test):
     """Attempt to capture the spirit of the traditional yarrow stalk method. It's
@@ -128,6 +137,54 @@ def build_lines(throws):
             yield sum(line)
             line = []
 
+def stalk_lines_batch(splits):
+    """The yarrow stalk method of throw_stalks, for many casts at once
+
+    Args:
+        splits (np.ndarray): float array of shape (casts, 18), each row in the
+            order throw_stalks would get it from get_stalks
+
+    Returns:
+        (np.ndarray) uint8 array of shape (casts, 6), the lines 6-9 from the bottom up
+    """
+    # throw_stalks pops its splits from the end
+    splits = splits[:, ::-1].reshape(-1, 6, 3)
+    stalks = np.full(splits.shape[:2], 50, dtype=np.int64)
+    lines = np.zeros(splits.shape[:2], dtype=np.uint8)
+    for step in range(3):
+        stalks -= 1
+        left = (splits[:, :, step] * stalks).astype(np.int64)
+        right = stalks - left - 1
+        # A pile counted off by fours leaves 4, not 0
+        throw = 1 + (left - 1) % 4 + 1 + (right - 1) % 4 + 1
+        lines += np.where(throw > 6, 2, 3).astype(np.uint8)
+        stalks -= throw - 1
+    return lines
+
+def cast_batch(count, coins=False, rng=None):
+    """Casts many hexagrams at once with a local random generator
+
+    Args:
+        count (int): How many hexagrams to cast
+        coins (Bool): Throw the coins instead of the yarrow stalks
+        rng (np.random.Generator): The generator to use. Defaults to a fresh unseeded one
+
+    Returns:
+        (np.ndarray) uint8 array of shape (count, 6), the lines 6-9 of each cast from the bottom up
+    """
+    if np is None:
+        raise ImportError('Casting in batches needs numpy')
+    rng = rng if rng is not None else np.random.default_rng()
+    lines = np.empty((count, 6), dtype=np.uint8)
+    for start in range(0, count, BATCH_CHUNK):
+        n = min(BATCH_CHUNK, count - start)
+        if coins:
+            throws = rng.integers(2, 4, size=(n, 6, 3), dtype=np.uint8)
+            lines[start:start + n] = throws.sum(axis=2, dtype=np.uint8)
+        else:
+            lines[start:start + n] = stalk_lines_batch(rng.random((n, 18)))
+    return lines
+
 def format_line(throw):
     """Converts the line number into a string and a flag for whether it's floating
 
@@ -176,28 +233,139 @@ def format_throws(throws):
     return '\n'.join(['   {}'.format(line) for line in reversed(reversed_output)])
 
 
+# Everything about one of the 4^6 possible casts. The secondary fields are
+# None when no line is changing.
+Cast = namedtuple('Cast', 'text primary primary_name secondary secondary_name')
+
+def pack_lines(lines):
+    """Packs six lines, bottom first, into a 12-bit cast key, two bits per line
+
+    Args:
+        lines ([int]): The lines, each 6-9
+
+    Returns:
+        (int) The key, 0-4095
+    """
+    key = 0
+    for i, line in enumerate(lines):
+        key |= (line - 6) << (2 * i)
+    return key
+
+def unpack_lines(key):
+    """The inverse of pack_lines"""
+    return [6 + (key >> (2 * i) & 3) for i in range(6)]
+
+@lru_cache(maxsize=None)
+def cast_table():
+    """Builds the table of every possible cast, indexed by its packed key
+
+    Returns:
+        ([Cast]) 4096 casts, with their text exactly as format_throws renders it
+    """
+    table = []
+    for key in range(4096):
+        lines = unpack_lines(key)
+        # 7 and 9 are yang; the changing lines 6 and 9 flip in the secondary
+        primary = sum(1 << i for i, line in enumerate(lines) if line in (7, 9))
+        secondary = sum(1 << i for i, line in enumerate(lines) if line in (6, 7))
+        changing = primary != secondary
+        table.append(Cast(format_throws(lines), *king_wen(primary),
+                          *(king_wen(secondary) if changing else (None, None))))
+    return table
+
+def describe(cast):
+    """Names the hexagrams of a cast, e.g. '11. Peace -> 12. Standstill (Stagnation)'"""
+    text = '{}. {}'.format(cast.primary, cast.primary_name)
+    if cast.secondary is not None:
+        text += ' -> {}. {}'.format(cast.secondary, cast.secondary_name)
+    return text
+
+def pack_batch(lines):
+    """Packs each row of a cast_batch array into its 12-bit key
+
+    Args:
+        lines (np.ndarray): uint8 array of shape (casts, 6)
+
+    Returns:
+        (np.ndarray) uint16 array of keys
+    """
+    shifts = np.arange(0, 12, 2, dtype=np.uint16)
+    return ((lines.astype(np.uint16) - 6) << shifts).sum(axis=1, dtype=np.uint16)
+
+def format_batch(lines):
+    """Renders many casts at once by looking each one up in the cast table
+
+    Args:
+        lines (np.ndarray): uint8 array of shape (casts, 6), as returned by cast_batch
+
+    Returns:
+        (np.ndarray) The text of each cast, as format_throws renders it
+    """
+    texts = np.array([cast.text for cast in cast_table()], dtype=object)
+    return texts[pack_batch(lines)]
+
+def format_result(cast, coins, test, when):
+    """Formats a cast in the layout the CLI appends to --file
+
+    The layout is the one the script has always written, so older files
+    and journal.py export read the same. The CLI prints the hexagram names
+    after it on the console only.
+
+    Args:
+        cast (Cast): The cast, from cast_table
+        coins (Bool): Whether it was thrown with coins rather than stalks
+        test (Bool): Whether it was a test run
+        when (datetime): When it was cast
+
+    Returns:
+        (str) The block of text for the cast
+    """
+    return '''
+----------------
+{date}
+
+{formatted_throw}
+
+{method_name}{test_run}
+'''.format(method_name='The Coins' if coins else 'The Stalks',
+           formatted_throw=cast.text,
+           test_run=' (test run)' if test else '',
+           date=when.strftime('%Y-%m-%d %H:%M:%S'))
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('-t', '--test', action='store_true')
     parser.add_argument('-c', '--coins', action='store_true', help='Throw the coins not the yarrow stalks')
     parser.add_argument('-f', '--file', help='file to append results to')
+    parser.add_argument('-j', '--journal', help='binary journal to append casts to, see journal.py')
+    parser.add_argument('-n', '--count', type=int, help='Cast this many hexagrams locally with numpy and print how often each line came up')
     args = parser.parse_args()
 
-    method = throw_coins if args.coins else throw_stalks
-    throw = build_lines(method(args.test))
-    formatted_results = '''
-----------------
-{date}
+    if args.count:
+        start = time.perf_counter()
+        lines = cast_batch(args.count, args.coins)
+        elapsed = time.perf_counter() - start
+        frequencies = np.bincount(lines.ravel(), minlength=10)[6:] / lines.size
+        print('{} {:,} casts in {:.3f} s'.format('Coins' if args.coins else 'Stalks', args.count, elapsed))
+        for line, frequency in zip(range(6, 10), frequencies):
+            print('{}: {:.4f}'.format(line, frequency))
+        if args.journal:
+            with JournalWriter(args.journal) as journal:
+                journal.append_batch(pack_batch(lines), args.coins, True)
+        sys.exit()
 
-{formatted_throw}
-
-{method_name}{test_run}
-'''.format(method_name='The Coins' if args.coins else 'The Stalks',
-                           formatted_throw=format_throws(throw),
-                           test_run=' (test run)' if args.test else '',
-                           date=datetime.today().strftime('%Y-%m-%d %H:%M:%S'))
+    method = throw_coins if args.coins else throw_stalks
+    key = pack_lines(build_lines(method(args.test)))
+    now = datetime.today()
+    cast = cast_table()[key]
+    formatted_results = format_result(cast, args.coins, args.test, now)
 
+    if args.journal:
+        with JournalWriter(args.journal) as journal:
+            journal.append(key, args.coins, args.test, now.timestamp())
     if args.file:
         with open(args.file, 'a') as fh:
             fh.write(formatted_results)
     print(formatted_results)
+    print(describe(cast))
@@ -0,0 +1,258 @@
+"""A compact binary journal of casts.
+
+The journal is an 8-byte header followed by fixed 12-byte records:
+
+    time    float64  seconds since the epoch
+    method  uint8    0 for the stalks, 1 for the coins
+    flags   uint8    bit 0 set for a test run
+    cast    uint16   the six lines packed two bits each, see iching.pack_lines
+
+Records are buffered and appended in batches. The reader maps the file
+rather than loading it, so it can scan millions of casts in chunks. A
+record cut short by a crash is ignored by the reader, and cut off when the
+journal is next opened for writing so later records stay aligned.
+
+Usage:
+    python journal.py stats FILE
+    python journal.py export FILE [--limit N]
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:  # Only append_batch and aggregate need numpy
+    np = None
+
+MAGIC = b'ICHJ'
+VERSION = 1
+HEADER = struct.Struct('<4sHH')
+RECORD = struct.Struct('<dBBH')
+TEST_FLAG = 1
+
+if np is not None:
+    RECORD_DTYPE = np.dtype([('time', '<f8'), ('method', 'u1'), ('flags', 'u1'), ('cast', '<u2')])
+
+
+class JournalWriter:
+    """Appends casts to a journal, a batch of records per write"""
+
+    def __init__(self, path, buffer_records=4096):
+        """
+        Args:
+            path (str): The journal. It is created if it does not exist
+            buffer_records (int): How many records to hold before writing them out
+        """
+        if os.path.exists(path):
+            truncate_partial_record(path)
+        self.fh = open(path, 'ab')
+        if self.fh.tell() == 0:
+            self.fh.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        self.buffer_records = buffer_records
+        self._buffer = []
+
+    def append(self, cast, coins, test, timestamp=None):
+        """Adds one cast
+
+        Args:
+            cast (int): The packed lines, 0-4095
+            coins (Bool): Thrown with coins rather than stalks
+            test (Bool): A test run
+            timestamp (float): When it was cast. Defaults to now
+        """
+        self._buffer.append(RECORD.pack(time.time() if timestamp is None else timestamp,
+                                        int(bool(coins)), TEST_FLAG if test else 0, cast))
+        if len(self._buffer) >= self.buffer_records:
+            self.flush()
+
+    def append_batch(self, casts, coins, test, timestamp=None):
+        """Adds many casts made at the same time in one write
+
+        Args:
+            casts (np.ndarray): The packed lines of each cast, as from iching.pack_batch
+            coins (Bool): Thrown with coins rather than stalks
+            test (Bool): Test runs
+            timestamp (float): When they were cast. Defaults to now
+        """
+        records = np.empty(len(casts), dtype=RECORD_DTYPE)
+        records['time'] = time.time() if timestamp is None else timestamp
+        records['method'] = int(bool(coins))
+        records['flags'] = TEST_FLAG if test else 0
+        records['cast'] = casts
+        self.flush()
+        self.fh.write(records.tobytes())
+
+    def flush(self):
+        if self._buffer:
+            self.fh.write(b''.join(self._buffer))
+            self._buffer = []
+        self.fh.flush()
+
+    def close(self):
+        self.flush()
+        self.fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def check_header(path):
+    with open(path, 'rb') as fh:
+        header = fh.read(HEADER.size)
+    if len(header) < HEADER.size or HEADER.unpack(header) != (MAGIC, VERSION, RECORD.size):
+        raise ValueError('{} is not a version {} cast journal'.format(path, VERSION))
+
+
+def truncate_partial_record(path):
+    """Cuts off whatever a crash left of a header or record at the end of a journal
+
+    A file holding only the start of the header is emptied, so the header
+    is written again. Anything else must be a journal, and is cut back to
+    its last whole record.
+
+    Args:
+        path (str): The journal
+
+    Raises:
+        ValueError: The file is not a cast journal
+    """
+    size = os.path.getsize(path)
+    if size < HEADER.size:
+        with open(path, 'rb') as fh:
+            start = fh.read()
+        if HEADER.pack(MAGIC, VERSION, RECORD.size).startswith(start):
+            os.truncate(path, 0)
+            return
+    check_header(path)
+    partial = (size - HEADER.size) % RECORD.size
+    if partial:
+        os.truncate(path, size - partial)
+
+
+class JournalReader:
+    """Reads a journal through a memory map"""
+
+    def __init__(self, path):
+        check_header(path)
+        self.fh = open(path, 'rb')
+        size = os.fstat(self.fh.fileno()).st_size
+        self.count = (size - HEADER.size) // RECORD.size
+        self.mm = mmap.mmap(self.fh.fileno(), 0, access=mmap.ACCESS_READ) if self.count else None
+
+    def __len__(self):
+        return self.count
+
+    def records(self):
+        """Yields (time, coins, test, cast) for every record, oldest first"""
+        for offset in range(HEADER.size, HEADER.size + self.count * RECORD.size, RECORD.size):
+            timestamp, method, flags, cast = RECORD.unpack_from(self.mm, offset)
+            yield timestamp, bool(method), bool(flags & TEST_FLAG), cast
+
+    def chunks(self, size=1 << 20):
+        """Yields the records as numpy arrays of up to size records, without copying
+
+        The arrays are views of the map: drop them before close(), which
+        raises BufferError while any is still alive.
+        """
+        for start in range(0, self.count, size):
+            n = min(size, self.count - start)
+            yield np.frombuffer(self.mm, RECORD_DTYPE, n, HEADER.size + start * RECORD.size)
+
+    def aggregate(self):
+        """Counts every cast in the journal by method and cast
+
+        Returns:
+            (dict) 'casts' and 'tests' in all, 'first' and 'last' times, and
+            'by_cast', a (2, 4096) array of counts by method and packed cast
+        """
+        by_cast = np.zeros((2, 4096), dtype=np.int64)
+        tests, first, last = 0, None, None
+        for chunk in self.chunks():
+            for method in (0, 1):
+                by_cast[method] += np.bincount(chunk['cast'][chunk['method'] == method], minlength=4096)
+            tests += int(np.count_nonzero(chunk['flags'] & TEST_FLAG))
+            first = chunk['time'].min() if first is None else min(first, chunk['time'].min())
+            last = chunk['time'].max() if last is None else max(last, chunk['time'].max())
+            # Let go of the view, so the map can be closed
+            del chunk
+        return {'casts': self.count, 'tests': tests, 'first': first, 'last': last, 'by_cast': by_cast}
+
+    def close(self):
+        try:
+            if self.mm is not None:
+                self.mm.close()
+        finally:
+            self.fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def export_text(path, out, limit=None):
+    """Writes the journal's casts in the text layout of iching.py --file
+
+    Args:
+        path (str): The journal
+        out (file): Where to write the text
+        limit (int): Export only the last limit casts
+    """
+    # iching imports this module, so import it here rather than at the top
+    from datetime import datetime
+    from iching import cast_table, format_result
+
+    table = cast_table()
+    with JournalReader(path) as reader:
+        skip = 0 if limit is None else max(0, len(reader) - limit)
+        for i, (timestamp, coins, test, cast) in enumerate(reader.records()):
+            if i >= skip:
+                out.write(format_result(table[cast], coins, test, datetime.fromtimestamp(timestamp)))
+
+
+def print_stats(path):
+    from datetime import datetime
+    from iching import cast_table, describe, unpack_lines
+
+    table = cast_table()
+    with JournalReader(path) as reader:
+        stats = reader.aggregate()
+    print('{:,} casts ({:,} test runs)'.format(stats['casts'], stats['tests']))
+    if not stats['casts']:
+        return
+    print('from {} to {}'.format(datetime.fromtimestamp(stats['first']), datetime.fromtimestamp(stats['last'])))
+    lines = np.array([unpack_lines(key) for key in range(4096)])
+    for method, name in enumerate(('stalks', 'coins')):
+        counts = stats['by_cast'][method]
+        total = counts.sum()
+        if not total:
+            continue
+        line_counts = [(counts[:, None] * (lines == line)).sum() for line in range(6, 10)]
+        print('\n{}: {:,} casts'.format(name, total))
+        print('  lines ' + '  '.join('{}: {:.4f}'.format(line, n / (6 * total))
+                                     for line, n in zip(range(6, 10), line_counts)))
+        print('  most common: {} ({:,})'.format(describe(table[counts.argmax()]), counts.max()))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('command', choices=('stats', 'export'))
+    parser.add_argument('file')
+    parser.add_argument('--limit', type=int, help='export only the last N casts')
+    args = parser.parse_args()
+    if args.command == 'stats':
+        print_stats(args.file)
+    else:
+        export_text(args.file, sys.stdout, args.limit)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Monte Carlo comparison of the yarrow stalk and coin methods.
+
+Casts are split into tasks and run across a process pool. Each task gets its
+own random stream spawned from one SeedSequence, so a run is reproducible
+from its seed and no two tasks share random numbers. Tasks return tallies of
+lines, hexagrams and changing lines, which are merged as they finish.
+
+Usage:
+    python simulate.py [--casts 10000000] [--workers 4] [--seed 411] [-c]
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import math
+import os
+import time
+
+import numpy as np
+
+from iching import cast_batch
+
+# The textbook probabilities of 6, 7, 8 and 9
+EXPECTED = {
+    'stalks': (1 / 16, 5 / 16, 7 / 16, 3 / 16),
+    'coins': (1 / 8, 3 / 8, 3 / 8, 1 / 8),
+}
+
+# The weight of each line, bottom first, in a hexagram's number 0-63
+LINE_BITS = 1 << np.arange(6, dtype=np.uint8)
+
+
+class Tally:
+    """Running counts of lines, hexagrams and changing lines"""
+
+    def __init__(self):
+        self.casts = 0
+        self.lines = np.zeros(4, dtype=np.int64)        # 6, 7, 8, 9
+        self.hexagrams = np.zeros(64, dtype=np.int64)   # by yang bits, bottom line first
+        self.changing = np.zeros(7, dtype=np.int64)     # casts with 0-6 changing lines
+
+    def add(self, lines):
+        """Counts a batch of casts
+
+        Args:
+            lines (np.ndarray): uint8 array of shape (casts, 6), as returned by cast_batch
+        """
+        self.casts += len(lines)
+        self.lines += np.bincount(lines.ravel(), minlength=10)[6:]
+        # 7 and 9 are yang, 6 and 9 are changing
+        self.hexagrams += np.bincount((lines & 1) @ LINE_BITS, minlength=64)
+        changing = ((lines == 6) | (lines == 9)).sum(axis=1)
+        self.changing += np.bincount(changing, minlength=7)
+
+    def merge(self, other):
+        self.casts += other.casts
+        self.lines += other.lines
+        self.hexagrams += other.hexagrams
+        self.changing += other.changing
+        return self
+
+    def line_frequencies(self, z=1.96):
+        """Returns the frequency of each line with its confidence interval
+
+        Args:
+            z (float): The number of standard errors on each side, 1.96 for 95%
+
+        Returns:
+            ([(float, float)]) The frequency and half-width of the interval for 6, 7, 8 and 9
+        """
+        n = self.lines.sum()
+        return [(p, z * math.sqrt(p * (1 - p) / n)) for p in self.lines / n]
+
+    def report(self, expected):
+        lines = ['{:,} casts'.format(self.casts), '', 'line  frequency   95% CI     expected']
+        for line, (p, half), e in zip(range(6, 10), self.line_frequencies(), expected):
+            flag = '' if abs(p - e) <= half else '  *'
+            lines.append('{}     {:.5f}  +-{:.5f}   {:.5f}{}'.format(line, p, half, e, flag))
+        mean = self.changing @ np.arange(7) / self.casts
+        lines.append('')
+        lines.append('changing lines per cast: {:.4f} (expected {:.4f})'.format(mean, 6 * (expected[0] + expected[3])))
+        counts = self.hexagrams
+        lines.append('hexagrams: least {:.5f}, most {:.5f}, uniform {:.5f}'.format(
+            counts.min() / self.casts, counts.max() / self.casts, 1 / 64))
+        return '\n'.join(lines)
+
+
+def run_task(args):
+    seed, casts, coins = args
+    tally = Tally()
+    tally.add(cast_batch(casts, coins, np.random.default_rng(seed)))
+    return tally
+
+
+def simulate(casts, coins=False, workers=None, seed=None, task_size=1000000, progress=None):
+    """Casts and tallies hexagrams across a process pool
+
+    Args:
+        casts (int): How many hexagrams to cast in all
+        coins (Bool): Throw the coins instead of the yarrow stalks
+        workers (int): Processes to use. Defaults to one per CPU
+        seed (int): Seed for the run, or None for a fresh one
+        task_size (int): Casts per task
+        progress (callable): Called with the running Tally after each task
+
+    Returns:
+        (Tally) The counts from every cast
+    """
+    sizes = [task_size] * (casts // task_size) + ([casts % task_size] if casts % task_size else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tally = Tally()
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(run_task, (s, n, coins)) for s, n in zip(seeds, sizes)]
+        for future in as_completed(futures):
+            tally.merge(future.result())
+            if progress is not None:
+                progress(tally)
+    return tally
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--casts', type=int, default=10000000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--task-size', type=int, default=1000000)
+    parser.add_argument('-c', '--coins', action='store_true', help='Throw the coins not the yarrow stalks')
+    args = parser.parse_args()
+
+    expected = EXPECTED['coins' if args.coins else 'stalks']
+
+    def progress(tally):
+        # Convergence: the widest interval shrinks as 1 / sqrt(casts)
+        widest = max(half for _, half in tally.line_frequencies())
+        error = max(abs(p - e) for (p, _), e in zip(tally.line_frequencies(), expected))
+        print('{:>14,} casts  widest 95% CI +-{:.5f}  largest error {:.5f}'.format(tally.casts, widest, error))
+
+    start = time.perf_counter()
+    tally = simulate(args.casts, args.coins, args.workers, args.seed, args.task_size, progress)
+    elapsed = time.perf_counter() - start
+    print()
+    print(tally.report(expected))
+    print('\n{:.2f} s, {:,.0f} casts/s on {} workers'.format(elapsed, tally.casts / elapsed, args.workers))
+
+
+if __name__ == '__main__':
+    main()
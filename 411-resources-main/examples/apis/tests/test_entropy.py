@@ -0,0 +1,120 @@
+"""Tests for entropy.py against a local stand-in for random.org"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import threading
+
+import pytest
+
+import entropy
+from entropy import EntropyPool
+
+
+class StubRandomOrg(BaseHTTPRequestHandler):
+    """Answers every request with the server's numbers, one per line"""
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        if self.server.status != 200:
+            self.send_error(self.server.status)
+            return
+        body = '\n'.join(self.server.numbers).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubRandomOrg)
+    server.numbers = ['2', '3'] * 10
+    server.status = 200
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def base_url(server):
+    return 'http://127.0.0.1:{}'.format(server.server_address[1])
+
+
+@pytest.fixture
+def pools(server):
+    # Closed before the server shuts down, so no refill is left talking to it
+    made = []
+    yield made
+    for pool in made:
+        pool.close()
+
+
+@pytest.fixture
+def make_pool(pools, base_url):
+    def make(kind, **kwargs):
+        pools.append(EntropyPool(kind, base_url, **kwargs))
+        return pools[-1]
+    return make
+
+
+def test_take_serves_a_fetched_block(server, make_pool):
+    pool = make_pool('coins', block=20, low_water=0)
+    assert pool.take(3) == [2, 3, 2]
+    assert pool.take(5) == [3, 2, 3, 2, 3]
+    assert len(server.requests) == 1
+    assert 'num=20' in server.requests[0]
+    assert len(pool) == 12
+    assert pool.fallbacks == 0
+
+
+def test_take_refills_below_low_water(server, make_pool):
+    pool = make_pool('coins', block=20, low_water=15)
+    pool.take(10)
+    with pool._cond:
+        assert pool._cond.wait_for(lambda: len(pool) == 30, 5)
+    assert len(server.requests) == 2
+
+
+def test_take_falls_back_to_the_csprng(server, make_pool):
+    server.status = 503
+    pool = make_pool('stalks', block=20)
+    values = pool.take(6)
+    assert len(values) == 6
+    assert all(0 <= value < 1 for value in values)
+    assert pool.fallbacks == 6
+
+
+def test_loaded_numbers_are_claimed(tmp_path):
+    path = str(tmp_path / 'entropy.json')
+    with open(path, 'w') as fh:
+        json.dump({'coins': [2, 3, 3]}, fh)
+    assert entropy.load(path) == {'coins': [2, 3, 3]}
+    assert os.listdir(str(tmp_path)) == []
+    assert entropy.load(path) == {}
+
+
+def test_close_stops_refilling(server, make_pool):
+    pool = make_pool('coins', block=20, low_water=0)
+    pool.take(1)
+    pool.close()
+    assert len(pool) == 19
+    assert len(pool.take(25)) == 25
+    assert pool.fallbacks == 6
+    assert len(server.requests) == 1
+
+
+def test_save_keeps_numbers_already_saved(tmp_path, monkeypatch, make_pool):
+    path = str(tmp_path / 'entropy.json')
+    with open(path, 'w') as fh:
+        json.dump({'coins': [3, 3], 'stalks': [0.5]}, fh)
+    pool = make_pool('coins')
+    pool.extend([2, 2])
+    monkeypatch.setattr(entropy, '_pools', {'coins': pool})
+    entropy.save(path)
+    assert entropy.load(path) == {'coins': [3, 3, 2, 2], 'stalks': [0.5]}
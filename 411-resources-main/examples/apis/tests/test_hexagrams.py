@@ -0,0 +1,37 @@
+"""Tests for the King Wen table and the text layout of a cast"""
+from datetime import datetime
+
+from hexagrams import king_wen, KING_WEN, NAMES, TRIGRAMS
+from iching import cast_table, describe, format_result, format_throws, pack_lines
+
+
+def test_king_wen_is_a_bijection():
+    assert len(KING_WEN) == 64
+    assert sorted(KING_WEN) == list(range(1, 65))
+    assert len(NAMES) == 65 and all(NAMES[1:])
+
+
+def test_known_hexagrams():
+    assert king_wen(0b111111) == (1, 'The Creative')
+    assert king_wen(0b000000) == (2, 'The Receptive')
+    # Kan over Li, and Li over Kan
+    assert king_wen(TRIGRAMS['Li'] | TRIGRAMS['Kan'] << 3) == (63, 'After Completion')
+    assert king_wen(TRIGRAMS['Kan'] | TRIGRAMS['Li'] << 3) == (64, 'Before Completion')
+    # Heaven below, earth above
+    assert king_wen(TRIGRAMS['Qian'] | TRIGRAMS['Kun'] << 3) == (11, 'Peace')
+
+
+def test_cast_table_names_both_hexagrams():
+    # All old yang, so every line changes from The Creative into The Receptive
+    cast = cast_table()[pack_lines([9] * 6)]
+    assert (cast.primary, cast.secondary) == (1, 2)
+    assert describe(cast) == '1. The Creative -> 2. The Receptive'
+    assert cast_table()[pack_lines([7] * 6)].secondary is None
+
+
+def test_format_result_keeps_the_file_layout():
+    lines = [7, 8, 9, 6, 7, 8]
+    when = datetime(2024, 1, 2, 3, 4, 5)
+    text = format_result(cast_table()[pack_lines(lines)], coins=True, test=True, when=when)
+    assert text == ('\n----------------\n2024-01-02 03:04:05\n\n' + format_throws(lines) +
+                    '\n\nThe Coins (test run)\n')
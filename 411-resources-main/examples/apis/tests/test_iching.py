@@ -0,0 +1,50 @@
+"""Tests for the batch mode of iching.py against the one-at-a-time loop"""
+import numpy as np
+import pytest
+
+import iching
+from iching import build_lines, cast_batch, pack_batch, pack_lines, stalk_lines_batch
+
+# The probabilities of 6, 7, 8 and 9
+COINS = (1 / 8, 3 / 8, 3 / 8, 1 / 8)
+STALKS = (1 / 16, 5 / 16, 7 / 16, 3 / 16)
+
+
+def frequencies(lines):
+    return np.bincount(np.asarray(lines).ravel(), minlength=10)[6:] / np.size(lines)
+
+
+def test_stalk_batch_matches_the_loop(monkeypatch):
+    splits = np.random.default_rng(411).random((200, 18))
+    batch = stalk_lines_batch(splits)
+    for row, lines in zip(splits, batch):
+        # throw_stalks takes its splits from get_stalks when not testing
+        monkeypatch.setattr(iching, 'get_stalks', lambda: list(row))
+        assert list(build_lines(iching.throw_stalks(False))) == list(lines)
+
+
+def test_coin_batch_matches_the_loop():
+    rng = np.random.default_rng(411)
+    batch = cast_batch(20000, coins=True, rng=rng)
+    throws = np.random.default_rng(412).integers(2, 4, size=(20000, 18))
+    loop = [list(build_lines(row)) for row in throws.tolist()]
+    assert np.allclose(frequencies(batch), frequencies(loop), atol=0.01)
+    assert np.allclose(frequencies(batch), COINS, atol=0.01)
+
+
+@pytest.mark.parametrize('coins, expected', [(False, STALKS), (True, COINS)])
+def test_batch_line_distribution(coins, expected):
+    lines = cast_batch(50000, coins, np.random.default_rng(411))
+    assert lines.shape == (50000, 6)
+    assert lines.min() >= 6 and lines.max() <= 9
+    assert np.allclose(frequencies(lines), expected, atol=0.01)
+
+
+def test_batch_is_reproducible_from_its_seed():
+    first = cast_batch(1000, rng=np.random.default_rng(7))
+    assert np.array_equal(first, cast_batch(1000, rng=np.random.default_rng(7)))
+
+
+def test_pack_batch_matches_pack_lines():
+    lines = cast_batch(5000, rng=np.random.default_rng(411))
+    assert pack_batch(lines).tolist() == [pack_lines(row) for row in lines.tolist()]
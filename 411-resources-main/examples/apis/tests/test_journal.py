@@ -0,0 +1,82 @@
+"""Tests for the binary cast journal"""
+import os
+
+import numpy as np
+import pytest
+
+from journal import HEADER, JournalReader, JournalWriter, RECORD, truncate_partial_record
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'casts.journal')
+
+
+def read(path):
+    with JournalReader(path) as reader:
+        return list(reader.records())
+
+
+def test_append_and_append_batch(path):
+    with JournalWriter(path, buffer_records=2) as journal:
+        journal.append(5, coins=False, test=False, timestamp=1.0)
+        journal.append_batch(np.array([7, 4095], dtype=np.uint16), coins=True, test=True, timestamp=2.0)
+        journal.append(9, coins=True, test=False, timestamp=3.0)
+    assert read(path) == [(1.0, False, False, 5), (2.0, True, True, 7), (2.0, True, True, 4095),
+                          (3.0, True, False, 9)]
+    assert os.path.getsize(path) == HEADER.size + 4 * RECORD.size
+
+
+def test_chunks_and_aggregate(path):
+    casts = np.arange(10, dtype=np.uint16)
+    with JournalWriter(path) as journal:
+        journal.append_batch(casts, coins=False, test=False, timestamp=1.0)
+        journal.append_batch(casts, coins=True, test=True, timestamp=2.0)
+    with JournalReader(path) as reader:
+        chunks = [chunk['cast'].tolist() for chunk in reader.chunks(size=8)]
+        stats = reader.aggregate()
+    assert chunks == [list(range(8)), [8, 9] + list(range(6)), [6, 7, 8, 9]]
+    assert (stats['casts'], stats['tests'], stats['first'], stats['last']) == (20, 10, 1.0, 2.0)
+    assert stats['by_cast'][0, :10].tolist() == [1] * 10
+    assert stats['by_cast'].sum() == 20
+
+
+def test_close_with_a_live_chunk(path):
+    with JournalWriter(path) as journal:
+        journal.append(1, coins=False, test=False)
+    reader = JournalReader(path)
+    chunk = next(reader.chunks())
+    with pytest.raises(BufferError):
+        reader.close()
+    del chunk
+    reader.close()
+
+
+def test_reopen_cuts_off_a_partial_record(path):
+    with JournalWriter(path) as journal:
+        journal.append(1, coins=False, test=False, timestamp=1.0)
+    with open(path, 'ab') as fh:
+        fh.write(b'\x01' * 5)
+    with JournalWriter(path) as journal:
+        journal.append(2, coins=False, test=False, timestamp=2.0)
+    assert [cast for _, _, _, cast in read(path)] == [1, 2]
+
+
+def test_partial_header_is_started_over(path):
+    with open(path, 'wb') as fh:
+        fh.write(b'ICH')
+    truncate_partial_record(path)
+    assert os.path.getsize(path) == 0
+    with JournalWriter(path) as journal:
+        journal.append(3, coins=True, test=False, timestamp=1.0)
+    assert read(path) == [(1.0, True, False, 3)]
+
+
+@pytest.mark.parametrize('content', [b'not a journal', b'xy'])
+def test_other_files_are_rejected(path, content):
+    with open(path, 'wb') as fh:
+        fh.write(content)
+    with pytest.raises(ValueError):
+        JournalWriter(path)
+    with pytest.raises(ValueError):
+        JournalReader(path)
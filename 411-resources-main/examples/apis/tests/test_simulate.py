@@ -0,0 +1,28 @@
+"""Tests for the Monte Carlo driver in simulate.py"""
+import numpy as np
+import pytest
+
+from simulate import EXPECTED, simulate
+
+
+@pytest.mark.parametrize('coins, workers', [(False, 1), (True, 2)])
+def test_simulate_tallies_every_cast(coins, workers):
+    seen = []
+    tally = simulate(20000, coins, workers=workers, seed=411, task_size=6000,
+                     progress=lambda t: seen.append(t.casts))
+    assert tally.casts == 20000
+    assert sorted(seen) == seen and seen[-1] == 20000 and len(seen) == 4
+    assert tally.lines.sum() == 6 * 20000
+    assert tally.hexagrams.sum() == 20000
+    assert tally.changing.sum() == 20000
+    # The stalks split at whole stalks, which puts them a little off the
+    # textbook odds, so the tolerance is wider than the sampling error.
+    frequencies = [p for p, _ in tally.line_frequencies()]
+    assert np.allclose(frequencies, EXPECTED['coins' if coins else 'stalks'], atol=0.01)
+
+
+def test_simulate_is_reproducible_from_its_seed():
+    first = simulate(5000, workers=2, seed=7, task_size=1000)
+    second = simulate(5000, workers=1, seed=7, task_size=1000)
+    assert np.array_equal(first.lines, second.lines)
+    assert np.array_equal(first.hexagrams, second.hexagrams)
@@ -0,0 +1,59 @@
+"""Compares N sequential GETs with one batched MGET, and with cache hits.
+
+Without --host the reads go to an in-process fakeredis server, which shows
+the per-command client cost but no network round trips. Point it at a real
+server to see the round trips saved by batching.
+
+Usage:
+    python bench_redis_client.py [--keys 1000] [--rounds 20] [--host localhost --port 6379]
+"""
+import argparse
+import time
+
+import redis
+
+from redis_client import RedisClient, get_pool
+
+
+def best(func, rounds):
+    """Returns the fastest of rounds calls to func, in milliseconds"""
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--keys', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--host', help='Redis host; omit to use an in-process fakeredis server')
+    parser.add_argument('--port', default='6379')
+    args = parser.parse_args()
+
+    if args.host:
+        conn = redis.Redis(connection_pool=get_pool({'redis_host': args.host, 'redis_port': args.port}))
+    else:
+        import fakeredis
+        conn = fakeredis.FakeRedis()
+    keys = [f'bench:{i}' for i in range(args.keys)]
+    client = RedisClient(conn=conn, cache_ttl=60.0, cache_size=args.keys)
+    # __wrapped__ skips @timer, so only the Redis calls themselves are measured.
+    client.set_many.__wrapped__(client, {key: 'x' * 32 for key in keys})
+
+    sequential = best(lambda: [conn.get(key) for key in keys], args.rounds)
+    batched = best(lambda: conn.mget(keys), args.rounds)
+    client.get_many.__wrapped__(client, keys)
+    cached = best(lambda: client.get_many.__wrapped__(client, keys), args.rounds)
+    conn.delete(*keys)
+
+    print(f'{args.keys:,} keys')
+    print(f'sequential GET  {sequential:9.3f} ms')
+    print(f'one MGET        {batched:9.3f} ms  ({sequential / batched:.1f}x)')
+    print(f'cache hits      {cached:9.3f} ms  ({sequential / cached:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
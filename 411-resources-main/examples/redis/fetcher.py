@@ -0,0 +1,179 @@
+"""Cache-aside fetching of an upstream JSON API.
+
+A lookup tries an in-process LRU first, then Redis, and only calls the
+upstream on a miss in both. Whatever the upstream returns is written back to
+both caches with the TTL given for that key. Concurrent misses on the same
+key are collapsed into one upstream call (single flight). Upstream calls go
+through one pooled requests.Session with keep-alive and timeouts.
+"""
+from collections import OrderedDict
+import json
+import threading
+import time
+
+import redis
+import requests
+from requests.adapters import HTTPAdapter
+
+from redis_client import RedisClient
+
+
+def make_session(pool_size=10):
+    """Returns a Session that keeps up to pool_size connections per host alive
+
+    Args:
+        pool_size (int): How many connections to keep per host
+
+    Returns:
+        (requests.Session) The session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class LRUCache:
+    """A thread-safe LRU cache whose entries each have their own expiry"""
+
+    def __init__(self, size=1024, clock=time.monotonic):
+        self.size = size
+        self.clock = clock
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the value for key, or None if it is missing or expired"""
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= self.clock():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl):
+        """Stores value under key for ttl seconds, evicting the least recently used key if full"""
+        with self._lock:
+            self._items[key] = (value, self.clock() + ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class CachedFetcher:
+    """Fetches JSON from an upstream API through a local LRU and Redis"""
+
+    def __init__(self, client=None, session=None, ttl=300, local_size=1024, local_ttl=None,
+                 timeout=(3.05, 10)):
+        """
+        Args:
+            client (RedisClient): The Redis tier, or None to use only the local cache
+            session (requests.Session): The session for upstream calls. Defaults to make_session()
+            ttl (int): Seconds to cache a value when get is not given one
+            local_size (int): The most keys to keep in the local LRU
+            local_ttl (float): Upper bound on how long the LRU keeps a value, so it
+                picks up changes made through Redis. Defaults to the key's TTL
+            timeout (float or (float, float)): The connect and read timeouts for upstream calls
+        """
+        self.client = client
+        self.session = session or make_session()
+        self.ttl = ttl
+        self.local = LRUCache(local_size)
+        self.local_ttl = local_ttl
+        self.timeout = timeout
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+
+    def _from_redis(self, key):
+        if self.client is None:
+            return None
+        try:
+            value = self.client.get(key)
+        except redis.RedisError as e:
+            # Redis being down only costs a trip upstream.
+            print(f'Redis read failed for {key}: {e}')
+            return None
+        return None if value is None else json.loads(value)
+
+    def _to_redis(self, key, value, ttl):
+        if self.client is None:
+            return
+        try:
+            self.client.set(key, json.dumps(value), ttl=ttl)
+        except redis.RedisError as e:
+            print(f'Redis write failed for {key}: {e}')
+
+    def _remember(self, key, value, ttl):
+        local_ttl = ttl if self.local_ttl is None else min(ttl, self.local_ttl)
+        self.local.set(key, value, local_ttl)
+
+    def _fetch(self, key, url, headers, ttl):
+        value = self._from_redis(key)
+        if value is None:
+            r = self.session.get(url, headers=headers, timeout=self.timeout)
+            r.raise_for_status()
+            value = r.json()
+            self._to_redis(key, value, ttl)
+        self._remember(key, value, ttl)
+        return value
+
+    def get(self, key, url, headers=None, ttl=None):
+        """Returns the JSON for key, calling the upstream only if no cache has it
+
+        Args:
+            key (str): The cache key
+            url (str): The upstream URL to call on a miss
+            headers (dict): Headers for the upstream call
+            ttl (int): Seconds to cache this key. Defaults to the fetcher's ttl
+
+        Returns:
+            The decoded JSON
+
+        Raises:
+            requests.RequestException: If the upstream call fails or times out
+        """
+        ttl = self.ttl if ttl is None else ttl
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = self._fetch(key, url, headers, ttl)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def invalidate(self, key):
+        """Drops key from both caches"""
+        self.local.delete(key)
+        if self.client is not None:
+            self.client.delete_many([key])
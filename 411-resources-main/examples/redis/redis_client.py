@@ -0,0 +1,161 @@
+"""A reusable Redis client: one shared connection pool, batched reads and
+writes, and an optional client-side cache for hot keys.
+"""
+import threading
+import time
+
+import redis
+
+from utils import timer
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(env):
+    """Returns the connection pool for the Redis server in env, creating it once per process
+
+    Args:
+        env (dict): Holds "redis_host", "redis_port" and optionally "redis_db"
+
+    Returns:
+        (redis.ConnectionPool) The shared pool
+    """
+    key = (env["redis_host"], int(env["redis_port"]), int(env.get("redis_db", 0)))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = redis.ConnectionPool(host=key[0], port=key[1], db=key[2])
+        return _pools[key]
+
+
+def decode(value):
+    return None if value is None else value.decode("UTF-8")
+
+
+class RedisClient:
+    """Batched access to Redis, with an optional local cache in front of it
+
+    Values are returned decoded as UTF-8 strings. With cache_ttl > 0, values
+    read through this client are kept locally for that many seconds. Writes
+    through this client invalidate their keys immediately; writes from other
+    clients are picked up once the local copy expires. Missing keys are not
+    kept, so a key another client creates is seen on the next read.
+    """
+
+    def __init__(self, env=None, conn=None, cache_ttl=0.0, cache_size=1024):
+        """
+        Args:
+            env (dict): Where to connect, see get_pool. Ignored if conn is given
+            conn (redis.Redis): An existing connection to use instead
+            cache_ttl (float): Seconds to keep values locally, 0 to disable
+            cache_size (int): The most keys to keep locally
+        """
+        self.conn = conn if conn is not None else redis.Redis(connection_pool=get_pool(env))
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+
+    def _cached(self, key, now):
+        entry = self._cache.get(key)
+        if entry is not None and entry[1] > now:
+            return entry
+        return None
+
+    def _remember(self, items, now):
+        if self.cache_ttl <= 0:
+            return
+        expires = now + self.cache_ttl
+        with self._cache_lock:
+            for key, value in items:
+                if value is None:
+                    continue
+                if len(self._cache) >= self.cache_size and key not in self._cache:
+                    self._cache.pop(next(iter(self._cache)))
+                self._cache[key] = (value, expires)
+
+    def invalidate(self, keys):
+        """Drops keys from the local cache
+
+        Args:
+            keys ([str]): The keys to forget
+        """
+        with self._cache_lock:
+            for key in keys:
+                self._cache.pop(key, None)
+
+    def get(self, key):
+        """Reads one key, from the local cache if it is fresh
+
+        Args:
+            key (str): The key to read
+
+        Returns:
+            (str) The value, or None if the key does not exist
+        """
+        return self.get_many([key])[0]
+
+    @timer
+    def get_many(self, keys):
+        """Reads many keys in a single MGET round trip, skipping the ones cached locally
+
+        Args:
+            keys ([str]): The keys to read
+
+        Returns:
+            ([str]) The values in the same order, None for missing keys
+        """
+        now = time.monotonic()
+        values = [None] * len(keys)
+        missing = []
+        for i, key in enumerate(keys):
+            entry = self._cached(key, now)
+            if entry is None:
+                missing.append(i)
+            else:
+                values[i] = entry[0]
+        if missing:
+            fetched = self.conn.mget([keys[i] for i in missing])
+            for i, value in zip(missing, fetched):
+                values[i] = decode(value)
+            self._remember([(keys[i], values[i]) for i in missing], now)
+        return values
+
+    def set(self, key, value, ttl=None):
+        """Writes one key
+
+        Args:
+            key (str): The key to write
+            value (str): The value
+            ttl (int): Seconds until the key expires, or None to keep it
+        """
+        self.set_many({key: value}, ttl)
+
+    @timer
+    def set_many(self, mapping, ttl=None):
+        """Writes many keys in one pipelined round trip
+
+        Args:
+            mapping (dict): Keys and the values to write
+            ttl (int): Seconds until the keys expire, or None to keep them
+        """
+        self.invalidate(mapping)
+        if ttl is None:
+            self.conn.mset(mapping)
+            return
+        with self.conn.pipeline(transaction=False) as pipe:
+            for key, value in mapping.items():
+                pipe.set(key, value, ex=ttl)
+            pipe.execute()
+
+    @timer
+    def delete_many(self, keys):
+        """Deletes many keys in one round trip
+
+        Args:
+            keys ([str]): The keys to delete
+        """
+        self.invalidate(keys)
+        if keys:
+            self.conn.delete(*keys)
@@ -1,29 +1,42 @@
 from contextlib import contextmanager
 import json
+import sys
 
 import redis
 import requests
 
-from utils import timer
+from fetcher import CachedFetcher
+from redis_client import RedisClient, get_pool
+from utils import report, timer
 
 
+_fetchers = {}
+
+
+def get_fetcher(env):
+    key = (env["redis_host"], env["redis_port"])
+    if key not in _fetchers:
+        _fetchers[key] = CachedFetcher(RedisClient(env), ttl=int(env.get("cache_ttl", 300)))
+    return _fetchers[key]
+
 @timer
 def request(env):
+    headers = {
+        'X-RapidAPI-Key': env["api_key"],
+        'X-RapidAPI-Host': env["api_host"]
+    }
     try:
-        headers = {
-            'X-RapidAPI-Key': env["api_key"],
-            'X-RapidAPI-Host': env["api_host"]
-        }
-        with requests.get(env["api_url"], headers=headers) as r:
-            word = r.json()[0]["word"]
-            print(word)
-            return word
-    except Exception as e:
-        print(r)
+        word = get_fetcher(env).get(env["api_url"], env["api_url"], headers)[0]["word"]
+    except (requests.RequestException, ValueError, KeyError, IndexError) as e:
+        print(f'Request to {env["api_url"]} failed: {e!r}')
+        return None
+    print(word)
+    return word
 
 @contextmanager
 def redis_connect(env):
-    conn = redis.Redis(host=env["redis_host"], port=env["redis_port"], db=0)
+    # Connections go back to the shared pool on close instead of being torn down.
+    conn = redis.Redis(connection_pool=get_pool(env))
     try:
         yield conn
     finally:
@@ -43,7 +56,15 @@ if __name__ == "__main__":
     with open("env.json", "r") as fh:
         env = json.load(fh)
     content = request(env)
+    if content is None:
+        # Keep whatever an earlier run stored rather than overwriting it with nothing.
+        sys.exit(1)
     with redis_connect(env) as conn:
         redis_write(conn, content)
         for _ in range(10):
             redis_read(conn)
+    # The same reads through the client: the first goes to Redis, the other nine hit the local cache.
+    client = RedisClient(env, cache_ttl=5.0)
+    for _ in range(10):
+        print(client.get('content'))
+    print(report())
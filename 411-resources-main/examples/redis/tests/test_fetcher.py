@@ -0,0 +1,109 @@
+"""Tests for fetcher.py against a local stand-in for the upstream API and fakeredis"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+
+import fakeredis
+import pytest
+import requests
+
+from fetcher import CachedFetcher
+from redis_client import RedisClient
+
+
+class StubAPI(BaseHTTPRequestHandler):
+    """Answers every request with the number of requests so far, as JSON"""
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.calls += 1
+            calls = self.server.calls
+        time.sleep(self.server.delay)
+        if self.server.status != 200:
+            self.send_error(self.server.status)
+            return
+        body = json.dumps([{'word': 'w{}'.format(calls)}]).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubAPI)
+    server.lock = threading.Lock()
+    server.calls = 0
+    server.delay = 0.0
+    server.status = 200
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def url(server):
+    return 'http://127.0.0.1:{}/word'.format(server.server_address[1])
+
+
+@pytest.fixture
+def redis_server():
+    return fakeredis.FakeServer()
+
+
+def fetcher(redis_server):
+    return CachedFetcher(RedisClient(conn=fakeredis.FakeRedis(server=redis_server)), ttl=60)
+
+
+def test_miss_goes_upstream_once(server, url, redis_server):
+    first = fetcher(redis_server)
+    assert first.get('word', url) == [{'word': 'w1'}]
+    assert first.get('word', url) == [{'word': 'w1'}]
+    # Another process finds it in Redis.
+    assert fetcher(redis_server).get('word', url) == [{'word': 'w1'}]
+    assert server.calls == 1
+    assert 0 < fakeredis.FakeRedis(server=redis_server).ttl('word') <= 60
+
+
+def test_concurrent_misses_share_one_call(server, url, redis_server):
+    server.delay = 0.2
+    shared = fetcher(redis_server)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(shared.get('word', url)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [[{'word': 'w1'}]] * 8
+    assert server.calls == 1
+
+
+def test_upstream_errors_are_not_cached(server, url, redis_server):
+    shared = fetcher(redis_server)
+    server.status = 503
+    with pytest.raises(requests.HTTPError):
+        shared.get('word', url)
+    server.status = 200
+    assert shared.get('word', url) == [{'word': 'w2'}]
+
+
+def test_redis_down_falls_back_to_upstream(server, url, redis_server):
+    redis_server.connected = False
+    shared = fetcher(redis_server)
+    assert shared.get('word', url) == [{'word': 'w1'}]
+    assert shared.get('word', url) == [{'word': 'w1'}]
+    assert server.calls == 1
+
+
+def test_invalidate_drops_both_caches(server, url, redis_server):
+    shared = fetcher(redis_server)
+    shared.get('word', url)
+    shared.invalidate('word')
+    assert shared.get('word', url) == [{'word': 'w2'}]
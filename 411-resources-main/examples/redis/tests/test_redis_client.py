@@ -0,0 +1,27 @@
+"""Tests for redis_client.py against an in-process fakeredis server"""
+import fakeredis
+import pytest
+
+from redis_client import RedisClient
+
+
+@pytest.fixture
+def conn():
+    return fakeredis.FakeRedis()
+
+
+def test_get_many_is_cached_locally(conn):
+    conn.mset({'a': '1', 'b': '2'})
+    client = RedisClient(conn=conn, cache_ttl=60)
+    assert client.get_many(['a', 'b']) == ['1', '2']
+    conn.set('a', 'changed')
+    assert client.get('a') == '1'
+    client.set('a', '3')
+    assert client.get('a') == '3'
+
+
+def test_missing_keys_are_not_cached(conn):
+    client = RedisClient(conn=conn, cache_ttl=60)
+    assert client.get('a') is None
+    conn.set('a', '1')
+    assert client.get('a') == '1'
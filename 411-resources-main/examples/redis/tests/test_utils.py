@@ -0,0 +1,20 @@
+"""Tests for the latency histogram in utils.py"""
+from utils import BOUNDS, Histogram
+
+
+def test_percentiles_are_bucket_bounds():
+    hist = Histogram()
+    for ns in (1500, 1500, 1500, 40000):
+        hist.record(ns)
+    assert hist.percentile(0.5) == min(b for b in BOUNDS if b >= 1500) / 1e6
+    assert hist.percentile(0.99) == 40000 / 1e6
+    assert Histogram().percentile(0.99) == 0.0
+
+
+def test_overflow_bucket_reads_the_largest_value():
+    hist = Histogram()
+    slow = BOUNDS[-1] * 3
+    hist.record(1000)
+    hist.record(slow)
+    assert hist.percentile(0.99) == slow / 1e6
+    assert hist.summary()['max_ms'] == slow / 1e6
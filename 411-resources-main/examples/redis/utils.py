@@ -0,0 +1,168 @@
+"""Timing instrumentation for the examples.
+
+@timer records how long every call to a function takes, and
+`with timer("name"):` does the same for a block. Calls are counted per name
+into a latency histogram. Everything is thread safe. Dump the results with
+report(), as text or JSON.
+
+The histogram mirrors the one in HW/HW3/decoupled/service/tictactoe/metrics.py,
+with the same buckets, so numbers from the two read alike. The examples
+run on their own rather than importing from the homework, so a change to
+the buckets there should be copied here.
+"""
+from bisect import bisect_left
+from functools import wraps
+import json
+import sys
+import threading
+import time
+
+
+# Bucket upper bounds in nanoseconds, as in tictactoe/metrics.py
+BOUNDS = [round(1000 * 2 ** (i / 4)) for i in range(105)]
+
+# Set to True to also print every call as it happens
+verbose = False
+
+
+class Histogram:
+    """Counts of latencies in log-spaced buckets"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.buckets = [0] * (len(BOUNDS) + 1)
+        self.lock = threading.Lock()
+
+    def record(self, ns):
+        index = bisect_left(BOUNDS, ns)
+        with self.lock:
+            self.buckets[index] += 1
+            self.count += 1
+            self.total += ns
+            if ns > self.max:
+                self.max = ns
+
+    def percentile(self, q):
+        """Returns the upper bound of the bucket holding the q-th quantile, in milliseconds
+
+        Args:
+            q (float): The quantile, between 0 and 1
+
+        Returns:
+            (float) The quantile, or 0 if nothing has been recorded. Never more
+            than the largest value recorded
+        """
+        with self.lock:
+            buckets, count, largest = list(self.buckets), self.count, self.max
+        if count == 0:
+            return 0.0
+        rank = max(1, round(q * count))
+        seen = 0
+        for index, n in enumerate(buckets):
+            seen += n
+            if seen >= rank:
+                bound = BOUNDS[index] if index < len(BOUNDS) else largest
+                return min(bound, largest) / 1e6
+        return largest / 1e6
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count / 1e6 if self.count else 0.0,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': self.max / 1e6,
+        }
+
+
+_histograms = {}
+_lock = threading.Lock()
+
+
+def histogram(name):
+    """Returns the histogram for name, creating it on first use"""
+    with _lock:
+        if name not in _histograms:
+            _histograms[name] = Histogram()
+        return _histograms[name]
+
+
+def _done(hist, name, start):
+    elapsed = time.perf_counter_ns() - start
+    hist.record(elapsed)
+    if verbose:
+        sys.stderr.write(f'{name} took {elapsed / 1e6:.3f} ms\n')
+
+
+class _Block:
+    def __init__(self, name):
+        self.name = name
+        self.hist = histogram(name)
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        _done(self.hist, self.name, self.start)
+        return False
+
+
+def timer(func_or_name):
+    """Times a function, or a block of code
+
+    Use it as a decorator, @timer, to time every call to a function under its
+    qualified name, or as `with timer("name"):` to time a block.
+
+    Args:
+        func_or_name (callable or str): The function to time, or the name to record a block under
+
+    Returns:
+        The wrapped function, or a context manager
+    """
+    if not callable(func_or_name):
+        return _Block(func_or_name)
+    func = func_or_name
+    name = func.__qualname__
+    hist = histogram(name)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _done(hist, name, start)
+    return wrapper
+
+
+def report(fmt='text'):
+    """Returns the count and latency percentiles of everything timed so far
+
+    Args:
+        fmt (str): 'text' for a table, or 'json'
+
+    Returns:
+        (str) The report
+    """
+    with _lock:
+        summaries = {name: hist.summary() for name, hist in sorted(_histograms.items())}
+    if fmt == 'json':
+        return json.dumps(summaries, indent=2)
+    lines = [f'{"name":<32} {"count":>8} {"mean ms":>9} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"max ms":>9}']
+    for name, s in summaries.items():
+        lines.append(f'{name:<32} {s["count"]:>8} {s["mean_ms"]:>9.3f} {s["p50_ms"]:>9.3f} '
+                     f'{s["p95_ms"]:>9.3f} {s["p99_ms"]:>9.3f} {s["max_ms"]:>9.3f}')
+    return '\n'.join(lines)
+
+
+def reset():
+    """Forgets everything timed so far"""
+    with _lock:
+        for hist in _histograms.values():
+            with hist.lock:
+                hist.count = hist.total = hist.max = 0
+                hist.buckets = [0] * (len(BOUNDS) + 1)